@@ -0,0 +1,3 @@
+# Accelerometer analysis (AccelData CSVs from the DAQ). A package so the repo-root tools and the scripts in here share
+# one import path: `from accelerometer.accel_io import ...`, scripts run from the repo root as
+# `python -m accelerometer.accel_analysis`.
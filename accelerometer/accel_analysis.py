@@ -1,15 +1,25 @@
 import pandas as pd
-from accel_io import read_many_csvs, estimate_sample_rate_hz
+from accelerometer.accel_io import read_many_csvs, estimate_sample_rate_hz
 import matplotlib.pyplot as plt
 from pathlib import Path
-from accel_fft import run_fft_overlay
+from accelerometer.accel_fft import run_fft_overlay
+from contextlib import nullcontext
+from stage_profile import RunProfile
 
+# Run from the repo root as `python -m accelerometer.accel_analysis`.
 # This script will take a look at all the Accelerometer Sessions in all the folders in accel, smash together all the
 # data from all the individual CSVs, and output the collective FFTs on a per-session basis. Uses accel_fft to hold the
 # various functions.
 # Your starting point
 source_folder = Path(r"D:\Users\jad507\OneDrive - The Pennsylvania State University\Documents\AstroStats\accel\Session_2025-10-14_160804")
 
+# Set to a folder (e.g. Path("fft_output/profiles")) to time every stage of each session's run; one JSON per
+# session, compare runs with `python stage_profile.py a.json b.json`
+profile_dir = None
+
+# "float32" halves the memory per session (see the error bounds in accel_fft.py); "float64" is the exact old behaviour
+precision = "float64"
+
 parent_dir = source_folder.parent
 print(f"Scanning parent: {parent_dir}")
 
@@ -27,20 +37,23 @@ for session_dir in session_dirs:
         continue
 
     # Each session gets its own output subfolder
-    out_dir = Path("../fft_output") / session_dir.name
+    out_dir = Path("fft_output") / session_dir.name
 
+    profiler = RunProfile("fft_overlay", profile_dir, meta={"session": session_dir.name}) if profile_dir else nullcontext()
     try:
         # Run with your preferred settings
-        figs = run_fft_overlay(
-            files=files,              # safest; works even if run_fft_overlay doesn't accept directories
-            method="welch",
-            nperseg_seconds=60.0,
-            noverlap_ratio=0.5,
-            max_f_hz=None,
-            out_dir=out_dir,          # saves PNGs + CSVs here
-            log_x=True,
-            log_y=False,
-        )
+        with profiler:
+            figs = run_fft_overlay(
+                files=files,              # safest; works even if run_fft_overlay doesn't accept directories
+                method="welch",
+                nperseg_seconds=60.0,
+                noverlap_ratio=0.5,
+                max_f_hz=None,
+                out_dir=out_dir,          # saves PNGs + CSVs here
+                log_x=True,
+                log_y=False,
+                precision=precision,
+            )
         print(f"  Saved outputs to: {out_dir.resolve()}")
 
         # If you are processing many sessions, you may not want to display now:
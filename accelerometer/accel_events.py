@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy import signal as _scipy_signal  # type: ignore
+    _HAVE_SCIPY = True
+except Exception:
+    _HAVE_SCIPY = False
+
+from accelerometer.accel_io import estimate_sample_rate_hz, iter_csv_blocks, parse_filename_info, read_csv_window
+from stage_profile import stage, staged
+
+# Finds the vibration events (door slams, pumps switching, construction) in continuous AccelData sessions after the
+# fact, with the rule accel_event.m applies live: smoothed = sf*smoothed + (1 - sf)*raw, and a sample is "above" when
+# the largest |smoothed| over the axes reaches the threshold. Band-limited triggers (moving rms of a band-passed
+# signal) can be added for things that only show up in one band. Files are streamed in blocks, so a whole archive can
+# be scanned in constant memory, and every event is written with the byte offset of its raw window so load_event reads
+# just that window later.
+
+AXES = ["Mirror_Y_g", "Mirror_X_g", "Mirror_Z_g", "Desk_Y_g"]  # accel_event.m's channel order
+EVENT_INDEX_FILENAME = "accel_events.csv"
+
+
+@dataclass
+class BandTrigger:
+    name: str                   # written to the "trigger" column of the index
+    lo_hz: float
+    hi_hz: float
+    threshold_g_rms: float      # event while the rms of the band over window_s reaches this on any axis
+    window_s: float = 1.0
+    order: int = 4              # Butterworth band-pass order
+
+
+@dataclass
+class EventOptions:
+    threshold_g: float = 0.05       # accel_event.m CONFIG.threshold_magnitude
+    smoothing_factor: float = 0.0   # accel_event.m CONFIG.smoothing_factor
+    remove_offset: bool = True      # subtract each axis' offset first (accel_event.m used the raw g values)
+    baselines: Optional[Dict[str, float]] = None  # the offsets, e.g. channel_stats session medians (default: median
+                                                  # of each file's first offset_s)
+    offset_s: float = 10.0          # span at the start of each file whose median is the default offset
+    merge_gap_s: float = 1.0        # above-threshold runs closer than this are one event (0 counts them like the DAQ)
+    pad_s: float = 1.0              # raw data kept before and after each event for load_event
+    bands: Tuple[BandTrigger, ...] = ()
+    axes: Tuple[str, ...] = tuple(AXES)
+    block_bytes: int = 32 << 20     # CSV read per block (~600k rows of a 4-axis file)
+
+
+class _Smoothed:
+    # Largest |smoothed| over the axes, with accel_event.m's exponential smoothing carried from block to block
+    def __init__(self, smoothing_factor: float, n_axes: int):
+        if smoothing_factor and not _HAVE_SCIPY:
+            raise RuntimeError("SciPy not available for smoothing_factor > 0")
+        self.sf = smoothing_factor
+        self.zi = np.zeros((1, n_axes))  # the DAQ starts from smoothed = 0
+
+    def __call__(self, a: np.ndarray) -> np.ndarray:
+        if self.sf:
+            a, self.zi = _scipy_signal.lfilter([1 - self.sf], [1, -self.sf], a, axis=0, zi=self.zi)
+        return np.abs(a).max(axis=1)
+
+
+class _BandRms:
+    # Largest moving rms over the axes of the band-passed signal; filter state and the last window carried over blocks
+    def __init__(self, band: BandTrigger, fs: float, n_axes: int):
+        if not _HAVE_SCIPY:
+            raise RuntimeError("SciPy not available for band triggers")
+        self.sos = _scipy_signal.butter(band.order, [band.lo_hz, band.hi_hz], btype="bandpass", fs=fs, output="sos")
+        self.zi = np.zeros((self.sos.shape[0], 2, n_axes))
+        self.window = max(1, int(round(band.window_s * fs)))
+        self.tail = np.zeros((0, n_axes))  # squared samples of the previous block still inside the window
+
+    def __call__(self, a: np.ndarray) -> np.ndarray:
+        y, self.zi = _scipy_signal.sosfilt(self.sos, a, axis=0, zi=self.zi)
+        sq = np.concatenate([self.tail, y * y])
+        csum = np.concatenate([np.zeros((1, sq.shape[1])), np.cumsum(sq, axis=0)])
+        ends = np.arange(len(self.tail) + 1, len(sq) + 1)
+        starts = np.maximum(0, ends - self.window)  # shorter windows at the start of a file
+        ms = (csum[ends] - csum[starts]) / (ends - starts)[:, None]
+        self.tail = sq[len(sq) - min(len(sq), self.window - 1):]
+        return np.sqrt(np.maximum(ms, 0.0)).max(axis=1)
+
+
+class _Runs:
+    # Above-threshold runs of one trigger in one file, merged across gaps of up to `gap` rows, open across blocks
+    def __init__(self, trigger: str, gap: int, pad: int):
+        self.trigger, self.gap, self.pad = trigger, gap, pad
+        self.open: Optional[dict] = None
+        self.events: List[dict] = []
+
+    def feed(
+        self,
+        row0: int,
+        above: np.ndarray,
+        stat: np.ndarray,
+        abs_a: np.ndarray,
+        t: np.ndarray,
+        byte_of: Callable[[int], int],
+    ) -> None:
+        edges = np.diff(above.astype(np.int8), prepend=0, append=0)
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        if not len(starts):
+            return
+        first = np.concatenate(([True], starts[1:] - ends[:-1] > self.gap))
+        group_starts = starts[first]
+        group_ends = ends[np.concatenate((first[1:], [True]))]
+        for s, e in zip(group_starts, group_ends):
+            if self.open is None or row0 + s - self.open["end"] > self.gap:
+                self.close()
+                self.open = {
+                    "row": row0 + s, "end": row0 + s, "byte_offset": byte_of(row0 + s), "t_rel_s": t[s],
+                    "window_row": max(0, row0 + s - self.pad), "above_samples": 0,
+                    "trigger_peak": 0.0, "peaks": np.zeros(abs_a.shape[1]),
+                }
+                self.open["window_byte"] = byte_of(self.open["window_row"])
+            ev = self.open
+            ev["end"] = row0 + e
+            ev["above_samples"] += int(np.count_nonzero(above[s:e]))
+            ev["trigger_peak"] = max(ev["trigger_peak"], float(stat[s:e].max()))
+            ev["peaks"] = np.maximum(ev["peaks"], abs_a[s:e].max(axis=0))
+
+    def close(self) -> None:
+        if self.open is not None:
+            self.events.append(self.open)
+            self.open = None
+
+
+def _first_time(path: Path, byte_offset: int) -> pd.Timestamp:
+    # AbsoluteTime of the row at byte_offset (the first column of the CSVs)
+    with open(path, "rb") as f:
+        f.seek(int(byte_offset))
+        text = f.readline().decode().split(",")[0]
+    return pd.to_datetime(text, format="%Y-%m-%d %H:%M:%S.%f")
+
+
+def scan_file(path: Path | str, opts: Optional[EventOptions] = None) -> pd.DataFrame:
+    """
+    Events of one AccelData CSV, one row per event and trigger: where it is (session, file, row, byte_offset, and the
+    padded window_row/window_byte/window_rows that load_event reads), when (start, t_rel_s, duration_s), how many
+    samples were above the threshold, the largest trigger value and the peak |a| of each axis over the event.
+    An event running over the end of a file shows up as two events, one in each file.
+    """
+    path = Path(path)
+    opts = opts or EventOptions()
+    parse_filename_info(path)  # only AccelData_* files have the layout read here
+    axes = list(opts.axes)
+    triggers: List[Tuple[Callable[[np.ndarray], np.ndarray], float, _Runs]] = []
+    offset = fs = first = t0 = None
+    pad = 0
+    hist_row0, hist_offsets = 0, np.zeros(0, dtype=np.int64)  # offsets of the last `pad` rows before this block
+    for row0, offsets, df in iter_csv_blocks(path, opts.block_bytes, usecols=["RelativeTime_s", *axes]):
+        t = df["RelativeTime_s"].to_numpy()
+        a = df[axes].to_numpy(dtype=np.float64)
+        if offset is None:
+            fs = estimate_sample_rate_hz(df["RelativeTime_s"])
+            offset = np.zeros(len(axes))
+            if opts.remove_offset:
+                # a fixed span rather than the first block, so the events do not depend on block_bytes
+                head = pd.read_csv(path, usecols=axes, nrows=max(1, int(round(opts.offset_s * fs))), dtype="float64")
+                offset = np.nanmedian(head[axes].to_numpy(), axis=0)
+                for i, axis in enumerate(axes):
+                    if opts.baselines and axis in opts.baselines:
+                        offset[i] = opts.baselines[axis]
+            first, t0 = _first_time(path, offsets[0]), t[0]
+            gap, pad = int(round(opts.merge_gap_s * fs)), int(round(opts.pad_s * fs))
+            triggers.append((_Smoothed(opts.smoothing_factor, len(axes)), opts.threshold_g, _Runs("threshold", gap, pad)))
+            for band in opts.bands:
+                triggers.append((_BandRms(band, fs, len(axes)), band.threshold_g_rms, _Runs(band.name, gap, pad)))
+
+        def byte_of(row: int) -> int:
+            # windows reach back at most pad rows, which may span several blocks when blocks are small
+            if row >= row0:
+                return int(offsets[row - row0])
+            return int(hist_offsets[row - hist_row0])
+
+        a = np.nan_to_num(a - offset)  # a missing sample counts as no motion and does not poison the smoothing
+        abs_a = np.abs(a)
+        with stage("events.triggers", count=len(a)):
+            for detect, threshold, runs in triggers:
+                stat = detect(a)
+                runs.feed(row0, stat >= threshold, stat, abs_a, t, byte_of)
+        hist_offsets = np.concatenate([hist_offsets, offsets])[-pad:] if pad else hist_offsets
+        hist_row0 = row0 + len(offsets) - len(hist_offsets)
+
+    rows = []
+    for _, _, runs in triggers:
+        runs.close()
+        for ev in runs.events:
+            rows.append({
+                "session": path.parent.name,
+                "file": path.name,
+                "trigger": runs.trigger,
+                "start": (first + pd.to_timedelta(ev["t_rel_s"] - t0, unit="s")).round("us"),
+                "t_rel_s": ev["t_rel_s"],
+                "duration_s": (ev["end"] - ev["row"]) / fs,
+                "row": ev["row"],
+                "byte_offset": ev["byte_offset"],
+                "window_row": ev["window_row"],
+                "window_byte": ev["window_byte"],
+                "window_rows": ev["end"] + runs.pad - ev["window_row"],
+                "above_samples": ev["above_samples"],
+                "trigger_peak": ev["trigger_peak"],
+                **{f"peak_{axis}": p for axis, p in zip(axes, ev["peaks"])},
+            })
+    return pd.DataFrame(rows)
+
+
+@staged("scan_events", count=len, unit="events")
+def scan_sessions(
+    paths: Iterable[Path | str] | Path | str,
+    opts: Optional[EventOptions] = None,
+    glob_pattern: str = "AccelData_*.csv",
+) -> pd.DataFrame:
+    """
+    scan_file for every AccelData CSV in a session folder, anywhere under an archive root, or in a list of files,
+    as one table sorted by start time. Files that cannot be read are reported and skipped.
+    """
+    if isinstance(paths, (str, Path)):
+        p = Path(paths)
+        files = sorted(p.rglob(glob_pattern)) if p.is_dir() else [p]
+    else:
+        files = [Path(f) for f in paths]
+    frames = []
+    for path in files:
+        try:
+            frames.append(scan_file(path, opts))
+        except Exception as e:
+            print(f"[events] Skipping {path}: {e}")
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True).sort_values(["start", "trigger"], ignore_index=True)
+
+
+def read_event_index(path: Path | str) -> pd.DataFrame:
+    """
+    An event index written with events.to_csv(path, index=False), with the start times parsed again.
+    """
+    df = pd.read_csv(path)
+    if "start" in df.columns:
+        df["start"] = pd.to_datetime(df["start"])
+    return df
+
+
+def load_event(event, root: Path | str) -> pd.DataFrame:
+    """
+    Raw samples of one event and its padding (a row of scan_sessions / read_event_index), read with a seek to its
+    window_byte instead of a rescan. root is the folder holding the session folders, where the index was written.
+    """
+    path = Path(root) / event["session"] / event["file"]
+    return read_csv_window(path, int(event["window_byte"]), int(event["window_rows"]))
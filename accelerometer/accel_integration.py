@@ -1,37 +1,123 @@
-from typing import Optional, Any
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional, Any, Dict, Sequence, Tuple
 
 import pandas as pd
 import numpy as np
-from scipy.integrate import simpson, cumulative_simpson, solve_ivp
-from scipy.interpolate import interp1d
 import pathlib
 import glob
-import matplotlib
-import matplotlib.pyplot as plt
-
-# Load data
-source_folder = pathlib.Path(r"D:\Reverse Telescope Test\accel\Session_2025-10-29_163326")
-csv_files = glob.glob(str(source_folder / "*.csv"))
-try :
-    df_list = [pd.read_csv(f) for f in csv_files[0:10]] # 50 files will eat up about 8 gigs of ram
-    df = pd.concat(df_list, ignore_index=True)
-except MemoryError as e:
-    print("Memory error, you may have too much data.")
-    print(e)
-    if len(csv_files) > 5 :
-        df_list = [pd.read_csv(f) for f in csv_files[0:5]]
-    else:
-        df_list = [pd.read_csv(csv_files[0])]
-    df = pd.read_csv(pathlib.Path.joinpath(source_folder, "*.csv"))
-except Exception as e :
-    print(e)
+
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
+
+# Integrates the accelerometer traces of a session to velocity (and displacement). The functions can be imported
+# (the command-line `accel integrate` uses them, headless); running this file does the original interactive plots.
+# SciPy and matplotlib are imported by the functions that use them, so importing this module stays cheap.
+
+INTEGRATION_AXES = ["Mirror_X_g", "Mirror_Y_g", "Mirror_Z_g", "Desk_Y_g"]
 
 
-t = df['RelativeTime_s'].values
-ax = df['Mirror_X_g'].values - df['Mirror_X_g'].median() # accel output from matlab is in g's. g = 386.1 inches/sec^2 For now just get raw V
-ay = df['Mirror_Y_g'].values - df['Mirror_Y_g'].median()
-az = df['Mirror_Z_g'].values - df['Mirror_Y_g'].median()
-aarm = df['Desk_Y_g'].values - df['Desk_Y_g'].median()
+def integrate(
+        t: np.ndarray[Any, np.dtype[np.floating[Any]]],
+        a: np.ndarray[Any, np.dtype[np.floating[Any]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Velocity and displacement from acceleration by cumulative Simpson integration, both starting at 0.
+    Always accumulated in float64, also for float32 input.
+    """
+    from scipy.integrate import cumulative_simpson
+
+    if len(t) != len(a):
+        raise ValueError("All input arrays must have the same length.")
+    t = np.asarray(t, dtype=np.float64)
+    a = np.asarray(a, dtype=np.float64)
+    v = cumulative_simpson(y=a, x=t, initial=0)
+    p = cumulative_simpson(y=v, x=t, initial=0)
+    return v, p
+
+
+def integrate_session(
+        df: pd.DataFrame,
+        axes: Sequence[str] = INTEGRATION_AXES,
+        time_column: str = "t_abs_s",
+        baselines: Optional[Dict[str, float]] = None,
+        precision: str = "float64",
+        qc: bool = True) -> pd.DataFrame:
+    """
+    Median-removed acceleration, velocity and displacement of each axis of a session (e.g. from read_many_csvs),
+    as columns t, <axis>_a, <axis>_v, <axis>_p. baselines {axis: offset} replaces the median of the loaded data,
+    e.g. the whole-session medians from channel_stats.session_stats when only part of a session is loaded.
+    precision="float32" stores the result columns in float32 (half the memory, as with read_many_csvs(precision=...));
+    the integration itself always runs in float64, one axis at a time.
+    With qc and <axis>_ok columns (read_many_csvs(qc=...)), flagged samples are left out of the median and their
+    acceleration set to 0, so velocity holds its value across them; <axis>_ok is carried into the result.
+    """
+    t = df[time_column].to_numpy(dtype=np.float64)
+    out = {"t": t}
+    for axis in axes:
+        if axis not in df.columns:
+            continue
+        a = df[axis].to_numpy(dtype=np.float64)
+        ok = df[f"{axis}_ok"].to_numpy(dtype=bool) if qc and f"{axis}_ok" in df.columns else None
+        if baselines and axis in baselines:
+            a = a - baselines[axis]
+        else:
+            a = a - np.median(a if ok is None else a[ok])
+        if ok is not None:
+            a[~ok] = 0.0
+        v, p = integrate(t, a)
+        out[f"{axis}_a"], out[f"{axis}_v"], out[f"{axis}_p"] = (x.astype(precision, copy=False) for x in (a, v, p))
+        if ok is not None:
+            out[f"{axis}_ok"] = ok
+    return pd.DataFrame(out)
+
+
+def integration_summary(result: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per axis: rms of acceleration and velocity, and the peak-to-peak displacement, from integrate_session.
+    The acceleration rms leaves out QC-flagged samples, and flagged_fraction says how many there were.
+    """
+    rows = []
+    for col in result.columns:
+        if col.endswith("_a"):
+            axis = col[:-2]
+            a = result[f"{axis}_a"].to_numpy()
+            ok = result[f"{axis}_ok"].to_numpy(dtype=bool) if f"{axis}_ok" in result.columns else np.ones(len(a), bool)
+            rows.append({
+                "axis": axis,
+                "accel_rms": float(np.sqrt(np.mean(a[ok] ** 2, dtype=np.float64))) if ok.any() else float("nan"),
+                "velocity_rms": float(np.sqrt(np.mean(result[f"{axis}_v"].to_numpy() ** 2, dtype=np.float64))),
+                "displacement_p2p": float(np.ptp(result[f"{axis}_p"])),
+                "flagged_fraction": float(1.0 - ok.mean()) if len(ok) else 0.0,
+            })
+    return pd.DataFrame(rows)
+
+
+def plot_integration(
+        t: np.ndarray,
+        a: np.ndarray,
+        axis: str,
+        v: Optional[np.ndarray] = None,
+        p: Optional[np.ndarray] = None) -> plt.Figure:
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    if v is None and p is None:
+        mean = a.mean()
+        std = a.std()
+        ax.plot(t, a, label=f'{axis} Acceleration (V) (mean={mean:.2f}, std={std:.2f})')
+    else:
+        ax.plot(t, a, label=f'{axis} Acceleration (V)')
+    if v is not None:
+        # Need to try to detrend the drift in velocity?
+        ax.plot(t, v, label=f'{axis} Velocity (in/s)')
+    if p is not None:
+        ax.plot(t, p, label=f'{axis} Displacement (in)')
+    ax.legend()
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('Value')
+    ax.set_title(f'{axis} Acceleration → Velocity → Displacement')
+    return fig
+
 
 def plotaccels(
         t: np.ndarray[Any, np.dtype[np.floating[Any]]],
@@ -43,36 +129,51 @@ def plotaccels(
         raise ValueError("All input arrays must have the same length.")
     if suppressVelocity :
         suppressPosition = True
-    plt.figure(figsize=(10, 6))
     v=None
     p=None
-    if suppressPosition and suppressVelocity :
-        mean = a.mean()
-        std = a.std()
-        plt.plot(t, a, label=f'{axis} Acceleration (V) (mean={mean:.2f}, std={std:.2f})')
-    else:
-        plt.plot(t, a, label=f'{axis} Acceleration (V)')
     if not suppressVelocity :
-        # Need to try to detrend the drift in velocity?
-        v = cumulative_simpson(y=a, x=t, initial=0)
-        plt.plot(t, v, label=f'{axis} Velocity (in/s)')
-    if not suppressPosition:
-        p = cumulative_simpson(y=v, x=t, initial=0)
-        plt.plot(t, p, label=f'{axis} Displacement (in)')
-    plt.legend()
-    plt.xlabel('Time (s)')
-    plt.ylabel('Value')
-    plt.title(f'{axis} Acceleration → Velocity → Displacement')
+        v, p = integrate(t, a)
+    import matplotlib.pyplot as plt
+
+    plot_integration(t, a, axis, v, None if suppressPosition else p)
     plt.show()
 
-    return v, p
+    return v, None if suppressPosition else p
+
+
+if __name__ == "__main__":
+    # Load data
+    source_folder = pathlib.Path(r"D:\Reverse Telescope Test\accel\Session_2025-10-29_163326")
+    csv_files = glob.glob(str(source_folder / "*.csv"))
+    try :
+        df_list = [pd.read_csv(f) for f in csv_files[0:10]] # 50 files will eat up about 8 gigs of ram
+        df = pd.concat(df_list, ignore_index=True)
+    except MemoryError as e:
+        print("Memory error, you may have too much data.")
+        print(e)
+        if len(csv_files) > 5 :
+            df_list = [pd.read_csv(f) for f in csv_files[0:5]]
+        else:
+            df_list = [pd.read_csv(csv_files[0])]
+        df = pd.read_csv(pathlib.Path.joinpath(source_folder, "*.csv"))
+    except Exception as e :
+        print(e)
+
+
+    t = df['RelativeTime_s'].values
+    ax = df['Mirror_X_g'].values - df['Mirror_X_g'].median() # accel output from matlab is in g's. g = 386.1 inches/sec^2 For now just get raw V
+    ay = df['Mirror_Y_g'].values - df['Mirror_Y_g'].median()
+    az = df['Mirror_Z_g'].values - df['Mirror_Z_g'].median()
+    aarm = df['Desk_Y_g'].values - df['Desk_Y_g'].median()
 
-vx, px = plotaccels(t, ax, "X", suppressPosition=True, suppressVelocity=False)
-vy, py = plotaccels(t, ay, "Y", suppressPosition=True, suppressVelocity=False)
-vz, pz = plotaccels(t, az, "Z", suppressPosition=True, suppressVelocity=False)
-varm, parm = plotaccels(t, aarm, "Desk Y", suppressPosition=True, suppressVelocity=False)
+    vx, px = plotaccels(t, ax, "X", suppressPosition=True, suppressVelocity=False)
+    vy, py = plotaccels(t, ay, "Y", suppressPosition=True, suppressVelocity=False)
+    vz, pz = plotaccels(t, az, "Z", suppressPosition=True, suppressVelocity=False)
+    varm, parm = plotaccels(t, aarm, "Desk Y", suppressPosition=True, suppressVelocity=False)
 #
 # # Integration using Runge-Kutta (solve_ivp)
+# from scipy.integrate import solve_ivp
+# from scipy.interpolate import interp1d
 # # Interpolation for acceleration
 # ax_fun = interp1d(t, ax, kind='linear', fill_value='extrapolate')
 #
@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import io
+import json
 import re
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+from stage_profile import stage, staged
+
 
 # ---- Configuration -----------------------------------------------------------
 
@@ -19,6 +24,12 @@ EXPECTED_COLUMNS = [
     "Desk_Y_g",
 ]
 
+# Storage precision of the acceleration columns: "float64", or "float32" for half the memory. float32 changes a value
+# by at most 6e-8 g (|a| <= 1 g with the DAQ's +-10 V range at gain 100), far below the DAQ's ~3e-5 g step. Times
+# always stay float64: float32 cannot resolve 0.1 ms after ~30 minutes. Sums, spectra averages and integrals over the
+# data accumulate in float64 either way.
+PRECISIONS = ("float64", "float32")
+
 # Regex to parse names like:
 #   AccelData_2025-10-14_160804_File0001.csv
 FILENAME_RE = re.compile(
@@ -49,6 +60,12 @@ def parse_filename_info(path: Path) -> Tuple[pd.Timestamp, int]:
     return session_start, file_index
 
 
+def _column_dtypes(precision: str = "float64") -> dict:
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {PRECISIONS}, got {precision!r}")
+    return {"RelativeTime_s": "float64", **{c: precision for c in EXPECTED_COLUMNS[2:]}}
+
+
 def _validate_columns(df: pd.DataFrame, strict: bool = True) -> None:
     # Strip any whitespace and normalize column names (common CSV quirk)
     df.columns = [c.strip() for c in df.columns]
@@ -61,36 +78,149 @@ def read_single_csv(
     path: Path,
     strict_columns: bool = True,
     dtype_floats: Optional[dict] = None,
+    precision: str = "float64",
+    qc: Optional[QCOptions] = None,
 ) -> pd.DataFrame:
     """
     Read one accelerometer CSV into a DataFrame with parsed timestamps.
     Adds columns: source_file, file_index, session_start, t_abs_s (computed later).
+    precision is the dtype of the acceleration columns (see PRECISIONS) unless dtype_floats gives them all.
+    With qc, the data-quality pass runs on the parsed rows and adds a boolean <channel>_ok column per channel
+    (False in flagged minutes); see qc_frame.
     """
+    return _read_csv(path, strict_columns, dtype_floats, precision, qc)[0]
+
+
+def _read_csv(
+    path: Path,
+    strict_columns: bool,
+    dtype_floats: Optional[dict],
+    precision: str,
+    qc: Optional[QCOptions],
+) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+    # read_single_csv, also returning the per-minute QC table (None without qc)
     if dtype_floats is None:
-        dtype_floats = {
-            "RelativeTime_s": "float64",
-            "Mirror_Y_g": "float64",
-            "Mirror_X_g": "float64",
-            "Mirror_Z_g": "float64",
-            "Desk_Y_g": "float64",
-        }
+        dtype_floats = _column_dtypes(precision)
 
     session_start, file_index = parse_filename_info(Path(path))
 
-    df = pd.read_csv(
-        path,
-        # If you ever see odd headers or leading spaces, engine="python" can help:
-        # engine="python",
-        dtype=dtype_floats,
-    )
+    with stage("read_csv.parse") as st:
+        df = pd.read_csv(
+            path,
+            # If you ever see odd headers or leading spaces, engine="python" can help:
+            # engine="python",
+            dtype=dtype_floats,
+        )
+        st.count = len(df)
+
+    df = _prepare_frame(df, path, session_start, file_index, strict_columns)
+    if qc is None:
+        return df, None
+    with stage("read_csv.qc", count=len(df)):
+        table = qc_frame(df, qc)
+        for channel in QC_CHANNELS:
+            if channel in df.columns:
+                df[f"{channel}_ok"] = qc_good_mask(table, df["t_rel_s"].to_numpy(), channel)
+    return df, table
+
+
+def iter_csv_chunks(
+    path: Path | str,
+    chunksize: int = 200_000,
+    strict_columns: bool = True,
+    dtype_floats: Optional[dict] = None,
+    precision: str = "float64",
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream one accelerometer CSV as DataFrames of at most `chunksize` rows, each prepared like read_single_csv.
+    Use this when a session is too long to hold in memory at 10 kHz.
+    """
+    if dtype_floats is None:
+        dtype_floats = _column_dtypes(precision)
+
+    session_start, file_index = parse_filename_info(Path(path))
+    with pd.read_csv(path, dtype=dtype_floats, chunksize=chunksize) as reader:
+        for df in reader:
+            yield _prepare_frame(df, path, session_start, file_index, strict_columns)
+
 
+def _csv_header(path: Path) -> Tuple[List[str], int]:
+    # Column names and the byte offset of the first data row ("%" comment lines, as in the EventData CSVs, skipped)
+    with open(path, "rb") as f:
+        for line in iter(f.readline, b""):
+            if not line.startswith(b"%"):
+                return [c.strip() for c in line.decode().split(",")], f.tell()
+    raise ValueError(f"No header line in {path}")
+
+
+def iter_csv_blocks(
+    path: Path | str,
+    block_bytes: int = 32 << 20,
+    usecols: Optional[List[str]] = None,
+) -> Iterator[Tuple[int, np.ndarray, pd.DataFrame]]:
+    """
+    Stream one accelerometer CSV as (index of the block's first row, byte offset of every row, DataFrame) in blocks of
+    about block_bytes cut at line ends. AbsoluteTime is left as text and no columns are added; the byte offsets let
+    read_csv_window load any span later with a seek instead of a rescan. A half-written last line is left out.
+    """
+    path = Path(path)
+    columns, pos = _csv_header(path)
+    keep = usecols or columns
+    dtype = {c: "float64" for c in EXPECTED_COLUMNS[1:] if c in keep}
+    row0 = 0
+    tail = b""
+    with open(path, "rb") as f:
+        f.seek(pos)
+        for data in iter(lambda: f.read(block_bytes), b""):
+            buf = tail + data
+            cut = buf.rfind(b"\n") + 1
+            block, tail = buf[:cut], buf[cut:]
+            if not block:
+                continue
+            line_ends = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+            offsets = pos + np.concatenate(([0], line_ends[:-1] + 1))
+            df = pd.read_csv(io.BytesIO(block), header=None, names=columns, usecols=usecols, dtype=dtype,
+                             skip_blank_lines=False)
+            yield row0, offsets, df
+            row0 += len(offsets)
+            pos += cut
+
+
+def read_csv_window(
+    path: Path | str,
+    byte_offset: int,
+    nrows: int,
+    strict_columns: bool = True,
+) -> pd.DataFrame:
+    """
+    nrows rows of one accelerometer CSV starting at byte_offset (a row offset from iter_csv_blocks or an event index),
+    prepared like read_single_csv.
+    """
+    path = Path(path)
+    columns, _ = _csv_header(path)
+    session_start, file_index = parse_filename_info(path)
+    with open(path, "rb") as f:
+        f.seek(int(byte_offset))
+        df = pd.read_csv(f, header=None, names=columns, nrows=int(nrows),
+                         dtype={c: "float64" for c in EXPECTED_COLUMNS[1:] if c in columns})
+    return _prepare_frame(df, path, session_start, file_index, strict_columns)
+
+
+def _prepare_frame(
+    df: pd.DataFrame,
+    path: Path | str,
+    session_start: pd.Timestamp,
+    file_index: int,
+    strict_columns: bool,
+) -> pd.DataFrame:
     _validate_columns(df, strict=strict_columns)
 
     # Parse AbsoluteTime; the data looks like "YYYY-MM-DD HH:MM:SS.sss"
     # We'll coerce errors to NaT and then drop if any appear.
-    df["AbsoluteTime"] = pd.to_datetime(
-        df["AbsoluteTime"], format="%Y-%m-%d %H:%M:%S.%f", errors="coerce"
-    )
+    with stage("read_csv.timestamps", count=len(df)):
+        df["AbsoluteTime"] = pd.to_datetime(
+            df["AbsoluteTime"], format="%Y-%m-%d %H:%M:%S.%f", errors="coerce"
+        )
     bad = df["AbsoluteTime"].isna().sum()
     if bad:
         raise ValueError(f"{bad} rows have unparsable AbsoluteTime in {path}")
@@ -106,12 +236,16 @@ def read_single_csv(
     return df
 
 
+@staged("read_many_csvs", count=len)
 def read_many_csvs(
     file_paths: Iterable[Path | str] | Path | str = (),
     directory: Optional[Path | str] = None,
     glob_pattern: str = "AccelData_*.csv",
     sort_by: str = "AbsoluteTime",
     strict_columns: bool = True,
+    precision: str = "float64",
+    qc: Optional[QCOptions] = None,
+    save_qc: bool = False,
 ) -> pd.DataFrame:
     """
     Read & concatenate many CSVs. You can pass an iterable of paths OR a directory.
@@ -124,6 +258,10 @@ def read_many_csvs(
         glob_pattern: filename pattern (default matches your naming convention)
         sort_by: "AbsoluteTime" (default) or "file_index" to force file order
         strict_columns: if True, raise when expected columns are missing
+        precision: "float64" or "float32" acceleration columns (see PRECISIONS); t_abs_s is always float64
+        qc: run the data-quality pass while reading (adds <channel>_ok columns, see read_single_csv)
+        save_qc: with qc, also store each file's flags in its session's accel_qc.json (see load_session_qc).
+            Off by default, so analysis runs never write into the raw session folders.
 
     Returns:
         pandas.DataFrame with all rows and added metadata columns.
@@ -144,7 +282,19 @@ def read_many_csvs(
         raise FileNotFoundError("No CSV files found.")
 
     # Read all
-    frames = [read_single_csv(p, strict_columns=strict_columns) for p in paths]
+    frames = []
+    tables: Dict[Path, Dict[str, pd.DataFrame]] = {}
+    for p in paths:
+        df, table = _read_csv(p, strict_columns, None, precision, qc)
+        frames.append(df)
+        if table is not None:
+            tables.setdefault(p.parent, {})[p.name] = table
+    if save_qc:
+        for session_dir, session_tables in tables.items():
+            try:
+                save_session_qc(session_dir, session_tables, qc)
+            except OSError as e:  # read-only share: the flags are still in the <channel>_ok columns
+                print(f"[qc] Could not save flags for {session_dir}: {e}")
 
     # Sort: by AbsoluteTime (default) or by file index if you prefer strict file order
     if sort_by == "file_index":
@@ -152,11 +302,13 @@ def read_many_csvs(
     else:  # "AbsoluteTime"
         frames.sort(key=lambda f: f["AbsoluteTime"].min())
 
-    df = pd.concat(frames, ignore_index=True)
+    with stage("read_many_csvs.concat") as st:
+        df = pd.concat(frames, ignore_index=True)
 
-    # Compute continuous absolute time in seconds starting at 0 from the earliest stamp
-    t0 = df["AbsoluteTime"].min()
-    df["t_abs_s"] = (df["AbsoluteTime"] - t0).dt.total_seconds().astype("float64")
+        # Compute continuous absolute time in seconds starting at 0 from the earliest stamp
+        t0 = df["AbsoluteTime"].min()
+        df["t_abs_s"] = (df["AbsoluteTime"] - t0).dt.total_seconds().astype("float64")
+        st.count = len(df)
 
     return df
 
@@ -178,4 +330,266 @@ def estimate_sample_rate_hz(
         dt_est = np.median(dt)
     else:
         dt_est = dt.mean()
-    return float(1.0 / dt_est) if dt_est > 0 else float("inf")
\ No newline at end of file
+    return float(1.0 / dt_est) if dt_est > 0 else float("inf")
+
+# ---- Data quality -------------------------------------------------------------
+
+# The DAQ reads +-10 V (accel_readout.m, accel_event.m); at the conditioner's 100x gain and the sensors' 0.1 V/g that
+# is +-1 g, so |a| near SATURATION_G is a clipped sample.
+DAQ_RANGE_V = 10.0
+HARDWARE_GAIN = 100.0
+SENSITIVITY_V_PER_G = 0.100
+SATURATION_G = DAQ_RANGE_V / HARDWARE_GAIN / SENSITIVITY_V_PER_G
+
+QC_CHANNELS = EXPECTED_COLUMNS[2:]
+QC_FILENAME = "accel_qc.json"
+QC_VERSION = 1
+
+
+@dataclass
+class QCOptions:
+    minute_s: float = 60.0              # length of the spans flagged
+    saturation_fraction: float = 0.999  # |a| >= this * SATURATION_G is clipped
+    flat_ptp_g: float = 1e-5            # a minute with less peak-to-peak than this (under one DAQ step) is flat
+    offset_step_g: float = 0.01         # mean change from the previous minute that is an offset step ...
+    offset_step_sigma: float = 5.0      # ... if it is also this many standard deviations of the two minutes
+    jitter_tolerance: float = 0.5       # a sample interval off the median by more than this fraction is bad ...
+    jitter_fraction: float = 1e-3       # ... and a minute with more than this fraction of bad intervals is flagged
+
+
+def qc_frame(df: pd.DataFrame, opts: Optional[QCOptions] = None) -> pd.DataFrame:
+    """
+    Data-quality flags of one file (read_single_csv output), one row per minute of t_rel_s:
+    start_s, end_s, rows, bad_intervals and jitter (sample-interval problems: dropped, repeated or late samples), and
+    per channel <channel>_saturated and <channel>_nan (sample counts), <channel>_mean, <channel>_std,
+    <channel>_ptp, <channel>_flat and <channel>_offset_step (mean jumped from the previous minute).
+    Computed with one vectorized pass per column (no Python loop over samples or minutes).
+    """
+    opts = opts or QCOptions()
+    t = df["t_rel_s"].to_numpy(dtype=np.float64)
+    if not len(t):
+        return pd.DataFrame()
+    t_filled = pd.Series(t).ffill().bfill().fillna(0.0).to_numpy()
+    minute = np.maximum.accumulate(((t_filled - t_filled[0]) // opts.minute_s).astype(np.int64))
+    first = np.flatnonzero(np.concatenate(([True], np.diff(minute) != 0)))
+    rows = np.diff(np.append(first, len(t)))
+    out = {
+        "start_s": t_filled[first],
+        "end_s": np.maximum.reduceat(t_filled, first),
+        "rows": rows,
+    }
+
+    dt = np.diff(t_filled)
+    nominal = np.median(dt) if len(dt) else np.nan
+    bad_dt = np.abs(dt / nominal - 1.0) > opts.jitter_tolerance if nominal > 0 else np.zeros(len(dt), dtype=bool)
+    bad_dt = np.concatenate(([False], bad_dt)) | np.isnan(t)  # an interval belongs to the minute of its later sample
+    out["bad_intervals"] = np.add.reduceat(bad_dt.astype(np.int64), first)
+    out["jitter"] = out["bad_intervals"] > opts.jitter_fraction * rows
+
+    limit = opts.saturation_fraction * SATURATION_G
+    for channel in QC_CHANNELS:
+        if channel not in df.columns:
+            continue
+        x = df[channel].to_numpy(dtype=np.float64)
+        valid = np.isfinite(x)
+        n = np.add.reduceat(valid.astype(np.int64), first)
+        x0 = np.where(valid, x, 0.0)
+        mean = np.add.reduceat(x0, first) / np.maximum(n, 1)
+        var = np.add.reduceat(x0 * x0, first) / np.maximum(n, 1) - mean ** 2
+        std = np.sqrt(np.maximum(var, 0.0))
+        ptp = (np.maximum.reduceat(np.where(valid, x, -np.inf), first)
+               - np.minimum.reduceat(np.where(valid, x, np.inf), first))
+        mean_step = np.abs(np.diff(mean, prepend=mean[0]))
+        pooled = np.sqrt((std ** 2 + np.concatenate(([std[0]], std[:-1])) ** 2) / 2)
+        out[f"{channel}_saturated"] = np.add.reduceat((np.abs(x0) >= limit).astype(np.int64), first)
+        out[f"{channel}_nan"] = rows - n
+        out[f"{channel}_mean"] = np.where(n > 0, mean, np.nan)
+        out[f"{channel}_std"] = std
+        out[f"{channel}_ptp"] = np.where(n > 0, ptp, np.nan)
+        out[f"{channel}_flat"] = (n > 1) & (ptp < opts.flat_ptp_g)
+        out[f"{channel}_offset_step"] = (mean_step > opts.offset_step_g) & (mean_step > opts.offset_step_sigma * pooled)
+    return pd.DataFrame(out)
+
+
+def qc_bad_minutes(table: pd.DataFrame, channel: Optional[str] = None) -> np.ndarray:
+    """
+    Minutes of a qc_frame table with any flag on `channel` (or on any channel), including jitter.
+    """
+    channels = [channel] if channel else [c for c in QC_CHANNELS if f"{c}_nan" in table.columns]
+    bad = table["jitter"].to_numpy(dtype=bool).copy()
+    for c in channels:
+        if f"{c}_nan" not in table.columns:
+            continue
+        bad |= (table[f"{c}_saturated"].to_numpy() > 0) | (table[f"{c}_nan"].to_numpy() > 0)
+        bad |= table[f"{c}_flat"].to_numpy(dtype=bool) | table[f"{c}_offset_step"].to_numpy(dtype=bool)
+    return bad
+
+
+def qc_good_mask(table: pd.DataFrame, t_rel_s: np.ndarray, channel: Optional[str] = None) -> np.ndarray:
+    """
+    True for the samples (at times t_rel_s of the same file) outside the minutes flagged on `channel`.
+    """
+    if not len(table):
+        return np.ones(len(t_rel_s), dtype=bool)
+    idx = np.searchsorted(table["start_s"].to_numpy(), t_rel_s, side="right") - 1
+    return ~qc_bad_minutes(table, channel)[np.clip(idx, 0, len(table) - 1)]
+
+
+def qc_bad_spans(table: pd.DataFrame, channel: Optional[str] = None) -> List[Tuple[float, float]]:
+    """
+    (start_s, end_s) in t_rel_s of each run of flagged minutes, e.g. to shade on a plot or to skip when reading.
+    """
+    bad = qc_bad_minutes(table, channel)
+    edges = np.diff(bad.astype(np.int8), prepend=0, append=0)
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+    return [(float(table["start_s"].iloc[s]), float(table["end_s"].iloc[e])) for s, e in zip(starts, ends)]
+
+
+def qc_summary(tables: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    One row per file of {file name: qc_frame table}: minutes, flagged minutes, and the minutes with each kind of flag.
+    """
+    rows = []
+    for name, table in tables.items():
+        channels = [c for c in QC_CHANNELS if f"{c}_nan" in table.columns]
+        row = {"file": name, "minutes": len(table), "bad_minutes": int(qc_bad_minutes(table).sum()),
+               "jitter": int(table["jitter"].sum()) if len(table) else 0}
+        for flag in ("saturated", "nan", "flat", "offset_step"):
+            hit = np.zeros(len(table), dtype=bool)
+            for c in channels:
+                hit |= table[f"{c}_{flag}"].to_numpy() > 0
+            row[flag] = int(hit.sum())
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def save_session_qc(session_dir: Path | str, tables: Dict[str, pd.DataFrame], opts: Optional[QCOptions] = None) -> Path:
+    """
+    Store the QC tables of some files of a session in <session>/accel_qc.json, next to the entries already there.
+    Each entry keeps the file's size and mtime, so load_session_qc ignores it once the file changes.
+    """
+    session_dir = Path(session_dir)
+    path = session_dir / QC_FILENAME
+    saved = _read_qc_file(path)
+    options = asdict(opts or QCOptions())
+    for name, table in tables.items():
+        st = (session_dir / name).stat()
+        saved[name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "options": options,
+                       "minutes": table.to_dict(orient="list")}
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"version": QC_VERSION, "files": saved}, f)
+    tmp.replace(path)
+    return path
+
+
+def load_session_qc(session_dir: Path | str, opts: Optional[QCOptions] = None) -> Dict[str, pd.DataFrame]:
+    """
+    The QC tables stored for a session, {file name: qc_frame table}, for the files unchanged since they were checked
+    (and checked with opts, if given).
+    """
+    session_dir = Path(session_dir)
+    tables = {}
+    for name, entry in _read_qc_file(session_dir / QC_FILENAME).items():
+        path = session_dir / name
+        if opts is not None and entry.get("options") != asdict(opts):
+            continue
+        if path.exists() and (path.stat().st_size, path.stat().st_mtime_ns) == (entry["size"], entry["mtime_ns"]):
+            tables[name] = pd.DataFrame(entry["minutes"])
+    return tables
+
+
+def _read_qc_file(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        saved = json.load(f)
+    return saved.get("files", {}) if saved.get("version") == QC_VERSION else {}
+
+
+def check_session(
+    session_dir: Path | str,
+    opts: Optional[QCOptions] = None,
+    glob_pattern: str = "AccelData_*.csv",
+    save: bool = False,
+) -> Dict[str, pd.DataFrame]:
+    """
+    QC tables of every file of a session, reading one file at a time (flags only; the data are not kept).
+    Files already checked and unchanged are taken from accel_qc.json; with save, the newly checked ones are added to it.
+    """
+    session_dir = Path(session_dir)
+    opts = opts or QCOptions()
+    tables = load_session_qc(session_dir, opts)
+    new = {}
+    for path in sorted(session_dir.glob(glob_pattern)):
+        if path.name not in tables:
+            new[path.name] = _read_csv(path, True, None, "float32", opts)[1]
+    if new and save:
+        try:
+            save_session_qc(session_dir, new, opts)
+        except OSError as e:
+            print(f"[qc] Could not save flags for {session_dir}: {e}")
+    tables.update(new)
+    return dict(sorted(tables.items()))
+
+# ---- Session catalog ----------------------------------------------------------
+
+def _last_line(path: Path, block: int = 4096) -> str:
+    # Last complete line of a file, reading only its tail
+    with open(path, "rb") as f:
+        f.seek(0, 2)
+        size = f.tell()
+        f.seek(max(0, size - block))
+        lines = [line for line in f.read().splitlines() if line.strip()]
+    return lines[-1].decode(errors="replace") if lines else ""
+
+
+def catalog_file(path: Path | str, head_rows: int = 1000) -> dict:
+    """
+    Start, end, sample rate and approximate row count of one CSV, from its first head_rows rows and its last line
+    only, so a whole archive can be listed without reading it.
+    """
+    path = Path(path)
+    session_start, file_index = parse_filename_info(path)
+    head = pd.read_csv(path, nrows=head_rows)
+    head.columns = [c.strip() for c in head.columns]
+    start = pd.to_datetime(head["AbsoluteTime"].iloc[0], format="%Y-%m-%d %H:%M:%S.%f")
+    fields = _last_line(path).split(",")
+    try:
+        end = pd.to_datetime(fields[list(head.columns).index("AbsoluteTime")], format="%Y-%m-%d %H:%M:%S.%f")
+    except (ValueError, IndexError):
+        end = pd.NaT  # file still being written, or a truncated last line
+    fs = estimate_sample_rate_hz(head["RelativeTime_s"])
+    duration = (end - start).total_seconds() if pd.notna(end) else float("nan")
+    return {
+        "session": path.parent.name,
+        "file": path.name,
+        "file_index": file_index,
+        "session_start": session_start,
+        "start": start,
+        "end": end,
+        "duration_s": duration,
+        "sample_rate_hz": fs,
+        "rows_est": int(round(duration * fs)) + 1 if np.isfinite(duration) and np.isfinite(fs) else None,
+        "bytes": path.stat().st_size,
+    }
+
+
+def catalog_sessions(
+    root: Path | str,
+    glob_pattern: str = "AccelData_*.csv",
+) -> pd.DataFrame:
+    """
+    catalog_file for every accelerometer CSV anywhere under `root` (one session folder or the whole archive),
+    one row per file sorted by session and file index. Files that cannot be read are listed with an "error".
+    """
+    rows = []
+    for path in sorted(Path(root).rglob(glob_pattern)):
+        try:
+            rows.append(catalog_file(path))
+        except Exception as e:
+            rows.append({"session": path.parent.name, "file": path.name, "error": str(e)})
+    df = pd.DataFrame(rows)
+    if len(df):
+        df = df.sort_values(["session", "file"], ignore_index=True)
+    return df
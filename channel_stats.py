@@ -0,0 +1,408 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Whole-archive statistics per channel without holding the data in memory. Every channel of an accelerometer
+# session, temperature log or centroid series gets exact count / mean / variance / min / max plus a quantile sketch,
+# filled in one streamed pass over the file. Given a cache file (or folder), results are saved there, one entry per
+# file, and reused while the file is unchanged; nothing is written next to the data. Stats of files, sessions and the
+# whole archive are merged, not recomputed.
+# The sketch keeps counts in logarithmic buckets (as in DDSketch): every quantile it returns is within
+# relative_accuracy (0.5% by default) of the true value, a few thousand buckets cover 1e-9 .. 1e6, and merging two
+# sketches just adds their counts, so the median of a whole session is exact to 0.5% without re-reading any file.
+# Use the medians as baselines (e.g. the per-axis offset accel_integration removes) and robust_limits() for outlier
+# cutoffs (e.g. the FWHM limits of dot_fit.filter_fits).
+
+RELATIVE_ACCURACY = 0.005
+STATS_VERSION = 1
+ACCEL_STATS_FILENAME = "accel_stats.json"
+STATS_SUFFIX = ".stats.json"
+ACCEL_CHANNELS = ["Mirror_Y_g", "Mirror_X_g", "Mirror_Z_g", "Desk_Y_g"]
+CENTROID_CHANNELS = ["mu_x", "mu_y", "sigma_x", "sigma_y", "fwhm_x", "fwhm_y", "amp_x", "amp_y"]
+TABLE_QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative error: counts of |x| in buckets (gamma^(i-1), gamma^i], kept separately
+    for positive and negative values, plus a count of values too close to zero to bucket.
+    """
+
+    MIN_MAGNITUDE = 1e-12
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._ln_gamma = math.log(self.gamma)
+        self.pos: Dict[int, int] = {}
+        self.neg: Dict[int, int] = {}
+        self.zero = 0
+
+    @property
+    def count(self) -> int:
+        return self.zero + sum(self.pos.values()) + sum(self.neg.values())
+
+    def add(self, values: np.ndarray) -> None:
+        """
+        Add finite values (NaN/inf are ignored).
+        """
+        x = np.asarray(values, dtype=np.float64)
+        x = x[np.isfinite(x)]
+        mag = np.abs(x)
+        tiny = mag < self.MIN_MAGNITUDE
+        self.zero += int(tiny.sum())
+        for store, sel in ((self.pos, (x > 0) & ~tiny), (self.neg, (x < 0) & ~tiny)):
+            if not sel.any():
+                continue
+            idx = np.ceil(np.log(mag[sel]) / self._ln_gamma).astype(np.int64)
+            lo = int(idx.min())
+            counts = np.bincount(idx - lo)
+            for k in np.flatnonzero(counts):
+                key = lo + int(k)
+                store[key] = store.get(key, 0) + int(counts[k])
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if not math.isclose(other.gamma, self.gamma):
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for store, extra in ((self.pos, other.pos), (self.neg, other.neg)):
+            for key, n in extra.items():
+                store[key] = store.get(key, 0) + n
+        self.zero += other.zero
+
+    def _value(self, keys: np.ndarray) -> np.ndarray:
+        # Value of a bucket with relative error at most relative_accuracy over the whole bucket
+        return 2 * np.power(self.gamma, keys) / (self.gamma + 1)
+
+    def quantile(self, q: float | Sequence[float]) -> float | np.ndarray:
+        """
+        Value at quantile(s) q in [0, 1]; NaN for an empty sketch.
+        """
+        qs = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        neg_keys = np.array(sorted(self.neg, reverse=True), dtype=np.float64)
+        pos_keys = np.array(sorted(self.pos), dtype=np.float64)
+        values = np.concatenate([-self._value(neg_keys), [0.0], self._value(pos_keys)])
+        counts = np.concatenate([
+            [self.neg[int(k)] for k in neg_keys], [self.zero], [self.pos[int(k)] for k in pos_keys],
+        ]).astype(np.float64)
+        n = counts.sum()
+        if n == 0:
+            out = np.full(qs.shape, np.nan)
+        else:
+            cum = np.cumsum(counts)
+            rank = np.clip(qs, 0, 1) * (n - 1)
+            out = values[np.searchsorted(cum, rank, side="right")]
+        return float(out[0]) if np.ndim(q) == 0 else out
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "zero": self.zero,
+            "pos": [[k, n] for k, n in sorted(self.pos.items())],
+            "neg": [[k, n] for k, n in sorted(self.neg.items())],
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "QuantileSketch":
+        sketch = cls(d["relative_accuracy"])
+        sketch.zero = int(d["zero"])
+        sketch.pos = {int(k): int(n) for k, n in d["pos"]}
+        sketch.neg = {int(k): int(n) for k, n in d["neg"]}
+        return sketch
+
+
+class ChannelStats:
+    """
+    Exact count, NaN count, mean, variance, min and max of one channel (float64 accumulation, chunks combined with
+    Chan's parallel update) and a QuantileSketch of its values.
+    """
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY):
+        self.count = 0
+        self.nan = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance) if self.count > 1 else math.nan
+
+    def _combine(self, n: int, mean: float, m2: float) -> None:
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    def add(self, values: np.ndarray) -> None:
+        x = np.asarray(values)
+        finite = np.isfinite(x)
+        self.nan += int(x.size - finite.sum())
+        x = x[finite]
+        if x.size == 0:
+            return
+        mean = float(np.mean(x, dtype=np.float64))
+        m2 = float(np.sum(np.square(np.subtract(x, mean, dtype=np.float64))))
+        self._combine(x.size, mean, m2)
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+        self.sketch.add(x)
+
+    def merge(self, other: "ChannelStats") -> None:
+        self.nan += other.nan
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    def quantile(self, q: float | Sequence[float]) -> float | np.ndarray:
+        """
+        Sketch quantile(s), clamped to the exact min/max (so q=0 and q=1 are exact).
+        """
+        return np.clip(self.sketch.quantile(q), self.min, self.max) if self.count else self.sketch.quantile(q)
+
+    @property
+    def median(self) -> float:
+        return float(self.quantile(0.5))
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count, "nan": self.nan, "mean": self.mean, "m2": self.m2,
+            "min": self.min if self.count else None, "max": self.max if self.count else None,
+            "sketch": self.sketch.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ChannelStats":
+        st = cls(d["sketch"]["relative_accuracy"])
+        st.count, st.nan, st.mean, st.m2 = int(d["count"]), int(d["nan"]), float(d["mean"]), float(d["m2"])
+        st.min = d["min"] if d["min"] is not None else math.inf
+        st.max = d["max"] if d["max"] is not None else -math.inf
+        st.sketch = QuantileSketch.from_dict(d["sketch"])
+        return st
+
+
+def robust_limits(stats: ChannelStats, k: float = 5.0) -> Tuple[float, float]:
+    """
+    median +- k robust sigmas, with sigma from the interquartile range (IQR / 1.349, exact for Gaussian data).
+    """
+    q25, q50, q75 = stats.quantile([0.25, 0.5, 0.75])
+    sigma = (q75 - q25) / 1.349
+    return float(q50 - k * sigma), float(q50 + k * sigma)
+
+
+class StatsSet:
+    """
+    ChannelStats for each channel of one file, session or archive.
+    """
+
+    def __init__(self, channels: Iterable[str] = (), relative_accuracy: float = RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.channels: Dict[str, ChannelStats] = {c: ChannelStats(relative_accuracy) for c in channels}
+
+    def __getitem__(self, channel: str) -> ChannelStats:
+        return self.channels[channel]
+
+    def add_frame(self, df: pd.DataFrame) -> None:
+        for c, st in self.channels.items():
+            if c in df.columns:
+                st.add(df[c].to_numpy())
+
+    def merge(self, other: "StatsSet") -> "StatsSet":
+        for c, st in other.channels.items():
+            if c not in self.channels:
+                self.channels[c] = ChannelStats(self.relative_accuracy)
+            self.channels[c].merge(st)
+        return self
+
+    def medians(self) -> Dict[str, float]:
+        return {c: st.median for c, st in self.channels.items()}
+
+    def table(self, quantiles: Sequence[float] = TABLE_QUANTILES) -> pd.DataFrame:
+        """
+        One row per channel: count, nan, mean, std, min, the given quantiles (p01 ... p99) and max.
+        """
+        rows = {}
+        for c, st in self.channels.items():
+            row = {"count": st.count, "nan": st.nan, "mean": st.mean if st.count else math.nan, "std": st.std,
+                   "min": st.min if st.count else math.nan}
+            for q, v in zip(quantiles, np.atleast_1d(st.quantile(quantiles))):
+                row[f"p{round(q * 100):02d}"] = v
+            row["max"] = st.max if st.count else math.nan
+            rows[c] = row
+        return pd.DataFrame.from_dict(rows, orient="index")
+
+    def to_dict(self) -> dict:
+        return {c: st.to_dict() for c, st in self.channels.items()}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "StatsSet":
+        out = cls()
+        out.channels = {c: ChannelStats.from_dict(v) for c, v in d.items()}
+        if out.channels:
+            out.relative_accuracy = next(iter(out.channels.values())).sketch.relative_accuracy
+        return out
+
+
+def merge_all(sets: Iterable[StatsSet]) -> StatsSet:
+    out = StatsSet()
+    for s in sets:
+        out.merge(s)
+    return out
+
+
+# ---- One pass per source -----------------------------------------------------
+
+def accel_file_stats(path: Path | str, channels: Sequence[str] = ACCEL_CHANNELS, chunksize: int = 500_000) -> StatsSet:
+    """
+    Stats of the channels of one AccelData CSV, read in chunks (only those columns are parsed).
+    """
+    stats = StatsSet(channels)
+    with pd.read_csv(path, chunksize=chunksize, usecols=lambda c: c.strip() in channels, dtype=np.float64) as reader:
+        for chunk in reader:
+            chunk.columns = [c.strip() for c in chunk.columns]
+            stats.add_frame(chunk)
+    return stats
+
+
+def temperature_log_stats(path: Path | str, chunksize: int = 500_000) -> StatsSet:
+    """
+    Stats of every reading column of a temperature log (everything after the timestamp), read in chunks.
+    """
+    stats: Optional[StatsSet] = None
+    with pd.read_csv(path, chunksize=chunksize) as reader:
+        for chunk in reader:
+            values = chunk.iloc[:, 1:].apply(pd.to_numeric, errors="coerce")
+            if stats is None:
+                stats = StatsSet(values.columns)
+            stats.add_frame(values)
+    return stats if stats is not None else StatsSet()
+
+
+def centroid_stats(frames: pd.DataFrame, channels: Sequence[str] = CENTROID_CHANNELS) -> StatsSet:
+    """
+    Stats of the centroid/width columns of a FitStore.load() table (only status "ok" rows when there is a status
+    column; fwhm_x/fwhm_y are computed from sigma when missing).
+    """
+    df = frames[frames["status"] == "ok"] if "status" in frames else frames
+    df = df.copy()
+    for axis in ("x", "y"):
+        if f"fwhm_{axis}" not in df and f"sigma_{axis}" in df:
+            df[f"fwhm_{axis}"] = 2 * np.sqrt(2 * np.log(2)) * df[f"sigma_{axis}"]
+    stats = StatsSet([c for c in channels if c in df.columns])
+    stats.add_frame(df)
+    return stats
+
+
+# ---- Saved per file ------------------------------------------------------------
+
+def _load_cache(path: Path) -> Dict[str, dict]:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        saved = json.load(f)
+    return saved.get("files", {}) if saved.get("version") == STATS_VERSION else {}
+
+
+def _save_cache(files: Dict[str, dict], path: Path) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"version": STATS_VERSION, "files": files}, f)
+    os.replace(tmp, path)
+
+
+def cached_file_stats(
+    paths: Sequence[Path | str],
+    compute: Callable[[Path], StatsSet],
+    cache_path: Optional[Path | str] = None,
+) -> Dict[str, StatsSet]:
+    """
+    {file name: compute(file)} for each path. With cache_path, results saved there for files whose size and
+    modification time have not changed are reused, and the new ones are saved there; without it nothing is written.
+    """
+    if cache_path is None:
+        return {Path(p).name: compute(Path(p)) for p in paths}
+    cache_path = Path(cache_path)
+    cache = _load_cache(cache_path)
+    out: Dict[str, StatsSet] = {}
+    changed = False
+    for p in map(Path, paths):
+        st = p.stat()
+        key = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        entry = cache.get(p.name)
+        if entry is not None and all(entry.get(k) == v for k, v in key.items()):
+            out[p.name] = StatsSet.from_dict(entry["stats"])
+            continue
+        out[p.name] = compute(p)
+        cache[p.name] = {**key, "stats": out[p.name].to_dict()}
+        changed = True
+    if changed:
+        _save_cache(cache, cache_path)
+    return out
+
+
+def session_stats(
+    session_dir: Path | str,
+    cache_path: Optional[Path | str] = None,
+    glob_pattern: str = "AccelData_*.csv",
+) -> Tuple[StatsSet, Dict[str, StatsSet]]:
+    """
+    (merged stats of a session, {file name: stats}). With cache_path (e.g. session_cache_path(cache_dir, session_dir))
+    the per-file stats are saved there and reused on the next call; the session folder itself is never written to.
+    """
+    session_dir = Path(session_dir)
+    files = sorted(session_dir.glob(glob_pattern))
+    per_file = cached_file_stats(files, accel_file_stats, cache_path)
+    return merge_all(per_file.values()), per_file
+
+
+def session_cache_path(cache_dir: Path | str, session_dir: Path | str) -> Path:
+    """
+    Where a session's per-file stats go in a cache folder: <cache_dir>/<session name>_accel_stats.json.
+    """
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    return Path(cache_dir) / f"{Path(session_dir).name}_{ACCEL_STATS_FILENAME}"
+
+
+def archive_stats(
+    root: Path | str,
+    glob_pattern: str = "AccelData_*.csv",
+    cache_dir: Optional[Path | str] = None,
+) -> Dict[str, StatsSet]:
+    """
+    {session name: stats} for every folder under root holding accelerometer CSVs; merge_all() gives the archive's.
+    With cache_dir, each session's per-file stats are kept there (see session_cache_path).
+    """
+    sessions = sorted({p.parent for p in Path(root).rglob(glob_pattern)})
+    return {
+        s.name: session_stats(s, session_cache_path(cache_dir, s) if cache_dir else None, glob_pattern)[0]
+        for s in sessions
+    }
+
+
+def temperature_stats(log_paths: Sequence[Path | str], cache_dir: Optional[Path | str] = None) -> StatsSet:
+    """
+    Merged stats of temperature logs. With cache_dir, each log's stats are kept there as <log name>.stats.json.
+    """
+    parts = []
+    for p in map(Path, log_paths):
+        cache_path = None
+        if cache_dir is not None:
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+            cache_path = Path(cache_dir) / (p.name + STATS_SUFFIX)
+        parts.append(cached_file_stats([p], temperature_log_stats, cache_path)[p.name])
+    return merge_all(parts)
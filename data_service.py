@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import io
+import json
+import math
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.parse import parse_qs, urlencode, urlparse
+from urllib.request import urlopen
+
+import numpy as np
+import pandas as pd
+
+# Runs on the machine that holds the data (the Z: share server, the lab PC with the OneDrive copy) so analyses can ask
+# for results instead of copying whole sessions. A small HTTP service over a data root: GET endpoints return spectra,
+# band powers, decimated traces and dot-fit tables as compressed .npz (or JSON for small answers). Heavy requests run
+# on a bounded worker pool; when that and its queue are full the service answers 503 instead of piling up. Answers
+# are cached by request and by the size/mtime of the files they read, so repeating a query is free until the data
+# changes. Paths in requests are relative to the root and cannot leave it, and nothing is written under it (the
+# per-file channel stats behind /accel/stats are kept only if a stats cache folder is given). Binds to localhost
+# unless told otherwise.
+#
+#     python ogre_cli.py serve D:/accel --port 8765            (on the data machine)
+#     client = NearDataClient("http://datahost:8765")
+#     spec = client.get("/accel/spectrum", session="Session_2025-10-14_160804", nperseg_seconds=60)
+#     spec["f"], spec["S"]   # (n_files, n_axes, n_freq), with spec["files"], spec["axes"]
+#
+# Endpoints (query parameters):
+#   /sessions                                   accelerometer session folders under the root, with their files (JSON)
+#   /accel/catalog      session                 per-file time span / sample rate (JSON)
+#   /accel/spectrum     session [file] method nperseg_seconds noverlap_ratio max_f_hz qc=1|0 (skip flagged minutes)
+#   /accel/bandpower    session [file] lo hi [method nperseg_seconds ...]   band power per file and axis (JSON)
+#   /accel/trace        session file [channels] max_points mode=minmax|mean
+#   /accel/stats        session                 channel_stats table (JSON)
+#   /frames/fits        folder [columns]        FitStore results of a capture folder
+
+DEFAULT_PORT = 8765
+CACHE_BYTES = 256 * 2**20
+NPZ_TYPE = "application/x-npz"
+JSON_TYPE = "application/json"
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+class ResultCache:
+    """
+    Thread-safe LRU of encoded answers, bounded by total size.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[tuple, Tuple[bytes, str]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key: tuple, item: Tuple[bytes, str]) -> None:
+        if len(item[0]) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._items[key] = item
+            self._size += len(item[0])
+            while self._size > self.max_bytes:
+                _, (data, _) = self._items.popitem(last=False)
+                self._size -= len(data)
+
+
+def _npz(**arrays) -> Tuple[bytes, str]:
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **arrays)
+    return buf.getvalue(), NPZ_TYPE
+
+
+def _json(obj) -> Tuple[bytes, str]:
+    def clean(v):
+        if isinstance(v, float) and not math.isfinite(v):
+            return None
+        if isinstance(v, dict):
+            return {k: clean(x) for k, x in v.items()}
+        if isinstance(v, list):
+            return [clean(x) for x in v]
+        return v
+    return json.dumps(clean(obj), default=str).encode(), JSON_TYPE
+
+
+class DataService:
+    """
+    The endpoints over one data root, without the HTTP layer (call handle() directly to use it in-process).
+    """
+
+    def __init__(
+        self,
+        root: Path | str,
+        max_workers: int = 4,
+        max_queue: int = 16,
+        cache_bytes: int = CACHE_BYTES,
+        stats_cache_dir: Optional[Path | str] = None,
+    ):
+        self.root = Path(root).resolve()
+        self.stats_cache_dir = Path(stats_cache_dir) if stats_cache_dir is not None else None
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self.cache = ResultCache(cache_bytes)
+        self.routes: Dict[str, Tuple[Callable[[Dict[str, str]], Tuple[bytes, str]], Callable]] = {
+            "/sessions": (self.sessions, lambda q: []),
+            "/accel/catalog": (self.accel_catalog, self._session_files),
+            "/accel/spectrum": (self.accel_spectrum, self._session_files),
+            "/accel/bandpower": (self.accel_bandpower, self._session_files),
+            "/accel/trace": (self.accel_trace, self._session_files),
+            "/accel/stats": (self.accel_stats, self._session_files),
+            "/frames/fits": (self.frame_fits, self._fit_store),
+        }
+
+    # ---- paths -------------------------------------------------------------------------------
+
+    def _resolve(self, rel: str) -> Path:
+        p = (self.root / rel).resolve()
+        if p != self.root and self.root not in p.parents:
+            raise PermissionError(f"{rel} is outside the data root")
+        if not p.exists():
+            raise FileNotFoundError(rel)
+        return p
+
+    def _session_files(self, q: Dict[str, str]) -> List[Path]:
+        session = self._resolve(q["session"])
+        if "file" in q:
+            path = self._resolve(str(Path(q["session"]) / q["file"]))
+            return [path]
+        files = sorted(session.glob("AccelData_*.csv"))
+        if not files:
+            raise FileNotFoundError(f"No AccelData_*.csv in {q['session']}")
+        return files
+
+    def _fit_store(self, q: Dict[str, str]) -> List[Path]:
+        from dot_store import STORE_FILENAME
+        return [self._resolve(str(Path(q["folder"]) / STORE_FILENAME))]
+
+    # ---- requests ----------------------------------------------------------------------------
+
+    def handle(self, path: str, q: Dict[str, str]) -> Tuple[bytes, str]:
+        """
+        Answer one request: (body, content type). Raises KeyError (missing parameter), ValueError, FileNotFoundError
+        (unknown endpoint or data), PermissionError or ServiceBusy.
+        """
+        if path not in self.routes:
+            raise FileNotFoundError(f"unknown endpoint {path}")
+        compute, inputs = self.routes[path]
+        files = inputs(q)
+        key = (path, tuple(sorted(q.items())),
+               tuple((str(p), p.stat().st_size, p.stat().st_mtime_ns) for p in files))
+        hit = self.cache.get(key) if files else None  # answers that read no file (listings) are never cached
+        if hit is not None:
+            return hit
+        if not self._slots.acquire(blocking=False):
+            raise ServiceBusy("Too many requests queued")
+        try:
+            result = self.pool.submit(compute, q).result()
+        finally:
+            self._slots.release()
+        if files:
+            self.cache.put(key, result)
+        return result
+
+    def sessions(self, q: Dict[str, str]) -> Tuple[bytes, str]:
+        out: Dict[str, List[str]] = {}
+        for p in sorted(self.root.rglob("AccelData_*.csv")):
+            out.setdefault(p.parent.relative_to(self.root).as_posix(), []).append(p.name)
+        return _json(out)
+
+    def accel_catalog(self, q: Dict[str, str]) -> Tuple[bytes, str]:
+        from accelerometer.accel_io import catalog_file
+        return _json([catalog_file(p) for p in self._session_files(q)])
+
+    def _spectra(self, q: Dict[str, str]) -> Tuple[np.ndarray, np.ndarray, List[str], List[str]]:
+        # (f, S[file, axis, freq], file names, axes); every file's spectrum on the first file's frequency grid
+        from accelerometer.accel_fft import AXES, FFTOptions, compute_spectrum_for_file
+        from accelerometer.accel_io import QCOptions, read_single_csv
+        opts = FFTOptions(
+            method=q.get("method", "welch"),
+            nperseg_seconds=float(q.get("nperseg_seconds", 60.0)),
+            noverlap_ratio=float(q.get("noverlap_ratio", 0.5)),
+            max_f_hz=float(q["max_f_hz"]) if "max_f_hz" in q else None,
+            qc=q.get("qc", "1") != "0",
+        )
+        files = self._session_files(q)
+        f_ref: Optional[np.ndarray] = None
+        rows = []
+        for path in files:
+            df = read_single_csv(path, qc=QCOptions() if opts.qc else None)
+            spectra = compute_spectrum_for_file(df, opts, file_label=path.name)
+            if f_ref is None:
+                f_ref = next(iter(spectra.values()))[0]
+            row = []
+            for axis in AXES:
+                f, S = spectra.get(axis, (f_ref, np.full(f_ref.size, np.nan)))
+                row.append(S if f.size == f_ref.size and np.allclose(f, f_ref)
+                           else np.interp(f_ref, f, S, left=np.nan, right=np.nan))
+            rows.append(row)
+        return f_ref, np.asarray(rows), [p.name for p in files], list(AXES)
+
+    def accel_spectrum(self, q: Dict[str, str]) -> Tuple[bytes, str]:
+        f, S, files, axes = self._spectra(q)
+        return _npz(f=f, S=S.astype(np.float32), files=np.array(files), axes=np.array(axes))
+
+    def accel_bandpower(self, q: Dict[str, str]) -> Tuple[bytes, str]:
+        lo, hi = float(q["lo"]), float(q["hi"])
+        f, S, files, axes = self._spectra(q)
+        band = (f >= lo) & (f <= hi)
+        if band.sum() < 2:
+            raise ValueError(f"Fewer than two frequency bins in [{lo}, {hi}] Hz")
+        Sb, fb = S[:, :, band], f[band]
+        power = np.sum((Sb[..., 1:] + Sb[..., :-1]) / 2 * np.diff(fb), axis=-1)  # trapezoid rule
+        return _json({"lo": lo, "hi": hi, "files": files,
+                      "power": {axis: power[:, j].tolist() for j, axis in enumerate(axes)}})
+
+    def accel_trace(self, q: Dict[str, str]) -> Tuple[bytes, str]:
+        from accelerometer.accel_fft import AXES
+        from accelerometer.accel_io import read_single_csv
+        if "file" not in q:
+            raise KeyError("file")
+        df = read_single_csv(self._session_files(q)[0])
+        channels = q["channels"].split(",") if "channels" in q else list(AXES)
+        max_points = int(q.get("max_points", 5000))
+        mode = q.get("mode", "minmax")
+        if mode not in ("minmax", "mean"):
+            raise ValueError(f"Unknown mode {mode!r}")
+        t = df["t_rel_s"].to_numpy(dtype=np.float64)
+        block = max(1, math.ceil(t.size / max_points))
+        n = t.size // block * block  # whole blocks only; at most block - 1 samples dropped from the end
+        out = {"t": t[:n:block].astype(np.float64), "block": np.int64(block),
+               "start": np.array(str(df["AbsoluteTime"].iloc[0]))}
+        for c in channels:
+            x = df[c].to_numpy(dtype=np.float64)[:n].reshape(-1, block)
+            if mode == "mean":
+                out[c] = x.mean(axis=1).astype(np.float32)
+            else:
+                out[f"{c}_min"] = x.min(axis=1).astype(np.float32)
+                out[f"{c}_max"] = x.max(axis=1).astype(np.float32)
+        return _npz(**out)
+
+    def accel_stats(self, q: Dict[str, str]) -> Tuple[bytes, str]:
+        from channel_stats import session_cache_path, session_stats
+        session = self._resolve(q["session"])
+        cache = session_cache_path(self.stats_cache_dir, session) if self.stats_cache_dir is not None else None
+        stats, _ = session_stats(session, cache)
+        return _json(stats.table().to_dict(orient="index"))
+
+    def frame_fits(self, q: Dict[str, str]) -> Tuple[bytes, str]:
+        from dot_store import FitStore
+        df = FitStore(self._fit_store(q)[0]).load()
+        columns = q["columns"].split(",") if "columns" in q else list(df.columns)
+        out = {}
+        for c in columns:
+            if c == "timestamp":
+                out[c] = df[c].to_numpy(dtype="datetime64[ms]")
+            elif not pd.api.types.is_numeric_dtype(df[c]):
+                out[c] = df[c].astype(str).to_numpy(dtype=str)
+            else:
+                out[c] = df[c].to_numpy()
+        return _npz(**out)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service: DataService
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            body, ctype = self.service.handle(url.path, q)
+            status = 200
+        except ServiceBusy as e:
+            status, (body, ctype) = 503, _json({"error": str(e)})
+        except PermissionError as e:
+            status, (body, ctype) = 403, _json({"error": str(e)})
+        except FileNotFoundError as e:
+            status, (body, ctype) = 404, _json({"error": f"Not found: {e}"})
+        except (KeyError, ValueError) as e:
+            status, (body, ctype) = 400, _json({"error": f"Bad request: {e}"})
+        except Exception as e:
+            status, (body, ctype) = 500, _json({"error": f"{type(e).__name__}: {e}"})
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        sys.stderr.write(f"{self.address_string()} {fmt % args}\n")
+
+
+def make_server(
+    root: Path | str,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    max_workers: int = 4,
+    max_queue: int = 16,
+    stats_cache_dir: Optional[Path | str] = None,
+) -> ThreadingHTTPServer:
+    """
+    HTTP server for a DataService over root (port 0 picks a free port; see server.server_address).
+    Run it with serve_forever(), stop it with shutdown().
+    """
+    service = DataService(root, max_workers=max_workers, max_queue=max_queue, stats_cache_dir=stats_cache_dir)
+    handler = type("Handler", (_Handler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+class NearDataClient:
+    """
+    Minimal client: get() returns {name: array} for .npz answers and the decoded JSON otherwise.
+    """
+
+    def __init__(self, base_url: str, timeout_s: float = 600.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout_s = timeout_s
+
+    def get(self, endpoint: str, **params):
+        url = f"{self.base_url}{endpoint}"
+        if params:
+            url += "?" + urlencode({k: v for k, v in params.items() if v is not None})
+        try:
+            with urlopen(url, timeout=self.timeout_s) as resp:
+                body = resp.read()
+                ctype = resp.headers.get("Content-Type")
+        except HTTPError as e:
+            raise RuntimeError(f"{endpoint}: HTTP {e.code}: {json.loads(e.read()).get('error')}") from None
+        if ctype == NPZ_TYPE:
+            with np.load(io.BytesIO(body), allow_pickle=False) as npz:
+                return {k: npz[k] for k in npz.files}
+        return json.loads(body)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from dot_fit import ProfileCache, _frame_paths
+from dot_io import BMPLayout, iter_frames, parse_frame_timestamp
+
+# Movie of the dot with its x/y profiles, in the layout of the animation cell in dot_movie.ipynb, for runs of any
+# length. That cell kept every frame in memory, summed every frame again just to find the profile axis limits, and
+# FuncAnimation redrew the whole figure per frame. Here the profiles come from the ProfileCache written during the
+# fit (FitOptions.profile_dir), frames are read one at a time, and each movie frame redraws only the image, the two
+# profile lines and the label (blitting) before its pixels are piped straight into ffmpeg.
+
+
+def select_frames(
+    paths: List[Path],
+    stride: int = 1,
+    timelapse_s: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Indices of the frames to put in the movie: every `stride`-th frame, or with timelapse_s one frame per timelapse_s
+    seconds of capture time (the first frame at or after each step, from the filename timestamps).
+    """
+    if timelapse_s is None:
+        return np.arange(0, len(paths), max(1, stride))
+    stamps = [parse_frame_timestamp(p) for p in paths]
+    if any(s is None for s in stamps):
+        raise ValueError("Time-lapse needs a capture timestamp in every frame name")
+    t = np.array([(s - stamps[0]).total_seconds() for s in stamps])
+    steps = np.arange(0.0, t[-1] + timelapse_s, timelapse_s)
+    idx = np.searchsorted(t, steps, side="left")
+    return np.unique(idx[idx < len(paths)])
+
+
+def _profiles_for(
+    paths: List[Path],
+    idx: np.ndarray,
+    layout: Optional[BMPLayout],
+    profile_dir: Optional[Path | str],
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Cached profiles of the selected frames, or one pass over just those frames when there is no usable cache
+    if profile_dir is not None:
+        cache = ProfileCache(profile_dir)
+        if cache.frames == [p.name for p in paths] and not np.isnan(cache.x[idx[:1]]).any():
+            return cache.x[idx], cache.y[idx]
+        print(f"Profile cache in {profile_dir} does not match these frames; recomputing profiles")
+    xs, ys = [], []
+    for img in iter_frames([paths[i] for i in idx], layout):
+        xs.append(np.sum(img, axis=0, dtype=np.float32))
+        ys.append(np.sum(img, axis=1, dtype=np.float32))
+    return np.array(xs), np.array(ys)
+
+
+def _limits(profiles: np.ndarray, pad: float = 0.05) -> Tuple[float, float]:
+    lo, hi = float(np.nanmin(profiles)), float(np.nanmax(profiles))
+    margin = pad * (hi - lo) or 1.0
+    return lo - margin, hi + margin
+
+
+def export_movie(
+    frames: Iterable[Path | str] | Path | str,
+    out_path: Path | str,
+    profile_dir: Optional[Path | str] = None,
+    stride: int = 1,
+    timelapse_s: Optional[float] = None,
+    fps: float = 20,
+    vmin: float = 0,
+    vmax: float = 100,
+    cmap: str = "viridis",
+    dpi: int = 100,
+    bitrate: int = 1800,
+    layout: Optional[BMPLayout] = None,
+    glob_pattern: str = "*.bmp",
+) -> int:
+    """
+    Write an mp4 of a run: the frame with its x profile on top and y profile on the right, as in dot_movie.ipynb.
+    `frames` is a capture folder or a list of frame paths. Pass the profile_dir the run was fit with
+    (FitOptions.profile_dir) to reuse its profiles; without it they are computed in one extra pass over the selected
+    frames. Use stride or timelapse_s (see select_frames) for long runs. Only the current frame is ever in memory.
+    Returns the number of frames written.
+    """
+    paths, layout = _frame_paths(frames, layout, glob_pattern)
+    idx = select_frames(paths, stride, timelapse_s)
+    if idx.size == 0:
+        raise FileNotFoundError("No frames to export")
+    prof_x, prof_y = _profiles_for(paths, idx, layout, profile_dir)
+
+    fig = Figure(figsize=(10, 8), dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    gs = fig.add_gridspec(2, 2, width_ratios=[4, 1], height_ratios=[1, 4], wspace=0.0, hspace=0.0)
+    ax_img = fig.add_subplot(gs[1, 0])
+    ax_x = fig.add_subplot(gs[0, 0], sharex=ax_img)  # x (top)
+    ax_y = fig.add_subplot(gs[1, 1], sharey=ax_img)  # y (right)
+    fig.add_subplot(gs[0, 1]).axis("off")
+
+    height, width = prof_y.shape[1], prof_x.shape[1]
+    im = ax_img.imshow(
+        np.zeros((height, width)), cmap=cmap, origin="lower", vmin=vmin, vmax=vmax, aspect="auto", animated=True
+    )
+    line_x, = ax_x.plot(np.arange(width), prof_x[0], animated=True)
+    line_y, = ax_y.plot(prof_y[0], np.arange(height), animated=True)
+    label = fig.text(0.81, 0.9, "", ha="left", va="top", animated=True)
+    ax_x.set_xlim(-0.5, width - 0.5)
+    ax_y.set_ylim(-0.5, height - 0.5)
+    ax_x.set_ylim(*_limits(prof_x))
+    ax_y.set_xlim(*_limits(prof_y))
+    ax_x.tick_params(labelbottom=False)
+    ax_y.tick_params(labelleft=False)
+    ax_x.set_ylabel("counts")
+    ax_y.set_xlabel("counts")
+    ax_x.grid()
+    ax_y.grid()
+
+    # Everything but the animated artists is drawn once and restored for every frame
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+    w_px, h_px = canvas.get_width_height()
+
+    cmd = [
+        matplotlib.rcParams["animation.ffmpeg_path"], "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{w_px}x{h_px}", "-r", str(fps), "-i", "-",
+        "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",  # yuv420p needs even dimensions
+        "-vcodec", "libx264", "-pix_fmt", "yuv420p", "-b:v", f"{bitrate}k", str(out_path),
+    ]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    n = 0
+    try:
+        for k, (i, img) in enumerate(zip(idx, iter_frames([paths[i] for i in idx], layout))):
+            canvas.restore_region(background)
+            im.set_data(img)
+            line_x.set_ydata(prof_x[k])
+            line_y.set_xdata(prof_y[k])
+            stamp = parse_frame_timestamp(paths[i])
+            label.set_text(f"frame {i}\n{stamp:%Y-%m-%d %H:%M:%S}" if stamp is not None else f"frame {i}")
+            for artist in (im, line_x, line_y, label):
+                fig.draw_artist(artist)
+            proc.stdin.write(canvas.buffer_rgba())
+            n += 1
+    finally:
+        proc.stdin.close()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with code {proc.returncode} writing {out_path}")
+    return n
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import warnings
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from dot_io import BMPLayout, iter_frames, load_frame
+
+# Background model for the dot frames. The 1-D fits soak up whatever background is there into their offset term, a
+# different one on every frame, and nothing corrects fixed-pattern structure or the LED/ambient level drifting over a
+# run. This keeps a running robust background over the last N frames, on a block grid so the ring of past frames
+# stays small (a 10,000-frame run costs the same memory as a 20-frame one), plus an optional full-resolution master
+# dark for the fixed pattern. Frames are corrected in batches as they stream past, so none is read twice.
+
+
+def load_dark(path: Path | str) -> np.ndarray:
+    """
+    Master dark from a .npy written by build_master_dark, or from a single BMP/FITS dark frame.
+    """
+    if Path(path).suffix.lower() == ".npy":
+        return np.load(path).astype(np.float32)
+    return np.asarray(load_frame(path), dtype=np.float32)
+
+
+def build_master_dark(
+    paths: Iterable[Path | str],
+    out_path: Optional[Path | str] = None,
+    layout: Optional[BMPLayout] = None,
+) -> np.ndarray:
+    """
+    Average of dark frames (LED off, same exposure and gain), accumulated one frame at a time.
+    Saved as .npy when out_path is given, for FitOptions.dark_path.
+    """
+    total: Optional[np.ndarray] = None
+    n = 0
+    for img in iter_frames(paths, layout):
+        total = np.asarray(img, dtype=np.float64) if total is None else total + img
+        n += 1
+    if total is None:
+        raise FileNotFoundError("No dark frames given")
+    dark = (total / n).astype(np.float32)
+    if out_path is not None:
+        np.save(out_path, dark)
+    return dark
+
+
+class RollingBackground:
+    """
+    Robust background over the last `n_frames` frames. Each frame is reduced to block medians (block x block pixels);
+    blocks that stand out spatially (the dot) are masked before they enter the ring, and the model is the per-block
+    median ("median") or 3-sigma-clipped mean ("clipped_mean") over the ring, expanded back to full resolution.
+    With n_frames=0 only the master dark is subtracted.
+    """
+
+    def __init__(
+        self,
+        n_frames: int = 32,
+        block: int = 16,
+        method: str = "median",
+        dark: Optional[np.ndarray] = None,
+        mask_sigma: float = 5.0,
+    ):
+        if method not in ("median", "clipped_mean"):
+            raise ValueError(f"Unknown background method {method!r}")
+        self.n_frames = n_frames
+        self.block = max(1, block)
+        self.method = method
+        self.dark = None if dark is None else np.asarray(dark, dtype=np.float32)
+        self.mask_sigma = mask_sigma
+        self._ring: Optional[np.ndarray] = None
+        self._n_seen = 0
+        self._model: Optional[np.ndarray] = None
+
+    def _blocks(self, img: np.ndarray) -> np.ndarray:
+        b = self.block
+        h, w = (img.shape[0] // b) * b, (img.shape[1] // b) * b
+        blocks = img[:h, :w].reshape(h // b, b, w // b, b).transpose(0, 2, 1, 3).reshape(h // b, w // b, b * b)
+        grid = np.median(blocks, axis=2).astype(np.float32)
+
+        # Mask the dot (and one block around it) so it never becomes part of the background
+        med = np.median(grid)
+        spread = max(1.4826 * float(np.median(np.abs(grid - med))), 1.0)  # at least one count
+        bright = grid - med > self.mask_sigma * spread
+        if bright.any():
+            grown = bright.copy()
+            grown[1:] |= bright[:-1]
+            grown[:-1] |= bright[1:]
+            grown[:, 1:] |= grown[:, :-1].copy()
+            grown[:, :-1] |= grown[:, 1:].copy()
+            grid[grown] = np.nan
+        return grid
+
+    def push(self, frames: List[np.ndarray]) -> None:
+        """
+        Add dark-subtracted frames to the ring (oldest ones fall out) and recompute the model.
+        """
+        for img in frames:
+            grid = self._blocks(img)
+            if self._ring is None:
+                self._ring = np.full((self.n_frames,) + grid.shape, np.nan, dtype=np.float32)
+            self._ring[self._n_seen % self.n_frames] = grid
+            self._n_seen += 1
+
+        filled = self._ring[: min(self._n_seen, self.n_frames)]
+        with warnings.catch_warnings():
+            # nanmedian/nanmean warn on all-NaN blocks, which is exactly the masked-dot case handled below
+            warnings.simplefilter("ignore", RuntimeWarning)
+            if self.method == "median":
+                model = np.nanmedian(filled, axis=0)
+            else:
+                med = np.nanmedian(filled, axis=0)
+                sd = np.nanstd(filled, axis=0)
+                clipped = np.where(np.abs(filled - med) <= 3 * sd, filled, np.nan)
+                model = np.nanmean(clipped, axis=0)
+            # Blocks masked in every frame of the ring (a dot that never moves) take the overall level
+            model = np.where(np.isfinite(model), model, np.nanmedian(model))
+        self._model = model.astype(np.float32)
+
+    def model(self, shape) -> Optional[np.ndarray]:
+        """
+        Current background at full resolution, or None before any frame has been pushed.
+        """
+        if self._model is None:
+            return None
+        b = self.block
+        full = np.repeat(np.repeat(self._model, b, axis=0), b, axis=1)
+        pad = ((0, shape[0] - full.shape[0]), (0, shape[1] - full.shape[1]))
+        return np.pad(full, pad, mode="edge") if any(p[1] for p in pad) else full
+
+    def correct(self, frames: List[np.ndarray], push: Optional[Sequence[bool]] = None) -> List[np.ndarray]:
+        """
+        Subtract the master dark and the running background from a batch of frames, then add the batch to the model.
+        The batch is corrected with the model from the frames before it (the very first batch with its own).
+        `push` (one flag per frame) keeps frames out of the model, e.g. ones the prefilter flagged as overexposed or
+        blank, which would otherwise spoil the background for the next n_frames frames; they are still corrected.
+        Returns float32 frames.
+        """
+        if not frames:
+            return []
+        stack = np.stack([np.asarray(f, dtype=np.float32) for f in frames])
+        if self.dark is not None:
+            stack -= self.dark
+        if self.n_frames <= 0:
+            return list(stack)
+        keep = list(stack) if push is None else [f for f, k in zip(stack, push) if k]
+        first = self._model is None
+        if first:
+            if not keep:
+                return list(stack)  # nothing to build a model from yet; only the dark is subtracted
+            self.push(keep)
+        corrected = stack - self.model(stack.shape[1:])
+        if not first and keep:
+            self.push(keep)
+        return list(corrected)
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sensor_align import TEMPERATURE_COLUMNS, frame_windows, read_temperature_logs
+
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
+
+try:
+    from scipy import signal as _scipy_signal  # type: ignore
+    _HAVE_SCIPY = True
+except Exception:
+    _HAVE_SCIPY = False
+
+# Does the multi-day centroid drift follow the room temperature or humidity, and with what lag? Both sides are
+# averaged onto one regular time grid (1 min by default), and every environment channel is cross-correlated with
+# mu_x and mu_y over a wide range of lags. The grid has holes (frames dropped by the fit, logger downtime), so the
+# correlation at each lag is the Pearson r over just the pairs where both series have data. Its sums are FFT
+# correlations of the zero-filled series and their masks, which takes seconds even for weeks of data.
+# fit_thermal_lag optionally fits a first-order thermal lag (gain, time constant, offset) for one pair.
+
+DOT_COLUMNS = ["mu_x", "mu_y"]
+
+
+def _bin_means(t_ns: np.ndarray, values: np.ndarray, t0: int, step_ns: int, n: int) -> np.ndarray:
+    # Mean of `values` (n_samples, n_columns) in each grid bin [t0 + k step, t0 + (k+1) step); NaN where empty
+    k = (t_ns - t0) // step_ns
+    inside = (k >= 0) & (k < n)
+    k = k[inside]
+    values = values[inside]
+    out = np.full((n, values.shape[1]), np.nan)
+    for j in range(values.shape[1]):
+        ok = np.isfinite(values[:, j])
+        count = np.bincount(k[ok], minlength=n)
+        total = np.bincount(k[ok], weights=values[ok, j], minlength=n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[:, j] = np.where(count > 0, total / count, np.nan)
+    return out
+
+
+def common_grid(
+    frames: pd.DataFrame,
+    temperature_logs: Iterable[Path | str],
+    step_s: float = 60.0,
+    dot_columns: Sequence[str] = DOT_COLUMNS,
+    env_columns: Sequence[str] = TEMPERATURE_COLUMNS,
+) -> pd.DataFrame:
+    """
+    Dot centroids (from a FitStore.load() table; only status "ok" rows when there is a status column) and the
+    temperature/humidity logs averaged onto one regular grid of step_s over the span of the frames.
+    Returns a DataFrame indexed by bin start time, NaN for bins without data.
+    """
+    df = frames[frames["timestamp"].notna()]
+    if "status" in df:
+        df = df[df["status"] == "ok"]
+    df = df.sort_values("timestamp", kind="stable")
+    if df.empty:
+        raise ValueError("No timestamped frames to correlate")
+    t_dot, _ = frame_windows(df["timestamp"])
+
+    step_ns = int(round(step_s * 1e9))
+    t0 = int(t_dot[0]) // step_ns * step_ns
+    n = int((int(t_dot[-1]) - t0) // step_ns) + 1
+    dot = _bin_means(t_dot, df[list(dot_columns)].to_numpy(dtype=np.float64), t0, step_ns, n)
+
+    log = read_temperature_logs(temperature_logs, t0, t0 + n * step_ns - 1, env_columns)
+    env_values = log.reindex(columns=list(env_columns)).to_numpy(dtype=np.float64)
+    env = _bin_means(log["t_ns"].to_numpy(dtype=np.int64), env_values, t0, step_ns, n)
+
+    index = pd.to_datetime(t0 + step_ns * np.arange(n, dtype=np.int64))
+    grid = pd.DataFrame(np.hstack([dot, env]), index=index, columns=[*dot_columns, *env_columns])
+    grid.index.name = "time"
+    return grid
+
+
+def _xcorr_sums(a: np.ndarray, b: np.ndarray, n_fft: int, max_lag: int) -> np.ndarray:
+    # sum_t a[t] b[t + lag] for lag = -max_lag .. max_lag
+    c = np.fft.irfft(np.conj(np.fft.rfft(a, n_fft)) * np.fft.rfft(b, n_fft), n_fft)
+    return np.concatenate([c[n_fft - max_lag:], c[:max_lag + 1]])
+
+
+def lagged_xcorr(
+    x: np.ndarray,
+    y: np.ndarray,
+    max_lag: int,
+    min_overlap: int = 30,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pearson correlation of x[t] with y[t + lag] for lag = -max_lag .. max_lag samples, over the pairs where both are
+    finite. A positive lag means y follows x (e.g. the centroid responds after the temperature).
+    Returns (lags, r, number of pairs); r is NaN where fewer than min_overlap pairs overlap.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    mx, my = np.isfinite(x), np.isfinite(y)
+    # Centre first so the sums below do not lose precision to large offsets (pixel positions, 20 C)
+    xc = np.where(mx, x - (x[mx].mean() if mx.any() else 0.0), 0.0)
+    yc = np.where(my, y - (y[my].mean() if my.any() else 0.0), 0.0)
+    mx, my = mx.astype(np.float64), my.astype(np.float64)
+
+    n = x.size
+    max_lag = min(max_lag, n - 1)
+    n_fft = 1 << int(np.ceil(np.log2(2 * n)))
+    pairs = np.rint(_xcorr_sums(mx, my, n_fft, max_lag))
+    sx = _xcorr_sums(xc, my, n_fft, max_lag)
+    sy = _xcorr_sums(mx, yc, n_fft, max_lag)
+    sxx = _xcorr_sums(xc * xc, my, n_fft, max_lag)
+    syy = _xcorr_sums(mx, yc * yc, n_fft, max_lag)
+    sxy = _xcorr_sums(xc, yc, n_fft, max_lag)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = pairs * sxy - sx * sy
+        var = (pairs * sxx - sx * sx) * (pairs * syy - sy * sy)
+        r = cov / np.sqrt(np.maximum(var, 0.0))
+    r[(pairs < min_overlap) | ~np.isfinite(r)] = np.nan
+    return np.arange(-max_lag, max_lag + 1), np.clip(r, -1.0, 1.0), pairs.astype(np.int64)
+
+
+def xcorr_table(
+    grid: pd.DataFrame,
+    max_lag_s: float = 2 * 86400.0,
+    dot_columns: Sequence[str] = DOT_COLUMNS,
+    env_columns: Optional[Sequence[str]] = None,
+    min_overlap: int = 30,
+) -> Tuple[pd.DataFrame, Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]]]:
+    """
+    lagged_xcorr of every environment column of `grid` (from common_grid) against every dot column, for lags up to
+    max_lag_s either way. Returns (summary with the zero-lag r and the lag [s] and r of the strongest correlation
+    per pair, {(env, dot): (lags [s], r)}).
+    """
+    step_s = (grid.index[1] - grid.index[0]).total_seconds() if len(grid) > 1 else 1.0
+    max_lag = int(max_lag_s // step_s)
+    if env_columns is None:
+        env_columns = [c for c in grid.columns if c not in dot_columns]
+
+    rows = []
+    curves: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
+    for env in env_columns:
+        for dot in dot_columns:
+            lags, r, pairs = lagged_xcorr(grid[env].to_numpy(), grid[dot].to_numpy(), max_lag, min_overlap)
+            lags_s = lags * step_s
+            curves[(env, dot)] = (lags_s, r)
+            finite = np.isfinite(r)
+            best = int(np.nanargmax(np.abs(r))) if finite.any() else None
+            rows.append({
+                "env": env,
+                "dot": dot,
+                "r_zero_lag": r[lags == 0][0] if r.size else np.nan,
+                "best_lag_s": lags_s[best] if best is not None else np.nan,
+                "best_r": r[best] if best is not None else np.nan,
+                "pairs_at_best": pairs[best] if best is not None else 0,
+            })
+    return pd.DataFrame(rows), curves
+
+
+def fit_thermal_lag(
+    grid: pd.DataFrame,
+    env: str,
+    dot: str,
+    taus_s: Optional[Sequence[float]] = None,
+) -> Dict[str, float]:
+    """
+    Fit dot(t) = gain * lowpass_tau(env)(t) + offset, with lowpass_tau a first-order (exponential) lag of time constant
+    tau, as a mount that heats up or cools down slowly would show. tau is searched on a log grid (default 1 min to
+    2 days) with gain and offset solved by least squares for each. Gaps in env are linearly interpolated before
+    filtering; bins without a dot value are left out of the fit. Returns tau_s, gain, offset and r2.
+    """
+    if not _HAVE_SCIPY:
+        raise RuntimeError("SciPy not available for the lag filter")
+    step_s = (grid.index[1] - grid.index[0]).total_seconds()
+    if taus_s is None:
+        taus_s = np.geomspace(max(step_s, 60.0), 2 * 86400.0, 60)
+    x = grid[env].interpolate(limit_direction="both").to_numpy(dtype=np.float64)
+    y = grid[dot].to_numpy(dtype=np.float64)
+    ok = np.isfinite(y) & np.isfinite(x)
+    if ok.sum() < 3:
+        raise ValueError(f"Not enough overlapping data for {env} vs {dot}")
+
+    best = {"tau_s": np.nan, "gain": np.nan, "offset": np.nan, "r2": -np.inf}
+    y_ok = y[ok]
+    ss_tot = np.sum((y_ok - y_ok.mean()) ** 2)
+    for tau in taus_s:
+        a = np.exp(-step_s / tau)
+        filtered, _ = _scipy_signal.lfilter([1 - a], [1, -a], x, zi=[a * x[0]])
+        design = np.column_stack([filtered[ok], np.ones(ok.sum())])
+        coef, *_ = np.linalg.lstsq(design, y_ok, rcond=None)
+        r2 = 1 - np.sum((y_ok - design @ coef) ** 2) / ss_tot if ss_tot > 0 else np.nan
+        if r2 > best["r2"]:
+            best = {"tau_s": float(tau), "gain": float(coef[0]), "offset": float(coef[1]), "r2": float(r2)}
+    return best
+
+
+def plot_xcorr(
+    curves: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]],
+    dot_columns: Sequence[str] = DOT_COLUMNS,
+) -> plt.Figure:
+    """
+    r against lag [h] for every pair, one panel per dot column.
+    """
+    import matplotlib.pyplot as plt
+
+    fig, axs = plt.subplots(len(dot_columns), 1, figsize=(12, 4 * len(dot_columns)), sharex=True, squeeze=False)
+    for ax, dot in zip(axs[:, 0], dot_columns):
+        for (env, d), (lags_s, r) in curves.items():
+            if d == dot:
+                ax.plot(lags_s / 3600, r, label=env, linewidth=0.9)
+        ax.axvline(0, color="gray", linewidth=0.6)
+        ax.set_ylabel(f"r with {dot}")
+        ax.set_ylim(-1, 1)
+        ax.grid(True, alpha=0.3)
+        ax.legend(loc="best", fontsize="small")
+    axs[-1, 0].set_xlabel("Lag [h] (positive: centroid follows the environment)")
+    fig.tight_layout()
+    return fig
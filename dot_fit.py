@@ -0,0 +1,530 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.optimize import curve_fit
+
+from stage_profile import stage, staged
+from dot_background import RollingBackground, load_dark
+from dot_io import BMPLayout, iter_frames, list_frames, load_frame
+
+# Centroid / FWHM analysis of the dot, lifted out of dot_movie.ipynb so it can run on a whole capture folder (BMP or
+# FITS) without going through the notebook. Each frame is collapsed to x and y profiles and fit with a 1-D Gaussian.
+
+FWHM_FACTOR = 2 * np.sqrt(2 * np.log(2))  # ~2.35482
+
+# Per-frame fit parameters, in the order the notebook keeps them
+FIT_COLUMNS = ["amp_x", "mu_x", "sigma_x", "offset_x", "amp_y", "mu_y", "sigma_y", "offset_y"]
+
+# Per-frame quality statistics from the prefilter (FitOptions.prefilter), appended after FIT_COLUMNS
+QUALITY_COLUMNS = ["sat_frac", "flux", "peak_snr", "rough_x", "rough_y", "quality"]
+
+# Bits of the "quality" column
+QUALITY_SATURATED = 1    # some pixels at full scale; centroid is still usable, the FWHM is biased
+QUALITY_NO_DOT = 2       # nothing stands out from the background (dot off the sensor, LED off, blank frame)
+QUALITY_AT_EDGE = 4      # rough centroid within roi_margin of the sensor edge: dot partly off the sensor
+QUALITY_OVEREXPOSED = 8  # a large part of the frame is saturated (room lights, flash)
+
+# Frames before each fit_frames_parallel chunk (or a process_new_frames restart) that the RoiTracker fits and discards
+# to find the window first
+ROI_WARMUP_FRAMES = 2
+
+
+@dataclass
+class FitOptions:
+    sigma_guess: float = 5.0        # initial sigma [px] for curve_fit
+    maxfev: int = 2000              # curve_fit evaluation budget per profile
+    roi_half_width: Optional[int] = None  # if set, fit only a (2*hw)^2 window that follows the dot
+    roi_margin: int = 8             # re-acquire when the centroid comes within this many px of the window edge
+    coarse_factor: int = 8          # block size [px] for the coarse whole-frame search
+    detect_snr: float = 5.0         # coarse peak must stand this many robust sigmas above the median
+    prefilter: bool = False         # compute QUALITY_COLUMNS first and skip frames flagged with skip_quality
+    prefilter_stride: int = 4       # the prefilter looks at every n-th pixel in each direction
+    saturation_level: float = 255   # pixel value counted as saturated
+    max_saturated_fraction: float = 0.01  # above this fraction of saturated pixels the frame is OVEREXPOSED
+    skip_quality: int = QUALITY_NO_DOT | QUALITY_OVEREXPOSED  # frames with any of these bits are not fit
+    background_frames: int = 0      # if > 0, subtract a rolling background over this many frames before fitting
+    background_block: int = 16      # block size [px] of the background model
+    background_method: str = "median"  # "median" or "clipped_mean" over the ring of frames
+    background_batch: int = 16      # frames corrected per batch
+    dark_path: Optional[str] = None  # master dark (.npy from build_master_dark, or a dark BMP/FITS) to subtract
+    profile_dir: Optional[str] = None  # if set, save every frame's raw x/y profiles here (ProfileCache, for movies)
+
+
+def gaussian(x, amp, mu, sigma, offset):
+    return amp * np.exp(-0.5 * ((x - mu) / sigma) ** 2) + offset
+
+
+def _fit_profile(profile: np.ndarray, opts: FitOptions) -> np.ndarray:
+    vals = np.arange(profile.size)
+    p0 = [profile.max(), profile.argmax(), opts.sigma_guess, np.median(profile)]
+    try:
+        popt, _ = curve_fit(gaussian, vals, profile, p0=p0, maxfev=opts.maxfev)
+    except RuntimeError:
+        popt = [np.nan] * 4
+    return np.asarray(popt, dtype=np.float64)
+
+
+class ProfileCache:
+    """
+    Raw x and y profiles (column and row sums) of every frame of a run, kept as two float32 .npy arrays
+    (frames x width, frames x height) plus the list of frame names. The arrays are memory-mapped, so fit workers fill
+    their own rows in place and dot_animation reads back only the rows it needs.
+    """
+
+    X_FILE = "profiles_x.npy"
+    Y_FILE = "profiles_y.npy"
+    FRAMES_FILE = "frames.txt"
+
+    def __init__(self, directory: Path | str, mode: str = "r"):
+        self.directory = Path(directory)
+        self.x = np.load(self.directory / self.X_FILE, mmap_mode=mode)
+        self.y = np.load(self.directory / self.Y_FILE, mmap_mode=mode)
+        self.frames = (self.directory / self.FRAMES_FILE).read_text().splitlines()
+
+    @classmethod
+    def create(cls, directory: Path | str, paths: List[Path], shape: Tuple[int, int]) -> "ProfileCache":
+        """
+        New NaN-filled cache for `paths` (frames of shape (height, width)), replacing any cache already there.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, n in ((cls.X_FILE, shape[1]), (cls.Y_FILE, shape[0])):
+            arr = np.lib.format.open_memmap(directory / name, mode="w+", dtype=np.float32, shape=(len(paths), n))
+            arr[:] = np.nan
+            arr.flush()
+            del arr
+        (directory / cls.FRAMES_FILE).write_text("".join(f"{Path(p).name}\n" for p in paths))
+        return cls(directory, mode="r+")
+
+    def put(self, i: int, img: np.ndarray) -> None:
+        self.x[i] = np.sum(img, axis=0)  # collapse along y (rows); psf along x
+        self.y[i] = np.sum(img, axis=1)  # collapse along x (columns); psf along y
+
+    def flush(self) -> None:
+        self.x.flush()
+        self.y.flush()
+
+
+def fit_frame(img: np.ndarray, opts: Optional[FitOptions] = None) -> np.ndarray:
+    """
+    Fit one frame. Returns the 8 values of FIT_COLUMNS; a failed profile fit leaves NaNs in its 4 slots.
+    """
+    if opts is None:
+        opts = FitOptions()
+    img = np.asarray(img, dtype=np.float64)
+    profile_x = np.sum(img, axis=0)  # collapse along y (rows); psf along x
+    profile_y = np.sum(img, axis=1)  # collapse along x (columns); psf along y
+    return np.concatenate([_fit_profile(profile_x, opts), _fit_profile(profile_y, opts)])
+
+
+def _robust_sigma(x: np.ndarray) -> float:
+    return float(1.4826 * np.median(np.abs(x - np.median(x))))
+
+
+def frame_quality(img: np.ndarray, opts: Optional[FitOptions] = None) -> np.ndarray:
+    """
+    Cheap per-frame statistics from a strided view (every prefilter_stride-th pixel), in QUALITY_COLUMNS order:
+    saturated fraction, background-subtracted flux (scaled to the full frame), peak SNR, rough centroid (x, y) in
+    full-frame pixels, and the quality bit flags. The peak SNR is that of the brightest block of the view, with blocks
+    spanning coarse_factor sensor pixels as in find_dot_coarse: single pixels of a blank frame reach detect_snr too
+    often (the largest of ~20k noise pixels is ~4 sigma, and 8-bit steps shrink the MAD of a quiet frame). NO_DOT is
+    set below detect_snr, or below the expected largest noise block plus 1.5 sigma when the frame has more blocks.
+    """
+    if opts is None:
+        opts = FitOptions()
+    k = max(1, opts.prefilter_stride)
+    view = np.asarray(img[::k, ::k], dtype=np.float64)
+
+    sat_frac = float(np.mean(view >= opts.saturation_level))
+    bg = float(np.median(view))
+    excess = view - bg
+    flux = float(excess.sum()) * k * k
+    peak = float(excess.max())
+
+    b = max(1, min(opts.coarse_factor // k, *view.shape))
+    bh, bw = (view.shape[0] // b) * b, (view.shape[1] // b) * b
+    blocks = view[:bh, :bw].reshape(bh // b, b, bw // b, b).sum(axis=(1, 3))
+    block_bg = float(np.median(blocks))
+    # Std of the blocks near the median rather than the MAD, which 8-bit steps round down on quiet frames
+    near = np.abs(blocks - block_bg) <= 5 * max(_robust_sigma(blocks), 1.0)
+    noise = float(np.std(blocks[near]))
+    if noise == 0:
+        noise = np.sqrt(max(block_bg, 1.0))  # flat frame, as in find_dot_coarse
+    peak_snr = (float(blocks.max()) - block_bg) / noise
+
+    rough_x = rough_y = np.nan
+    flags = 0
+    if sat_frac > 0:
+        flags |= QUALITY_SATURATED
+    if sat_frac > opts.max_saturated_fraction:
+        flags |= QUALITY_OVEREXPOSED
+    # The largest of n noise blocks is ~sqrt(2 ln n) sigma, so big sensors need a higher bar for the same false rate
+    if peak_snr < max(opts.detect_snr, np.sqrt(2 * np.log(blocks.size)) + 1.5):
+        flags |= QUALITY_NO_DOT
+    else:
+        w = np.where(excess > 0.5 * peak, excess, 0.0)
+        rows, cols = np.indices(view.shape)
+        rough_y = float((w * rows).sum() / w.sum()) * k
+        rough_x = float((w * cols).sum() / w.sum()) * k
+        m = opts.roi_margin
+        if not (m <= rough_x < img.shape[1] - m and m <= rough_y < img.shape[0] - m):
+            flags |= QUALITY_AT_EDGE
+    return np.array([sat_frac, flux, peak_snr, rough_x, rough_y, flags], dtype=np.float64)
+
+
+def find_dot_coarse(img: np.ndarray, opts: Optional[FitOptions] = None) -> Optional[Tuple[int, int]]:
+    """
+    Locate the dot on a block-summed copy of the frame. Returns the (row, col) of the brightest block centre in
+    full-frame pixels, or None when nothing stands out from the background (dot off the sensor).
+    """
+    if opts is None:
+        opts = FitOptions()
+    f = max(1, opts.coarse_factor)
+    h, w = (img.shape[0] // f) * f, (img.shape[1] // f) * f
+    blocks = np.asarray(img[:h, :w], dtype=np.float64).reshape(h // f, f, w // f, f).sum(axis=(1, 3))
+
+    med = np.median(blocks)
+    noise = _robust_sigma(blocks)
+    if noise == 0:
+        noise = np.sqrt(max(med, 1.0))  # flat frame: fall back to Poisson-ish noise on the block sums
+    peak = np.unravel_index(np.argmax(blocks), blocks.shape)
+    if blocks[peak] - med < opts.detect_snr * noise:
+        return None
+    return int(peak[0]) * f + f // 2, int(peak[1]) * f + f // 2
+
+
+def _clear_of_edges(mu: float, window: slice, n: int, margin: int) -> bool:
+    # Only window edges inside the sensor count; a window clamped to the sensor edge cannot be re-centred any further
+    lo = margin if window.start > 0 else 0
+    hi = (window.stop - window.start) - (margin if window.stop < n else 0)
+    return lo <= mu < hi
+
+
+class RoiTracker:
+    """
+    Fits each frame inside a window around the previous centroid instead of the whole sensor. The dot is found once
+    at coarse resolution, and found again whenever a fit fails or the centroid drifts toward the window edge
+    (as when the dot wandered off screen during the 2025-09-19 weekend run). Results are in full-frame pixels.
+    """
+
+    def __init__(self, opts: FitOptions):
+        if not opts.roi_half_width:
+            raise ValueError("RoiTracker needs FitOptions.roi_half_width")
+        self.opts = opts
+        self.center: Optional[Tuple[int, int]] = None
+        self.reacquisitions = 0
+
+    def _window(self, shape: Tuple[int, int]) -> Tuple[slice, slice]:
+        hw = self.opts.roi_half_width
+        bounds = []
+        for c, n in zip(self.center, shape):
+            lo = int(np.clip(c - hw, 0, max(n - 2 * hw, 0)))
+            bounds.append(slice(lo, min(lo + 2 * hw, n)))
+        return bounds[0], bounds[1]
+
+    def _fit_window(self, img: np.ndarray) -> Optional[np.ndarray]:
+        rows, cols = self._window(img.shape)
+        window = img[rows, cols]
+        params = fit_frame(window, self.opts)
+        m = self.opts.roi_margin
+        hw = self.opts.roi_half_width
+        amp_x, mu_x, sigma_x, _, amp_y, mu_y, sigma_y, _ = params
+        # A window with no dot in it still fits something: a flat, very wide or one-pixel Gaussian on the noise
+        noise_x = _robust_sigma(np.sum(window, axis=0, dtype=np.float64))
+        noise_y = _robust_sigma(np.sum(window, axis=1, dtype=np.float64))
+        inside = (
+            np.all(np.isfinite(params))
+            and amp_x > self.opts.detect_snr * noise_x and amp_y > self.opts.detect_snr * noise_y
+            and 1 <= abs(sigma_x) < hw and 1 <= abs(sigma_y) < hw
+            and _clear_of_edges(mu_x, cols, img.shape[1], m)
+            and _clear_of_edges(mu_y, rows, img.shape[0], m)
+        )
+        if not inside:
+            return None
+        params[1] += cols.start
+        params[5] += rows.start
+        return params
+
+    def fit(self, img: np.ndarray) -> np.ndarray:
+        """
+        Fit one frame; returns the 8 values of FIT_COLUMNS, all NaN if the dot cannot be found.
+        """
+        params = self._fit_window(img) if self.center is not None else None
+        if params is None:
+            self.center = find_dot_coarse(img, self.opts)
+            self.reacquisitions += 1
+            if self.center is not None:
+                params = self._fit_window(img)
+        if params is None:
+            self.center = None
+            return np.full(len(FIT_COLUMNS), np.nan)
+        self.center = (int(round(params[5])), int(round(params[1])))
+        return params
+
+
+class FitState:
+    """
+    The part of a run that depends on the frames before: the RoiTracker window and the rolling background model.
+    Pass one to successive fit_frames calls over consecutive frames (a folder fit batch by batch, or as the camera
+    adds frames) so each call carries on where the last one stopped instead of starting over.
+    """
+
+    def __init__(self, opts: Optional[FitOptions] = None):
+        self.tracker = RoiTracker(opts) if opts is not None and opts.roi_half_width else None
+        self.background = _make_background(opts)
+        self.n_frames = 0  # frames run through so far, warm-up frames included
+
+
+@staged("fit_frames", unit="frames", count=lambda result: len(result["mu_x"]))
+def fit_frames(
+    frames: Iterable[Path | str] | Path | str,
+    opts: Optional[FitOptions] = None,
+    layout: Optional[BMPLayout] = None,
+    glob_pattern: str = "*.bmp",
+    state: Optional[FitState] = None,
+    lead_in: Sequence[Path | str] = (),
+) -> Dict[str, np.ndarray]:
+    """
+    Fit every frame of a capture. `frames` is either a folder (scanned with glob_pattern, "*.fits" for converted
+    runs) or an explicit list of BMP/FITS paths.
+    With opts.roi_half_width set, frames are fit in a tracked window (see RoiTracker); with opts.prefilter set,
+    frame_quality() runs first and hopeless frames are left NaN without being fit. With opts.profile_dir set, the
+    raw profiles of every frame are saved there as a ProfileCache on the way.
+    `state` (a FitState made with the same opts) carries the tracker and background over from the previous call;
+    `lead_in` frames, the ones just before `frames`, are run through them first without being fit into the results.
+    Returns {column: array} for result_columns(opts), one entry per frame in input order.
+    """
+    paths, layout = _frame_paths(frames, layout, glob_pattern)
+    columns = result_columns(opts)
+    table = np.full((len(paths), len(columns)), np.nan)
+    profiles = _create_profiles(paths, layout, opts)
+    lead = [Path(p) for p in lead_in]
+    _fit_into(table, lead + paths, layout, opts, profiles, warmup=len(lead), state=state)
+    if profiles is not None:
+        profiles.flush()
+    return {name: table[:, i] for i, name in enumerate(columns)}
+
+
+def result_columns(opts: Optional[FitOptions] = None) -> List[str]:
+    """
+    Columns fit_frames returns for these options: FIT_COLUMNS, plus QUALITY_COLUMNS with the prefilter on.
+    """
+    if opts is not None and opts.prefilter:
+        return FIT_COLUMNS + QUALITY_COLUMNS
+    return list(FIT_COLUMNS)
+
+
+def _frame_paths(
+    frames: Iterable[Path | str] | Path | str,
+    layout: Optional[BMPLayout],
+    glob_pattern: str,
+) -> Tuple[List[Path], Optional[BMPLayout]]:
+    if isinstance(frames, (str, Path)) and Path(frames).is_dir():
+        return list_frames(frames, glob_pattern)
+    if isinstance(frames, (str, Path)):
+        return [Path(frames)], layout
+    return [Path(p) for p in frames], layout
+
+
+def _create_profiles(
+    paths: List[Path],
+    layout: Optional[BMPLayout],
+    opts: Optional[FitOptions],
+) -> Optional[ProfileCache]:
+    if opts is None or opts.profile_dir is None or not paths:
+        return None
+    shape = (layout.height, layout.width) if layout is not None else load_frame(paths[0]).shape
+    return ProfileCache.create(opts.profile_dir, paths, shape)
+
+
+def _fit_into(
+    table: np.ndarray,
+    paths: List[Path],
+    layout: Optional[BMPLayout],
+    opts: Optional[FitOptions],
+    profiles: Optional[ProfileCache] = None,
+    first_frame: int = 0,
+    warmup: int = 0,
+    state: Optional[FitState] = None,
+) -> None:
+    # Fill table[i] with the fit of paths[warmup + i]; rows of frames that fail keep whatever NaNs they started with.
+    # The first `warmup` paths are only run through the tracker and background model, so they start in the state a
+    # run over the earlier frames would have left them in, and are not written anywhere.
+    # With the prefilter on, the quality statistics (from the raw frame) go in the trailing columns and flagged frames
+    # are not fit. With a background model, frames are corrected in batches before fitting; flagged frames are corrected
+    # but kept out of the model. Profiles are cached from the raw frame (what a movie of the run shows), at row
+    # first_frame + i. Without a `state` the tracker and background start from scratch.
+    if state is None:
+        state = FitState(opts)
+    tracker, background = state.tracker, state.background
+    prefilter = opts is not None and opts.prefilter
+    batch_size = opts.background_batch if background is not None else 1
+    n_fit = len(FIT_COLUMNS)
+
+    i = 0
+    frames = iter_frames(paths, layout)
+    while True:
+        with stage("fit.read", unit="frames") as st:
+            batch = list(islice(frames, batch_size))
+            st.count = len(batch)
+        if not batch:
+            break
+        skip = [False] * len(batch)
+        rows = [i + j - warmup for j in range(len(batch))]  # negative while warming up
+        if profiles is not None:
+            with stage("fit.profiles", count=len(batch), unit="frames"):
+                for row, img in zip(rows, batch):
+                    if row >= 0:
+                        profiles.put(first_frame + row, img)
+        if prefilter:
+            with stage("fit.prefilter", count=len(batch), unit="frames"):
+                for j, img in enumerate(batch):
+                    quality = frame_quality(img, opts)
+                    if rows[j] >= 0:
+                        table[rows[j], n_fit:] = quality
+                    skip[j] = bool(int(quality[-1]) & opts.skip_quality)
+                    if not skip[j] and tracker is not None and tracker.center is None:
+                        # The rough centroid is as good a starting window as the coarse search
+                        tracker.center = (int(round(quality[4])), int(round(quality[3])))
+        if background is not None:
+            with stage("fit.background", count=len(batch), unit="frames"):
+                batch = background.correct(batch, push=[not k for k in skip])  # flagged frames stay out of it
+        with stage("fit.gaussian", count=len(batch) - sum(skip), unit="frames"):
+            for j, img in enumerate(batch):
+                if skip[j] or (rows[j] < 0 and tracker is None):
+                    continue
+                params = tracker.fit(img) if tracker is not None else fit_frame(img, opts)
+                if rows[j] >= 0:
+                    table[rows[j], :n_fit] = params
+        i += len(batch)
+        state.n_frames += len(batch)
+
+
+def _make_background(opts: Optional[FitOptions]) -> Optional[RollingBackground]:
+    if opts is None or (opts.background_frames <= 0 and opts.dark_path is None):
+        return None
+    return RollingBackground(
+        n_frames=max(opts.background_frames, 0),
+        block=opts.background_block,
+        method=opts.background_method,
+        dark=load_dark(opts.dark_path) if opts.dark_path else None,
+    )
+
+
+def _warmup_frames(opts: Optional[FitOptions]) -> int:
+    # Frames before a chunk that bring its tracker and background model to where a serial run would have them: a
+    # couple of fits for the tracker window, a full ring (whole batches) for the rolling background
+    if opts is None:
+        return 0
+    n = ROI_WARMUP_FRAMES if opts.roi_half_width else 0
+    if opts.background_frames > 0:
+        batch = max(1, opts.background_batch)
+        n = max(n, -(-opts.background_frames // batch) * batch)
+    return n
+
+
+def _fit_chunk(args: Tuple[str, int, int, int, List[Path], Optional[BMPLayout], Optional[FitOptions]]) -> int:
+    shm_name, n_frames, start, warmup, paths, layout, opts = args
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        table = np.ndarray((n_frames, len(result_columns(opts))), dtype=np.float64, buffer=shm.buf)
+        profiles = ProfileCache(opts.profile_dir, mode="r+") if opts is not None and opts.profile_dir else None
+        _fit_into(table[start:start + len(paths) - warmup], paths, layout, opts, profiles, start, warmup)
+        if profiles is not None:
+            profiles.flush()
+        del table  # release the view before closing the segment
+    finally:
+        shm.close()
+    return len(paths) - warmup
+
+
+@staged("fit_frames_parallel", unit="frames", count=lambda result: len(result["mu_x"]))
+def fit_frames_parallel(
+    frames: Iterable[Path | str] | Path | str,
+    opts: Optional[FitOptions] = None,
+    layout: Optional[BMPLayout] = None,
+    glob_pattern: str = "*.bmp",
+    max_workers: Optional[int] = None,
+    chunk_size: int = 500,
+    lead_in: Sequence[Path | str] = (),
+) -> Dict[str, np.ndarray]:
+    """
+    Same as fit_frames, spread over a process pool. The frame list is split into contiguous chunks; each worker reads
+    its own frames from disk (only paths are sent to it, never pixels) and writes its fits straight into a
+    shared-memory table indexed by frame number. Output order and the NaN rows for failed fits match fit_frames.
+    Contiguous chunks also keep RoiTracker useful, since each worker tracks the dot through consecutive frames.
+    A worker first runs the frames just before its chunk through its tracker and background model without keeping
+    them (ROI_WARMUP_FRAMES with a tracker, a full background ring), and chunks are whole background batches, so each
+    chunk starts where the serial run stood. The results then match fit_frames; the exception is a warm-up window
+    that lands one pixel off the serial one when its centroid rounds the other way. That changes the fit by about
+    the fit's own noise (~1e-3 px on a bright dot), and only on the first frames of a chunk.
+    `lead_in` (the frames just before `frames`) warms up the first chunk the same way, as in fit_frames.
+    """
+    paths, layout = _frame_paths(frames, layout, glob_pattern)
+    columns = result_columns(opts)
+    n_frames = len(paths)
+    if n_frames == 0:
+        return {name: np.empty(0) for name in columns}
+    _create_profiles(paths, layout, opts)  # workers open it themselves and fill their own rows
+
+    nbytes = n_frames * len(columns) * np.dtype(np.float64).itemsize
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    try:
+        table = np.ndarray((n_frames, len(columns)), dtype=np.float64, buffer=shm.buf)
+        table[:] = np.nan
+
+        if opts is not None and opts.background_frames > 0:
+            batch = max(1, opts.background_batch)
+            chunk_size = -(-chunk_size // batch) * batch  # serial batch boundaries fall on chunk boundaries
+        warmup = _warmup_frames(opts)
+        lead = [Path(p) for p in lead_in]
+        all_paths = lead + paths
+        jobs = []
+        for start in range(0, n_frames, chunk_size):
+            s = len(lead) + start
+            w = len(lead) if start == 0 else min(warmup, s)
+            jobs.append((shm.name, n_frames, start, w, all_paths[s - w:s + chunk_size], layout, opts))
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            for _ in pool.map(_fit_chunk, jobs):
+                pass
+
+        result = table.copy()
+        del table
+    finally:
+        shm.close()
+        shm.unlink()
+    return {name: result[:, i] for i, name in enumerate(columns)}
+
+
+def filter_fits(
+    results: Dict[str, np.ndarray],
+    fwhm_min: float,
+    fwhm_max: float,
+) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Drop failed fits (NaN/inf) and frames with unreasonable FWHM, as the notebook's filter_fits did.
+    Works on the output of fit_frames or of dot_fit2d.fit_frames_2d (its per-axis sigma_x/sigma_y give the FWHM).
+    Returns (filtered results with fwhm_x/fwhm_y added, mask over the input frames).
+    """
+    fwhm_x = FWHM_FACTOR * results["sigma_x"]
+    fwhm_y = FWHM_FACTOR * results["sigma_y"]
+
+    per_frame = [name for name, v in results.items() if np.ndim(v) == 1]
+    finite_mask = np.logical_and.reduce([np.isfinite(results[c]) for c in per_frame])
+    fwhm_mask = (
+        (fwhm_x > fwhm_min) & (fwhm_x < fwhm_max) &
+        (fwhm_y > fwhm_min) & (fwhm_y < fwhm_max)
+    )
+    mask = finite_mask & fwhm_mask
+
+    filtered = {name: v[mask] for name, v in results.items()}
+    filtered["fwhm_x"] = fwhm_x[mask]
+    filtered["fwhm_y"] = fwhm_y[mask]
+    return filtered, mask
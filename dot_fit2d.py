@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from dot_fit import (
+    QUALITY_COLUMNS, FitOptions, _create_profiles, _frame_paths, _make_background, find_dot_coarse, frame_quality,
+)
+from dot_io import BMPLayout, iter_frames
+
+# 2-D elliptical Gaussian fit of the dot. The 1-D fits in dot_fit collapse each frame to row/column sums, which throws
+# away the ellipticity and rotation we need to judge collimation. Here Levenberg-Marquardt runs on a whole stack of
+# frames (or ROIs) at once as (batch, pixels) NumPy arrays, with the Jacobian written out analytically.
+#
+# Model:  f(x, y) = amp * exp(-0.5 * (a dx^2 + 2 b dx dy + c dy^2)) + background,   dx = x - mu_x, dy = y - mu_y
+# (a, b, c) is the inverse covariance of the spot; it is turned into sigma_major/sigma_minor/theta after the fit.
+
+GAUSS2D_COLUMNS = ["amp", "mu_x", "mu_y", "sigma_major", "sigma_minor", "theta", "background"]
+
+_N_PARAMS = 7  # amp, mu_x, mu_y, a, b, c, background
+
+
+def _model_and_jacobian(
+    p: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    with_jacobian: bool = True,
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    # p: (B, 7); x, y: (P,) pixel coordinates. Returns model (B, P) and Jacobian (B, P, 7).
+    amp, mx, my, a, b, c, bg = (p[:, i:i + 1] for i in range(_N_PARAMS))
+    dx = x[None, :] - mx
+    dy = y[None, :] - my
+    e = np.exp(-0.5 * (a * dx * dx + 2 * b * dx * dy + c * dy * dy))
+    model = amp * e + bg
+    if not with_jacobian:
+        return model, None
+
+    ae = amp * e
+    jac = np.empty(model.shape + (_N_PARAMS,))
+    jac[..., 0] = e
+    jac[..., 1] = ae * (a * dx + b * dy)
+    jac[..., 2] = ae * (b * dx + c * dy)
+    jac[..., 3] = -0.5 * ae * dx * dx
+    jac[..., 4] = -ae * dx * dy
+    jac[..., 5] = -0.5 * ae * dy * dy
+    jac[..., 6] = 1.0
+    return model, jac
+
+
+def _initial_guess(z: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    # Background from the median, then intensity-weighted moments of the pixels above 10% of the peak
+    bg = np.median(z, axis=1)
+    amp = z.max(axis=1) - bg
+    w = z - bg[:, None]
+    w = np.where(w > 0.1 * amp[:, None], w, 0.0)
+    wsum = np.maximum(w.sum(axis=1), 1e-12)
+    mx = (w * x).sum(axis=1) / wsum
+    my = (w * y).sum(axis=1) / wsum
+    dx = x[None, :] - mx[:, None]
+    dy = y[None, :] - my[:, None]
+    sxx = np.maximum((w * dx * dx).sum(axis=1) / wsum, 0.25)
+    syy = np.maximum((w * dy * dy).sum(axis=1) / wsum, 0.25)
+    sxy = (w * dx * dy).sum(axis=1) / wsum
+    sxy = np.clip(sxy, -0.9 * np.sqrt(sxx * syy), 0.9 * np.sqrt(sxx * syy))
+    det = sxx * syy - sxy * sxy
+    return np.stack([amp, mx, my, syy / det, -sxy / det, sxx / det, bg], axis=1)
+
+
+def _shape_params(p: np.ndarray) -> np.ndarray:
+    # (amp, mu_x, mu_y, a, b, c, bg) -> GAUSS2D_COLUMNS, along the last axis
+    a, b, c = p[..., 3], p[..., 4], p[..., 5]
+    det = a * c - b * b
+    sxx, syy, sxy = c / det, a / det, -b / det
+    half_trace = 0.5 * (sxx + syy)
+    root = np.sqrt(0.25 * (sxx - syy) ** 2 + sxy ** 2)
+    major = np.sqrt(half_trace + root)
+    minor = np.sqrt(np.maximum(half_trace - root, 0.0))
+    theta = 0.5 * np.arctan2(2 * sxy, sxx - syy)  # major axis angle from +x [rad]
+    return np.stack([p[..., 0], p[..., 1], p[..., 2], major, minor, theta, p[..., 6]], axis=-1)
+
+
+def fit_gauss2d_batch(
+    stack: np.ndarray,
+    max_iter: int = 50,
+    tol: float = 1e-8,
+    p0: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Fit a 2-D elliptical Gaussian to every image in `stack` (shape (B, H, W)) simultaneously with
+    Levenberg-Marquardt. Coordinates are pixels of the images themselves (column = x, row = y).
+    Returns {column: (B,) array} for GAUSS2D_COLUMNS, plus sigma_x/sigma_y (widths along the pixel axes, comparable
+    with the 1-D profile fits), cost (sum of squared residuals), n_iter, and cov: (B, 7, 7) parameter covariance in
+    GAUSS2D_COLUMNS order. Frames that do not converge to a valid ellipse are NaN.
+    """
+    stack = np.asarray(stack, dtype=np.float64)
+    if stack.ndim == 2:
+        stack = stack[None]
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        return _levenberg_marquardt(stack, max_iter, tol, p0)
+
+
+def _levenberg_marquardt(
+    stack: np.ndarray,
+    max_iter: int,
+    tol: float,
+    p0: Optional[np.ndarray],
+) -> Dict[str, np.ndarray]:
+    n_batch, h, w = stack.shape
+    yy, xx = np.mgrid[:h, :w]
+    x = xx.ravel().astype(np.float64)
+    y = yy.ravel().astype(np.float64)
+    z = stack.reshape(n_batch, -1)
+
+    p = _initial_guess(z, x, y) if p0 is None else np.array(p0, dtype=np.float64)
+    lam = np.full(n_batch, 1e-3)
+    model, jac = _model_and_jacobian(p, x, y)
+    resid = z - model
+    cost = np.einsum("bp,bp->b", resid, resid)
+    active = np.isfinite(cost)
+    n_iter = np.zeros(n_batch, dtype=np.int64)
+    eye = np.eye(_N_PARAMS)
+
+    for _ in range(max_iter):
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+        j = jac[idx]
+        jtj = np.einsum("bpi,bpj->bij", j, j)
+        jtr = np.einsum("bpi,bp->bi", j, resid[idx])
+        damped = jtj + lam[idx, None, None] * (jtj * eye + 1e-12 * eye)
+        try:
+            step = np.linalg.solve(damped, jtr[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            step = np.stack([np.linalg.lstsq(m, r, rcond=None)[0] for m, r in zip(damped, jtr)])
+
+        trial = p[idx] + step
+        valid = (trial[:, 3] > 0) & (trial[:, 5] > 0) & (trial[:, 3] * trial[:, 5] > trial[:, 4] ** 2)
+        t_model, t_jac = _model_and_jacobian(trial, x, y)
+        t_resid = z[idx] - t_model
+        t_cost = np.einsum("bp,bp->b", t_resid, t_resid)
+        better = valid & np.isfinite(t_cost) & (t_cost < cost[idx])
+
+        acc = idx[better]
+        rel_change = (cost[acc] - t_cost[better]) / np.maximum(cost[acc], 1e-300)
+        p[acc] = trial[better]
+        resid[acc] = t_resid[better]
+        jac[acc] = t_jac[better]
+        cost[acc] = t_cost[better]
+        lam[acc] = np.maximum(lam[acc] / 10, 1e-12)
+        lam[idx[~better]] *= 10
+        n_iter[idx] += 1
+
+        done = np.zeros(n_batch, dtype=bool)
+        done[acc[rel_change < tol]] = True
+        done[idx[~better & (lam[idx] > 1e10)]] = True  # stuck: no downhill step even with heavy damping
+        active &= ~done
+
+    # Parameter covariance from the final Jacobian, scaled by the residual variance
+    dof = max(x.size - _N_PARAMS, 1)
+    jtj = np.einsum("bpi,bpj->bij", jac, jac)
+    cov_native = np.linalg.pinv(jtj) * (cost / dof)[:, None, None]
+
+    # Propagate to the reported parameters with a central-difference Jacobian of the (cheap) shape transform
+    steps = 1e-6 * np.maximum(np.abs(p), 1e-6)
+    t_jac = np.empty((n_batch, _N_PARAMS, _N_PARAMS))
+    for i in range(_N_PARAMS):
+        dp = np.zeros_like(p)
+        dp[:, i] = steps[:, i]
+        t_jac[:, :, i] = (_shape_params(p + dp) - _shape_params(p - dp)) / (2 * steps[:, i:i + 1])
+    cov = t_jac @ cov_native @ t_jac.transpose(0, 2, 1)
+
+    out = _shape_params(p)
+    det = p[:, 3] * p[:, 5] - p[:, 4] ** 2
+    ok = np.isfinite(cost) & (det > 0) & (p[:, 0] > 0) & np.all(np.isfinite(out), axis=1)
+    out[~ok] = np.nan
+    cov[~ok] = np.nan
+
+    result = {name: out[:, i] for i, name in enumerate(GAUSS2D_COLUMNS)}
+    result["sigma_x"] = np.where(ok, np.sqrt(p[:, 5] / det), np.nan)
+    result["sigma_y"] = np.where(ok, np.sqrt(p[:, 3] / det), np.nan)
+    result["cost"] = np.where(ok, cost, np.nan)
+    result["n_iter"] = n_iter
+    result["cov"] = cov
+    return result
+
+
+def _window_origin(center: Tuple[int, int], shape: Tuple[int, int], hw: int) -> Tuple[int, int]:
+    r0 = int(np.clip(center[0] - hw, 0, max(shape[0] - 2 * hw, 0)))
+    c0 = int(np.clip(center[1] - hw, 0, max(shape[1] - 2 * hw, 0)))
+    return r0, c0
+
+
+def _track_center(
+    img: np.ndarray,
+    center: Optional[Tuple[int, int]],
+    opts: FitOptions,
+) -> Optional[Tuple[int, int]]:
+    # Centroid of the above-half-maximum pixels in the window around the last position. Falls back to the coarse
+    # whole-frame search when there is no previous position, no clear peak, or the peak is near the window edge.
+    if center is not None:
+        hw = opts.roi_half_width
+        r0, c0 = _window_origin(center, img.shape, hw)
+        win = np.asarray(img[r0:r0 + 2 * hw, c0:c0 + 2 * hw], dtype=np.float64)
+        bg = np.median(win)
+        noise = max(1.4826 * np.median(np.abs(win - bg)), 1.0)
+        peak = win.max() - bg
+        if peak > opts.detect_snr * noise:
+            w = np.where(win - bg > 0.5 * peak, win - bg, 0.0)
+            rows, cols = np.indices(win.shape)
+            r = (w * rows).sum() / w.sum()
+            c = (w * cols).sum() / w.sum()
+            m = opts.roi_margin
+            if m <= r < win.shape[0] - m and m <= c < win.shape[1] - m:
+                return int(round(r)) + r0, int(round(c)) + c0
+    return find_dot_coarse(img, opts)
+
+
+def fit_frames_2d(
+    frames: Iterable[Path | str] | Path | str,
+    opts: Optional[FitOptions] = None,
+    layout: Optional[BMPLayout] = None,
+    glob_pattern: str = "*.bmp",
+    batch_size: int = 64,
+) -> Dict[str, np.ndarray]:
+    """
+    2-D counterpart of dot_fit.fit_frames: same inputs, one entry per frame in input order, NaN for failed fits.
+    With opts.roi_half_width set, each frame is cut down to a window around the previous centroid (found again on a
+    coarse frame when lost), which is how this should be run on full-size frames; without it whole frames are
+    stacked, so keep batch_size small. Centroids are in full-frame pixels.
+    The other FitOptions apply as in fit_frames: with opts.prefilter set the QUALITY_COLUMNS are added and flagged
+    frames are left NaN without being fit, the dark and rolling background are subtracted before fitting, and
+    opts.profile_dir caches the raw profiles.
+    """
+    if opts is None:
+        opts = FitOptions()
+    paths, layout = _frame_paths(frames, layout, glob_pattern)
+    hw = opts.roi_half_width
+    background = _make_background(opts)
+    profiles = _create_profiles(paths, layout, opts)
+
+    chunks: List[Dict[str, np.ndarray]] = []
+    windows: List[Optional[np.ndarray]] = []  # None for a frame the prefilter rejected
+    origins, qualities = [], []
+    center: Optional[Tuple[int, int]] = None
+
+    def flush():
+        fit = [i for i, win in enumerate(windows) if win is not None]
+        res = {key: np.full(len(windows), np.nan) for key in GAUSS2D_COLUMNS + ["sigma_x", "sigma_y", "cost"]}
+        res["n_iter"] = np.zeros(len(windows), dtype=np.int64)
+        res["cov"] = np.full((len(windows), len(GAUSS2D_COLUMNS), len(GAUSS2D_COLUMNS)), np.nan)
+        if fit:
+            stack = np.stack([windows[i] for i in fit])
+            fitted = fit_gauss2d_batch(stack)
+            # A window with no dot still converges on something; keep only spots that stand out of the noise
+            flat = stack.reshape(len(fit), -1).astype(np.float64)
+            noise = 1.4826 * np.median(np.abs(flat - np.median(flat, axis=1, keepdims=True)), axis=1)
+            faint = ~(fitted["amp"] > opts.detect_snr * np.maximum(noise, 1.0))
+            for key in fitted:
+                if key != "n_iter":
+                    fitted[key][faint] = np.nan
+                res[key][fit] = fitted[key]
+        org = np.array(origins, dtype=np.float64).reshape(-1, 2)
+        res["mu_x"] += org[:, 1]
+        res["mu_y"] += org[:, 0]
+        if opts.prefilter:
+            table = np.array(qualities).reshape(-1, len(QUALITY_COLUMNS))
+            res.update({name: table[:, i] for i, name in enumerate(QUALITY_COLUMNS)})
+        chunks.append(res)
+        windows.clear()
+        origins.clear()
+        qualities.clear()
+
+    n_read = 0
+    frames_iter = iter_frames(paths, layout)
+    while True:
+        # Read in background batches, so each batch is corrected with the model from the frames before it
+        batch = list(islice(frames_iter, opts.background_batch if background is not None else 1))
+        if not batch:
+            break
+        skip = [False] * len(batch)
+        quality = [None] * len(batch)
+        for j, img in enumerate(batch):
+            if profiles is not None:
+                profiles.put(n_read + j, img)
+            if opts.prefilter:
+                quality[j] = frame_quality(img, opts)
+                skip[j] = bool(int(quality[j][-1]) & opts.skip_quality)
+                if not skip[j] and hw and center is None:
+                    # The rough centroid is as good a starting window as the coarse search
+                    center = (int(round(quality[j][4])), int(round(quality[j][3])))
+        if background is not None:
+            batch = background.correct(batch, push=[not k for k in skip])  # flagged frames stay out of it
+        n_read += len(batch)
+
+        for j, img in enumerate(batch):
+            if opts.prefilter:
+                qualities.append(quality[j])
+            if skip[j]:
+                windows.append(None)
+                origins.append((0, 0))
+            elif not hw:
+                windows.append(img)
+                origins.append((0, 0))
+            else:
+                # The batch is fit later, so follow the dot frame to frame with a cheap peak-centroid, not the fit
+                center = _track_center(img, center, opts)
+                # No dot on this frame: fit the middle of the frame anyway so it comes back as a NaN row in order
+                center_here = center if center is not None else (img.shape[0] // 2, img.shape[1] // 2)
+                r0, c0 = _window_origin(center_here, img.shape, hw)
+                windows.append(img[r0:r0 + 2 * hw, c0:c0 + 2 * hw])
+                origins.append((r0, c0))
+            if len(windows) >= batch_size:
+                flush()
+    if windows:
+        flush()
+    if profiles is not None:
+        profiles.flush()
+
+    if not chunks:
+        return {name: np.empty(0) for name in GAUSS2D_COLUMNS}
+    return {key: np.concatenate([c[key] for c in chunks]) for key in chunks[0]}
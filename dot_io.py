@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import os
+import re
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Readers for the reverse telescope camera frames. The camera writes uncompressed BMPs; the notebooks used to convert
+# every one of them to FITS (bmp_to_fits.ipynb) just so dot_movie.ipynb could read them back. These helpers read the
+# BMP pixel data directly as zero-copy views, and keep the FITS conversion around (in parallel) for archiving.
+
+try:
+    from astropy.io import fits as _fits  # type: ignore
+    _HAVE_ASTROPY = True
+except Exception:
+    _HAVE_ASTROPY = False
+
+
+# ---- Configuration -----------------------------------------------------------
+
+# Capture timestamp at the end of names like:
+#   minutely0001 25-09-22 09-39-50.bmp
+# (this is the bmp_file[-21:-4] slice used in bmp_to_fits.ipynb)
+FRAME_TIMESTAMP_RE = re.compile(r"(?P<stamp>\d{2}-\d{2}-\d{2} \d{2}-\d{2}-\d{2})\.(?:bmp|fits)$", re.IGNORECASE)
+FRAME_TIMESTAMP_FORMAT = "%y-%m-%d %H-%M-%S"
+
+_BMP_FILE_HEADER = struct.Struct("<2sIHHI")      # bfType, bfSize, reserved1, reserved2, bfOffBits
+_BMP_INFO_HEADER = struct.Struct("<IiiHHIIiiII")  # BITMAPINFOHEADER (40 bytes)
+_BI_RGB = 0
+
+
+@dataclass(frozen=True)
+class BMPLayout:
+    """
+    Pixel layout of an uncompressed BMP. A capture session writes every frame with the same camera settings, so the
+    layout is parsed once per directory and reused for every frame in it.
+    """
+    data_offset: int
+    width: int
+    height: int
+    bits_per_pixel: int
+    row_stride: int
+    top_down: bool
+    palette: Optional[np.ndarray] = None  # (N, 3) RGB palette for 8-bit images, None if it is plain grayscale
+
+    @property
+    def file_size(self) -> int:
+        return self.data_offset + self.row_stride * self.height
+
+
+# ---- Helpers ----------------------------------------------------------------
+
+def parse_frame_timestamp(path: Path | str) -> Optional[datetime]:
+    """
+    Extract the capture time embedded in a frame filename, or None if the name carries no timestamp
+    (e.g. the max-framerate runs named only by frame number).
+    """
+    m = FRAME_TIMESTAMP_RE.search(Path(path).name)
+    if not m:
+        return None
+    return datetime.strptime(m.group("stamp"), FRAME_TIMESTAMP_FORMAT)
+
+
+def read_bmp_layout(path: Path | str) -> BMPLayout:
+    """
+    Parse the file and info headers of an uncompressed 8/24/32-bit BMP.
+    """
+    with open(path, "rb") as f:
+        head = f.read(_BMP_FILE_HEADER.size + _BMP_INFO_HEADER.size)
+        if len(head) < _BMP_FILE_HEADER.size + _BMP_INFO_HEADER.size:
+            raise ValueError(f"File too short to be a BMP: {path}")
+
+        magic, _, _, _, data_offset = _BMP_FILE_HEADER.unpack_from(head, 0)
+        if magic != b"BM":
+            raise ValueError(f"Not a BMP file: {path}")
+
+        (dib_size, width, height, planes, bpp, compression,
+         _, _, _, colors_used, _) = _BMP_INFO_HEADER.unpack_from(head, _BMP_FILE_HEADER.size)
+        if dib_size < _BMP_INFO_HEADER.size:
+            raise ValueError(f"Unsupported BMP header (size {dib_size}) in {path}")
+        if compression != _BI_RGB:
+            raise ValueError(f"Compressed BMPs are not supported (compression={compression}) in {path}")
+        if bpp not in (8, 24, 32):
+            raise ValueError(f"Unsupported BMP bit depth {bpp} in {path}")
+
+        palette = None
+        if bpp == 8:
+            n_colors = colors_used or 256
+            f.seek(_BMP_FILE_HEADER.size + dib_size)
+            raw = np.frombuffer(f.read(4 * n_colors), dtype=np.uint8).reshape(-1, 4)
+            rgb = raw[:, 2::-1]  # stored as BGRx
+            gray_ramp = np.arange(rgb.shape[0], dtype=np.uint8)
+            is_gray = all(np.array_equal(rgb[:, c], gray_ramp) for c in range(3))
+            palette = None if is_gray else rgb.copy()
+
+    row_stride = ((width * bpp + 31) // 32) * 4  # rows are padded to 4 bytes
+    return BMPLayout(
+        data_offset=data_offset,
+        width=width,
+        height=abs(height),
+        bits_per_pixel=bpp,
+        row_stride=row_stride,
+        top_down=height < 0,
+        palette=palette,
+    )
+
+
+def read_bmp(path: Path | str, layout: Optional[BMPLayout] = None) -> np.ndarray:
+    """
+    Read a BMP frame as a 2-D grayscale array in the same orientation openfits() returns for the converted FITS
+    (flipped 180 degrees). For 8-bit grayscale frames the result is a read-only view on a memory map of the file, so
+    nothing is decoded or copied. Color frames are reduced to luma the same way PIL's convert("L") does.
+    """
+    if layout is None:
+        layout = read_bmp_layout(path)
+
+    raw = np.memmap(path, dtype=np.uint8, mode="r", offset=layout.data_offset,
+                    shape=(layout.height, layout.row_stride))
+
+    # PIL returns the image top row first; openfits then flips it by 180 degrees. For the usual bottom-up BMP that is
+    # just the stored rows mirrored left to right.
+    rows = raw[::-1, ::-1] if layout.top_down else raw[:, ::-1]
+
+    if layout.bits_per_pixel == 8:
+        img = rows[:, layout.row_stride - layout.width:]
+        if layout.palette is not None:
+            return _luma(layout.palette[img])
+        return img
+
+    n_channels = layout.bits_per_pixel // 8
+    img = rows[:, layout.row_stride - layout.width * n_channels:].reshape(layout.height, layout.width, n_channels)
+    # The row reversal above also reversed the byte order inside each pixel: BGR(x) reads as (x)RGB
+    return _luma(img[..., -3:])
+
+
+def _luma(rgb: np.ndarray) -> np.ndarray:
+    # ITU-R 601-2 luma with the same fixed-point rounding as PIL's convert("L")
+    rgb = rgb.astype(np.uint32)
+    y = (rgb[..., 0] * 19595 + rgb[..., 1] * 38470 + rgb[..., 2] * 7471 + 0x8000) >> 16
+    return y.astype(np.uint8)
+
+
+def read_fits(path: Path | str) -> np.ndarray:
+    """
+    Read a converted FITS frame, flipped 180 degrees like dot_movie's openfits().
+    """
+    if not _HAVE_ASTROPY:
+        raise RuntimeError("astropy not available for reading FITS")
+    with _fits.open(path) as hdu:
+        data = np.flip(hdu[0].data, axis=(0, 1)).copy()  # force load before the file closes
+    return data
+
+
+def load_frame(path: Path | str, layout: Optional[BMPLayout] = None) -> np.ndarray:
+    """
+    Read one frame, BMP or FITS, chosen by extension.
+    """
+    if Path(path).suffix.lower() == ".bmp":
+        return read_bmp(path, layout)
+    return read_fits(path)
+
+
+def list_frames(
+    directory: Path | str,
+    glob_pattern: str = "*.bmp",
+) -> Tuple[List[Path], Optional[BMPLayout]]:
+    """
+    List the frames of one capture folder in name order and parse the BMP layout once from the first frame.
+    Returns (paths, layout); layout is None when the folder holds FITS files.
+    """
+    paths = sorted(Path(directory).glob(glob_pattern))
+    if not paths:
+        raise FileNotFoundError(f"No frames matching {glob_pattern} in {directory}")
+    layout = read_bmp_layout(paths[0]) if paths[0].suffix.lower() == ".bmp" else None
+    return paths, layout
+
+
+def iter_frames(
+    paths: Iterable[Path | str],
+    layout: Optional[BMPLayout] = None,
+) -> Iterator[np.ndarray]:
+    """
+    Yield frames one at a time. A BMP whose size disagrees with the shared layout (e.g. a stray snapshot saved
+    with different settings) gets its own header parsed instead of being misread.
+    """
+    for p in paths:
+        frame_layout = layout
+        if layout is not None and os.path.getsize(p) != layout.file_size:
+            frame_layout = None
+        yield load_frame(p, frame_layout)
+
+
+# ---- FITS archiving ----------------------------------------------------------
+
+def _convert_one(args: Tuple[str, str, Optional[BMPLayout]]) -> str:
+    bmp_path, fits_path, layout = args
+    # FITS keeps the image the way PIL reads it (top row first), so undo read_bmp's 180 degree flip
+    data = np.ascontiguousarray(np.flip(read_bmp(bmp_path, layout), axis=(0, 1)))
+    hdu = _fits.PrimaryHDU(data)
+    stamp = parse_frame_timestamp(bmp_path)
+    if stamp is not None:
+        hdu.header["DATE-OBS"] = stamp.isoformat()
+    hdu.writeto(fits_path, overwrite=True)
+    return fits_path
+
+
+def convert_to_fits(
+    bmp_paths: Iterable[Path | str],
+    out_dir: Path | str,
+    max_workers: Optional[int] = None,
+    overwrite: bool = False,
+) -> List[Path]:
+    """
+    Archive BMP frames as FITS in a process pool. Frames whose FITS file already exists and is newer than the BMP are
+    skipped unless overwrite=True, so an interrupted conversion picks up where it left off.
+    Returns the FITS paths that were written.
+    """
+    if not _HAVE_ASTROPY:
+        raise RuntimeError("astropy not available for writing FITS")
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    bmp_paths = [Path(p) for p in bmp_paths]
+    layout = read_bmp_layout(bmp_paths[0]) if bmp_paths else None
+
+    jobs = []
+    for bmp in bmp_paths:
+        target = out_dir / (bmp.stem + ".fits")
+        if not overwrite and target.exists() and target.stat().st_mtime >= bmp.stat().st_mtime:
+            continue
+        frame_layout = layout if layout is not None and bmp.stat().st_size == layout.file_size else None
+        jobs.append((str(bmp), str(target), frame_layout))
+
+    if not jobs:
+        return []
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        written = list(pool.map(_convert_one, jobs, chunksize=max(1, len(jobs) // (4 * (os.cpu_count() or 1)))))
+    return [Path(p) for p in written]
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from math import factorial
+from typing import TYPE_CHECKING, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sensor_align import frame_windows
+
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
+
+# Spectra of unevenly sampled series: centroid/FWHM after filter_fits has dropped frames, minutely runs with timing
+# jitter, temperature logs with gaps. dot_movie's compute_fft assumed exactly 52.37 fps, which is wrong as soon as a
+# frame is missing. This is the Press & Rybicki (1989) fast Lomb-Scargle periodogram: the trig sums over the real
+# sample times are "extirpolated" onto a regular grid and done with one FFT, so it is O(N log N).
+
+
+def _extirpolate(x: np.ndarray, y: np.ndarray, n: int, m: int = 4) -> np.ndarray:
+    # Spread each value y at fractional position x over the m nearest grid points (Lagrange weights), such that
+    # sum(grid * f(grid index)) ~= sum(y * f(x)) for any smooth f
+    result = np.zeros(n, dtype=y.dtype)
+    on_grid = x % 1 == 0
+    np.add.at(result, x[on_grid].astype(int), y[on_grid])
+    x, y = x[~on_grid], y[~on_grid]
+
+    ilo = np.clip((x - m // 2).astype(int), 0, n - m)
+    numerator = y * np.prod(x - ilo - np.arange(m)[:, None], axis=0)
+    denominator = factorial(m - 1)
+    for j in range(m):
+        if j > 0:
+            denominator *= j / (j - m)
+        ind = ilo + (m - 1 - j)
+        np.add.at(result, ind, numerator / (denominator * (x - ind)))
+    return result
+
+
+def _trig_sums(
+    t: np.ndarray,
+    h: np.ndarray,
+    f0: float,
+    df: float,
+    n_freq: int,
+    freq_factor: int = 1,
+    oversampling: int = 5,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # S_k = sum(h sin(2 pi f_k t)), C_k = sum(h cos(2 pi f_k t)) for f_k = freq_factor * (f0 + k df)
+    df *= freq_factor
+    f0 *= freq_factor
+    t0 = t.min()
+    h = h * np.exp(2j * np.pi * f0 * (t - t0)) if f0 != 0 else h.astype(complex)
+    tnorm = ((t - t0) * df) % 1
+
+    n_fft = 1 << int(np.ceil(np.log2(max(n_freq * oversampling, 16))))
+    grid = _extirpolate(tnorm * n_fft, h, n_fft)
+    fft_grid = np.fft.ifft(grid)[:n_freq] * n_fft
+    fft_grid *= np.exp(2j * np.pi * t0 * (f0 + df * np.arange(n_freq)))
+    return fft_grid.imag, fft_grid.real
+
+
+def lomb_scargle(
+    t: np.ndarray,
+    y: np.ndarray,
+    df: Optional[float] = None,
+    f_max: Optional[float] = None,
+    f_min: Optional[float] = None,
+    oversample: float = 4.0,
+    scaling: str = "density",
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fast Lomb-Scargle periodogram of y sampled at times t [s], on the uniform grid f_min, f_min + df, ... <= f_max.
+    Defaults: df = 1 / (oversample * span), f_min = df, f_max = half the median sample rate.
+    To compare with an accelerometer Welch PSD, pass df = 1 / FFTOptions.nperseg_seconds.
+
+    scaling="density" gives a one-sided PSD [units^2/Hz] that matches the Welch/periodogram level for evenly sampled
+    data; "standard" gives the classic Lomb-Scargle power normalised to [0, 1]. NaNs in y are dropped.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    ok = np.isfinite(t) & np.isfinite(y)
+    t, y = t[ok], y[ok]
+    if t.size < 3:
+        raise ValueError("Need at least 3 finite samples for a periodogram")
+    order = np.argsort(t, kind="stable")
+    t, y = t[order], y[order]
+
+    span = t[-1] - t[0]
+    if df is None:
+        df = 1.0 / (oversample * span)
+    if f_min is None:
+        f_min = df
+    if f_max is None:
+        dt = np.diff(t)
+        f_max = 0.5 / np.median(dt[dt > 0])
+    n_freq = int(np.floor((f_max - f_min) / df)) + 1
+    freqs = f_min + df * np.arange(n_freq)
+
+    n = t.size
+    w = np.full(n, 1.0 / n)
+    y = y - y.mean()
+
+    sh, ch = _trig_sums(t, w * y, f_min, df, n_freq)
+    s2, c2 = _trig_sums(t, w, f_min, df, n_freq, freq_factor=2)
+
+    # tau: the time offset that makes the sine and cosine terms orthogonal at each frequency
+    two_wt = np.arctan2(s2, c2)
+    c2w, s2w = np.cos(two_wt), np.sin(two_wt)
+    cw = np.sqrt(0.5 * (1 + c2w))
+    sw = np.sign(s2w) * np.sqrt(0.5 * (1 - c2w))
+
+    yc = ch * cw + sh * sw
+    ys = sh * cw - ch * sw
+    cc = 0.5 * (1 + c2 * c2w + s2 * s2w)
+    ss = 0.5 * (1 - c2 * c2w - s2 * s2w)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        power = yc * yc / cc + ys * ys / ss
+
+    if scaling == "standard":
+        power = power / np.dot(w, y * y)
+    elif scaling == "density":
+        # Classical periodogram 0.5 * N * power, doubled for one-sided and scaled by the mean sample spacing
+        power = power * n * (span / (n - 1))
+    else:
+        raise ValueError(f"Unknown scaling {scaling!r}")
+    return freqs, power
+
+
+def frame_times_s(
+    frames: pd.DataFrame,
+    fps: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Sample times [s from the first frame] for a per-frame table (e.g. FitStore.load()). Uses the capture timestamps
+    when every frame has one, with frames that share a filename second spread across it; otherwise frame number / fps
+    (frame numbers come from the table index, so frames dropped by filter_fits leave real gaps).
+    """
+    if "timestamp" in frames and frames["timestamp"].notna().all() and len(frames):
+        starts, _ = frame_windows(frames["timestamp"])
+        return (starts - starts[0]) / 1e9
+    if fps is None:
+        raise ValueError("Frames have no timestamps; pass the nominal fps")
+    idx = np.asarray(frames.index, dtype=np.float64)
+    return (idx - idx[0]) / fps
+
+
+def series_periodograms(
+    t: np.ndarray,
+    series: Mapping[str, np.ndarray],
+    **kwargs,
+) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Lomb-Scargle every series in `series` against the same times on one shared frequency grid.
+    {name: values} -> {name: (f, P)}; kwargs go to lomb_scargle. Works for centroid/FWHM columns, temperature and
+    humidity channels alike.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    if "df" not in kwargs or "f_max" not in kwargs:
+        # Fix the grid from all samples, so series with different NaN patterns still share it
+        span = np.nanmax(t) - np.nanmin(t)
+        kwargs.setdefault("df", 1.0 / (kwargs.get("oversample", 4.0) * span))
+        dt = np.diff(np.sort(t))
+        kwargs.setdefault("f_max", 0.5 / np.median(dt[dt > 0]))
+    return {name: lomb_scargle(t, np.asarray(v, dtype=np.float64), **kwargs) for name, v in series.items()}
+
+
+def plot_periodograms(
+    spectra: Mapping[str, Tuple[np.ndarray, np.ndarray]],
+    log_x: bool = True,
+    log_y: bool = True,
+    y_label: str = "PSD [px²/Hz]",
+) -> plt.Figure:
+    """
+    One panel per series, in the 2x2 layout the notebook used for mu_x, mu_y, FWHM_x, FWHM_y.
+    """
+    import matplotlib.pyplot as plt
+
+    n = len(spectra)
+    ncols = 2 if n > 1 else 1
+    nrows = int(np.ceil(n / ncols))
+    fig, axs = plt.subplots(nrows, ncols, figsize=(12, 4 * nrows), squeeze=False)
+    for ax, (name, (f, p)) in zip(axs.ravel(), spectra.items()):
+        ax.plot(f, p)
+        ax.set_title(f"Lomb-Scargle of {name}")
+        ax.set_xlabel("Frequency [Hz]")
+        ax.set_ylabel(y_label)
+        ax.grid(True, which="both", alpha=0.3)
+        if log_x:
+            ax.set_xscale("log")
+        if log_y:
+            ax.set_yscale("log")
+    for ax in axs.ravel()[n:]:
+        ax.axis("off")
+    fig.tight_layout()
+    return fig
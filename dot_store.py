@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import csv
+import io
+import os
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from dot_fit import (
+    FIT_COLUMNS, FWHM_FACTOR, QUALITY_COLUMNS, FitOptions, FitState, _warmup_frames, fit_frames, fit_frames_parallel,
+)
+from dot_io import list_frames, parse_frame_timestamp
+
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
+
+# Persistent per-frame results for a capture folder, so overnight/weekend runs can be analysed while they are still
+# going and an interrupted analysis picks up where it stopped. Results are appended to a CSV (one row per frame,
+# keyed by frame filename) and fsync'd after every batch, so at most one batch is lost if the machine goes down.
+
+STORE_FILENAME = "dot_fits.csv"
+STORE_COLUMNS = ["frame", "timestamp", "status", *FIT_COLUMNS, "fwhm_x", "fwhm_y", *QUALITY_COLUMNS]
+
+
+class FitStore:
+    """
+    Append-only CSV of per-frame fit results.
+    """
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self._done: Optional[Set[str]] = None
+
+    def done(self) -> Set[str]:
+        """
+        Filenames of frames already in the store.
+        """
+        if self._done is None:
+            self._done = set(self.load()["frame"]) if self.path.exists() else set()
+        return self._done
+
+    def load(self) -> pd.DataFrame:
+        """
+        Read the store, sorted by frame name. A half-written last line (crash mid-append) is dropped.
+        """
+        if not self.path.exists():
+            return pd.DataFrame(columns=STORE_COLUMNS)
+        text = self.path.read_text()
+        if not text.endswith("\n"):
+            text = text[:text.rfind("\n") + 1]
+        df = pd.read_csv(io.StringIO(text)) if text else pd.DataFrame(columns=STORE_COLUMNS)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+        return df.drop_duplicates("frame", keep="last").sort_values("frame", ignore_index=True)
+
+    def append(
+        self,
+        paths: List[Path],
+        results: Dict[str, np.ndarray],
+        opts: Optional[FitOptions] = None,
+    ) -> None:
+        """
+        Add one batch of fits (as returned by fit_frames with `opts`) for `paths`, and flush it to disk.
+        Status is "ok", "failed" (fit did not converge) or "skipped" (rejected by the prefilter, see QUALITY_COLUMNS).
+        Quality columns are left empty when the prefilter was off.
+        """
+        new_file = not self.path.exists()
+        columns = STORE_COLUMNS if new_file else self._header()
+        if not new_file:
+            self._truncate_partial_line()
+        skip_quality = opts.skip_quality if opts is not None and opts.prefilter else 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, mode="a", newline="") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(columns)
+            for i, p in enumerate(paths):
+                params = [results[c][i] for c in FIT_COLUMNS]
+                quality = int(results["quality"][i]) if "quality" in results else 0
+                if quality & skip_quality:
+                    status = "skipped"
+                else:
+                    status = "ok" if np.all(np.isfinite(params)) else "failed"
+                stamp = parse_frame_timestamp(p)
+                row = {
+                    "frame": p.name,
+                    "timestamp": stamp.isoformat(sep=" ") if stamp is not None else "",
+                    "status": status,
+                    "fwhm_x": FWHM_FACTOR * results["sigma_x"][i],
+                    "fwhm_y": FWHM_FACTOR * results["sigma_y"][i],
+                }
+                for c in FIT_COLUMNS + QUALITY_COLUMNS:
+                    row[c] = results[c][i] if c in results else ""
+                writer.writerow([row.get(c, "") for c in columns])
+            f.flush()
+            os.fsync(f.fileno())
+        self.done().update(p.name for p in paths)
+
+    def _header(self) -> List[str]:
+        # Stores written before the quality columns existed keep their own column layout
+        with open(self.path, newline="") as f:
+            return next(csv.reader(f), STORE_COLUMNS)
+
+    def _truncate_partial_line(self) -> None:
+        # Drop a row left half-written by a crash, so the next append starts on a clean line
+        with open(self.path, mode="rb+") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            f.seek(0)
+            keep = f.read().rfind(b"\n") + 1
+            f.truncate(keep)
+
+
+def process_new_frames(
+    directory: Path | str,
+    store: Optional[FitStore] = None,
+    opts: Optional[FitOptions] = None,
+    glob_pattern: str = "*.bmp",
+    batch_size: int = 500,
+    parallel: bool = False,
+    state: Optional[FitState] = None,
+) -> int:
+    """
+    Fit every frame in `directory` that is not yet in the store, in batches that are committed as they finish.
+    A BMP still being written by the camera (shorter than the folder's layout) is left for the next pass.
+    The tracker and background model carry on from batch to batch, and from pass to pass when the caller keeps a
+    FitState (made with the same opts) for them; a fresh one is first run through the frames just before the new
+    ones. Batches are rounded up to whole background batches so the fits match one fit_frames over the folder.
+    In parallel each batch is warmed up from the frames before it instead (see fit_frames_parallel).
+    Returns the number of frames processed.
+    """
+    directory = Path(directory)
+    if store is None:
+        store = FitStore(directory / STORE_FILENAME)
+
+    try:
+        paths, layout = list_frames(directory, glob_pattern)
+    except FileNotFoundError:
+        return 0
+    done = store.done()
+    ready = [p for p in paths if layout is None or os.path.getsize(p) >= layout.file_size]
+    index = {p.name: i for i, p in enumerate(ready)}
+    todo = [p for p in ready if p.name not in done]
+
+    if opts is not None and opts.profile_dir is not None:
+        # A ProfileCache covers one whole run; rebuilding it per batch would keep only the last batch
+        opts = replace(opts, profile_dir=None)
+    if opts is not None and opts.background_frames > 0:
+        batch = max(1, opts.background_batch)
+        batch_size = -(-batch_size // batch) * batch
+    if state is None and not parallel:
+        state = FitState(opts)
+    warmup = _warmup_frames(opts)
+    for start in range(0, len(todo), batch_size):
+        batch = todo[start:start + batch_size]
+        first = index[batch[0].name]
+        if parallel:
+            lead = ready[max(0, first - warmup):first]
+            results = fit_frames_parallel(batch, opts, layout=layout, lead_in=lead)
+        else:
+            lead = ready[max(0, first - warmup):first] if state.n_frames == 0 else []
+            results = fit_frames(batch, opts, layout=layout, state=state, lead_in=lead)
+        store.append(batch, results, opts)
+    return len(todo)
+
+
+def plot_drift(df: pd.DataFrame, out_path: Optional[Path | str] = None) -> plt.Figure:
+    """
+    Centroid shift (relative to the first good frame) and FWHM over time, from a FitStore table.
+    Uses the capture timestamps when the frames have them, frame number otherwise.
+    """
+    import matplotlib.pyplot as plt
+
+    good = df[df["status"] == "ok"]
+    x = good["timestamp"] if good["timestamp"].notna().all() and len(good) else np.arange(len(good))
+
+    fig, axs = plt.subplots(4, 1, figsize=(10, 12), sharex=True)
+    if len(good):
+        axs[0].plot(x, good["mu_x"] - good["mu_x"].iloc[0], color="blue")
+        axs[1].plot(x, good["mu_y"] - good["mu_y"].iloc[0], color="green")
+        axs[2].plot(x, good["fwhm_x"], color="blue")
+        axs[3].plot(x, good["fwhm_y"], color="green")
+    axs[0].set_ylabel("X centroid shift (pixels)")
+    axs[1].set_ylabel("Y centroid shift (pixels)")
+    axs[2].set_ylabel("FWHM X (pixels)")
+    axs[3].set_ylabel("FWHM Y (pixels)")
+    axs[3].set_xlabel("Time" if not isinstance(x, np.ndarray) else "Frame")
+    for ax in axs:
+        ax.grid(True)
+    axs[0].set_title(f"{len(good)} good / {len(df)} frames")
+    fig.tight_layout()
+
+    if out_path:
+        fig.savefig(out_path, dpi=150)
+    return fig
+
+
+def watch(
+    directory: Path | str,
+    store_path: Optional[Path | str] = None,
+    opts: Optional[FitOptions] = None,
+    glob_pattern: str = "*.bmp",
+    poll_seconds: float = 60.0,
+    plot_path: Optional[Path | str] = None,
+    on_update: Optional[Callable[[pd.DataFrame], None]] = None,
+    parallel: bool = False,
+) -> FitStore:
+    """
+    Keep fitting a capture folder as the camera adds frames, until interrupted (Ctrl+C). Each pass only processes new
+    frames; after a pass that found some, the drift plot at `plot_path` is redrawn and `on_update` is called with
+    the full results table. Restarting after an interruption resumes from the store.
+    """
+    directory = Path(directory)
+    store = FitStore(store_path or directory / STORE_FILENAME)
+    state = None if parallel else FitState(opts)  # the tracker and background follow the dot from pass to pass
+    try:
+        while True:
+            n_new = process_new_frames(directory, store, opts, glob_pattern, parallel=parallel, state=state)
+            if n_new:
+                df = store.load()
+                print(f"{time.strftime('%Y-%m-%d %H:%M:%S')}: fit {n_new} new frames ({len(df)} total)")
+                if plot_path:
+                    import matplotlib.pyplot as plt
+                    plt.close(plot_drift(df, plot_path))
+                if on_update:
+                    on_update(df)
+            time.sleep(poll_seconds)
+    except KeyboardInterrupt:
+        print("Watch stopped by user.")
+    return store
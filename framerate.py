@@ -1,59 +1,229 @@
-import os
-import datetime
+from __future__ import annotations
+
 import csv
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from dot_io import FRAME_TIMESTAMP_RE, parse_frame_timestamp
+
+# This code is to go through the reverse telescope camera data folders and output a human-readable list of folders and
+# their framerates.
+# The archive lives on the Z: network share, where every metadata call is a round trip. Each folder is listed once with
+# os.scandir and every file is stat'ed once (on Windows the stat comes with the listing for free); folders are scanned
+# in parallel threads, and an audit cache keyed on folder mtime means re-auditing only lists folders that changed.
+
+FRAME_EXTENSIONS = (".bmp", ".fits")
+CACHE_FILENAME = "framerate_cache.json"
+
+# Inter-frame interval histogram bins [s]: max framerate (~52 fps) up to minutely runs and logger downtime
+INTERVAL_BINS_S = [0, 0.015, 0.025, 0.05, 0.1, 0.5, 0.9, 1.1, 2, 10, 55, 65, 120, 600, 3600, float("inf")]
+
+# Same columns as the original calculate_framerate output, followed by the audit statistics
+AUDIT_COLUMNS = [
+    "folder", "subfolder", "first_file", "last_file", "num_files", "time_diff_seconds", "framerate",
+    "median_interval_s", "max_gap_s", "dropped_frames",
+    "stamped_files", "stamp_first", "stamp_last", "stamp_framerate", "shared_second_frames", "second_keyed",
+    "overwritten_files",
+]
+
+_OVERWRITE_S = 0.25  # a file last written this long after it was created held more than one frame
+OVERWRITES_UNKNOWN = -1  # overwritten_files where the filesystem keeps no creation times
+
+
+def _interval_columns() -> List[str]:
+    edges = INTERVAL_BINS_S
+    return [f"dt_{lo:g}-{hi:g}s" for lo, hi in zip(edges[:-2], edges[1:-1])] + [f"dt_over_{edges[-2]:g}s"]
+
+
+def _birth_time(st: os.stat_result) -> Optional[float]:
+    # File creation time: st_birthtime where the OS has it, st_ctime on Windows (creation there), else unknown
+    if hasattr(st, "st_birthtime"):
+        return st.st_birthtime
+    return st.st_ctime if os.name == "nt" else None
+
 
-from docutils.nodes import field_name
-# This code is to go through the reverse telescope camera data folders and output a human-readable list of folders and their framerates.
+def audit_files(
+    folder: Path | str,
+    names: Sequence[str],
+    mtimes: np.ndarray,
+    births: Optional[np.ndarray] = None,
+) -> Optional[Dict]:
+    """
+    Frame-rate statistics of one run from its file names and stat times (no disk access). None with fewer than 2 frames.
+    Intervals come from the modification times, which have sub-second resolution; gaps longer than 1.5x the median
+    interval count as dropped frames. Filename timestamps give the capture span independently of the file times.
+    Second-keyed folders (names that differ only by their timestamp) keep one file per second: frames written faster
+    than 1 fps overwrite each other, which shows up as files last written well after they were created
+    (overwritten_files is OVERWRITES_UNKNOWN without creation times).
+    """
+    if len(names) < 2:
+        return None
+    folder = Path(folder)
+    order = np.lexsort((np.asarray(names), mtimes))
+    names = [names[i] for i in order]
+    mtimes = np.asarray(mtimes, dtype=np.float64)[order]
 
-def calculate_framerate(folder_path):
-    # Iterate through each subfolder in the main folder
+    dt = np.diff(mtimes)
+    time_diff = float(mtimes[-1] - mtimes[0])
+    positive = dt[dt > 0]
+    median_dt = float(np.median(positive)) if positive.size else float("nan")
+    if np.isfinite(median_dt):
+        gaps = dt[dt > 1.5 * median_dt]
+        dropped = int(np.sum(np.maximum(np.rint(gaps / median_dt) - 1, 0)))
+    else:
+        dropped = 0
+    hist, _ = np.histogram(dt, bins=INTERVAL_BINS_S)
+
+    stamps = [parse_frame_timestamp(n) for n in names]
+    stamped = [s for s in stamps if s is not None]
+    result = {
+        "folder": str(folder.parent),
+        "subfolder": folder.name,
+        "first_file": str(folder / names[0]),
+        "last_file": str(folder / names[-1]),
+        "num_files": len(names),
+        "time_diff_seconds": time_diff,
+        "framerate": (len(names) - 1) / time_diff if time_diff > 0 else float("nan"),
+        "median_interval_s": median_dt,
+        "max_gap_s": float(dt.max()),
+        "dropped_frames": dropped,
+        "stamped_files": len(stamped),
+        "stamp_first": "",
+        "stamp_last": "",
+        "stamp_framerate": float("nan"),
+        "shared_second_frames": 0,
+        "second_keyed": False,
+        "overwritten_files": OVERWRITES_UNKNOWN,
+    }
+    if stamped:
+        first, last = min(stamped), max(stamped)
+        span = (last - first).total_seconds()
+        _, counts = np.unique([s.timestamp() for s in stamped], return_counts=True)
+        result.update({
+            "stamp_first": first.isoformat(sep=" "),
+            "stamp_last": last.isoformat(sep=" "),
+            "stamp_framerate": (len(stamped) - 1) / span if span > 0 else float("nan"),
+            "shared_second_frames": int(counts[counts > 1].sum()),
+            "second_keyed": len({FRAME_TIMESTAMP_RE.sub("", n) for n in names}) == 1,
+        })
+    if births is not None:
+        births = np.asarray(births, dtype=np.float64)[order]
+        result["overwritten_files"] = int(np.sum(mtimes - births > _OVERWRITE_S))
+    result.update(zip(_interval_columns(), hist.tolist()))
+    return result
+
+
+def scan_folder(
+    path: Path | str,
+    extensions: Sequence[str] = FRAME_EXTENSIONS,
+) -> Tuple[List[str], Optional[Dict]]:
+    """
+    List one folder with a single os.scandir pass. Returns (subfolder paths, audit of the frames directly in it or None).
+    """
+    subdirs: List[str] = []
+    names: List[str] = []
+    mtimes: List[float] = []
+    births: List[Optional[float]] = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir():
+                subdirs.append(entry.path)
+            elif entry.is_file() and entry.name.lower().endswith(tuple(extensions)):
+                st = entry.stat()
+                names.append(entry.name)
+                mtimes.append(st.st_mtime)
+                births.append(_birth_time(st))
+    have_births = bool(births) and all(b is not None for b in births)
+    audit = audit_files(path, names, np.array(mtimes), np.array(births, dtype=np.float64) if have_births else None)
+    return sorted(subdirs), audit
+
+
+def _visit(path: str, cached: Optional[Dict], extensions: Sequence[str]) -> Tuple[str, Dict]:
+    # One stat for a folder that has not changed since the last audit; a scandir for a new or changed one.
+    # Adding or removing files updates the folder's own mtime, so an unchanged mtime means unchanged contents.
+    mtime_ns = os.stat(path).st_mtime_ns
+    audit = cached["audit"] if cached is not None else None
+    stale = audit is not None and audit.get("overwritten_files") == ""  # cached before OVERWRITES_UNKNOWN
+    if cached is not None and cached["mtime_ns"] == mtime_ns and not stale:
+        return path, cached
+    subdirs, audit = scan_folder(path, extensions)
+    return path, {"mtime_ns": mtime_ns, "subdirs": subdirs, "audit": audit}
+
+
+def load_cache(cache_path: Path | str) -> Dict[str, Dict]:
+    path = Path(cache_path)
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_cache(cache: Dict[str, Dict], cache_path: Path | str) -> None:
+    # Written to a temporary file first so an interrupted save never leaves a truncated cache behind
+    path = Path(cache_path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+
+
+def audit_archive(
+    root: Path | str,
+    cache_path: Optional[Path | str] = None,
+    max_workers: int = 16,
+    extensions: Sequence[str] = FRAME_EXTENSIONS,
+) -> List[Dict]:
+    """
+    Audit every folder holding frames anywhere under `root` (the whole archive, a date folder, ...).
+    Folders are visited by a thread pool; with cache_path, folders whose mtime matches the cache are not listed again
+    and the cache is updated afterwards. Returns one audit dict (AUDIT_COLUMNS + interval histogram) per run folder,
+    sorted by path.
+    """
+    cache = load_cache(cache_path) if cache_path else {}
+    new_cache: Dict[str, Dict] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {pool.submit(_visit, str(root), cache.get(str(root)), extensions)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, entry = future.result()
+                new_cache[path] = entry
+                for sub in entry["subdirs"]:
+                    pending.add(pool.submit(_visit, sub, cache.get(sub), extensions))
+    if cache_path:
+        # Keep entries from outside this root, so one cache can serve audits of different parts of the archive
+        cache.update(new_cache)
+        save_cache(cache, cache_path)
+    return [new_cache[p]["audit"] for p in sorted(new_cache) if new_cache[p]["audit"] is not None]
+
+
+def calculate_framerate(folder_path: Path | str) -> List[Dict]:
+    """
+    Audit of each run folder directly inside `folder_path` (e.g. one date folder), as before.
+    """
     results = []
-    for subfolder in sorted(os.listdir(folder_path)):
-        subfolder_path = os.path.join(folder_path, subfolder)
-        if os.path.isdir(subfolder_path):
-            files = [os.path.join(subfolder_path, f) for f in os.listdir(subfolder_path) if os.path.isfile(os.path.join(subfolder_path, f))]
-            if len(files) < 2:
-                print(f"Skipping {subfolder}: not enough files to calculate framerate.")
-                continue
-
-            # Sort files by creation time
-            files.sort(key=lambda x: os.path.getmtime(x))
-            first_file = files[0]
-            last_file = files[-1]
-
-            # Get creation times
-            first_time = os.path.getmtime(first_file)
-            last_time = os.path.getmtime(last_file)
-
-            # Calculate time difference in seconds
-            time_diff = last_time - first_time
-            num_files = len(files)
-
-            if time_diff == 0:
-                print(f"Skipping {subfolder}: time difference is zero.")
-                continue
-
-            framerate = (num_files - 1) / time_diff
-
-            result = {
-                "folder": folder_path,
-                "subfolder": subfolder,
-                "first_file": first_file,
-                "last_file": last_file,
-                "num_files": len(files),
-                "time_diff_seconds": time_diff,
-                "framerate": framerate
-            }
-
-            print(result)
-            results.append(result)
+    subdirs, _ = scan_folder(folder_path)
+    for sub in subdirs:
+        _, audit = scan_folder(sub)
+        if audit is None:
+            print(f"Skipping {Path(sub).name}: not enough files to calculate framerate.")
+            continue
+        print(audit)
+        results.append(audit)
     return results
 
 
-# Set the path to the main folder
-# use os.chdir(path) to navigate in python console
-# main_folder = "reverse telescope test"
-# calculate_framerate(main_folder)
+def write_audit_csv(results: List[Dict], out_path: Path | str) -> None:
+    with open(out_path, "w", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=AUDIT_COLUMNS + _interval_columns())
+        writer.writeheader()
+        for item in results:
+            writer.writerow(item)
 
 
 #to run in from windows console do
@@ -62,14 +232,7 @@ def calculate_framerate(folder_path):
 
 
 if __name__ == "__main__":
-    fullresult = []
-    for folder in os.listdir(r"Z:/Reverse Telescope Test"):
-        this_folder = os.path.join(r"Z:/Reverse Telescope Test", folder)
-        if os.path.isdir(this_folder):
-            fullresult.append(calculate_framerate(this_folder))
-    with open("framerate.csv", "w", newline="") as csvfile:
-        fieldnames = ["folder", "subfolder", "first_file", "last_file", "num_files", "time_diff_seconds", "framerate"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for item in fullresult:
-            writer.writerow(fullresult)
\ No newline at end of file
+    archive = r"Z:/Reverse Telescope Test"
+    fullresult = audit_archive(archive, cache_path=CACHE_FILENAME)
+    write_audit_csv(fullresult, "framerate.csv")
+    print(f"Audited {len(fullresult)} folders under {archive}")
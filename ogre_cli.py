@@ -0,0 +1,436 @@
+"""
+One command line for the lab's analyses, for running them headless on the analysis server instead of editing the
+hard-coded paths in accel_analysis.py, accel_integration.py, framerate.py and the notebooks.
+
+    python ogre_cli.py accel fft D:/accel/Session_2025-10-14_160804 --nperseg-seconds 60 --out-dir fft_output
+    python ogre_cli.py accel integrate D:/accel/Session_2025-10-29_163326 --max-files 10 --out-dir integration
+    python ogre_cli.py accel catalog D:/accel -o accel_catalog.csv
+    python ogre_cli.py accel stats D:/accel --total
+    python ogre_cli.py accel events D:/accel --band pump:20:40:0.01
+    python ogre_cli.py accel qc D:/accel
+    python ogre_cli.py frames fit "Z:/Reverse Telescope Test/20250925/run1" --prefilter --parallel
+    python ogre_cli.py framerate audit "Z:/Reverse Telescope Test" -o framerate.csv
+    python ogre_cli.py serve D:/accel --port 8765        (near-data service, see data_service.py)
+    python ogre_cli.py temps split|query|summary ...   (same arguments as log_splitter.py, log_query.py, log_summary.py)
+
+Each subcommand imports what it needs only when it runs (SciPy, matplotlib, the fitting code), so `--help` and the
+quick commands start fast, and matplotlib is always used without a display. Session arguments can be a session
+folder, a folder of Session* folders, or CSV files; each session is processed separately like accel_analysis.py.
+Add --profile DIR to accel fft/integrate and frames fit to write per-stage timings (see stage_profile.py), and
+--profile-memory for per-stage peak memory in a separate run.
+"""
+import argparse
+import os
+import sys
+from contextlib import nullcontext
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+REPO_DIR = Path(__file__).resolve().parent
+ACCEL_PATTERN = "AccelData_*.csv"
+
+
+def _use_dirs(*names: str) -> None:
+    # temperature/ runs on the Pi as a flat folder of scripts importing each other by plain name, so it goes on the path
+    for name in names:
+        path = str(REPO_DIR / name)
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def _sessions(paths: List[str]) -> List[Tuple[str, List[Path]]]:
+    # (session name, its CSVs) for each argument: a session folder, a folder of Session* folders, or CSV files
+    sessions: List[Tuple[str, List[Path]]] = []
+    loose: List[Path] = []
+    for arg in paths:
+        p = Path(arg)
+        if p.is_dir():
+            files = sorted(p.glob(ACCEL_PATTERN))
+            if files:
+                sessions.append((p.name, files))
+            else:
+                for sub in sorted(d for d in p.iterdir() if d.is_dir() and d.name.startswith("Session")):
+                    files = sorted(sub.glob(ACCEL_PATTERN))
+                    if files:
+                        sessions.append((sub.name, files))
+        elif p.is_file():
+            loose.append(p)
+        else:
+            raise FileNotFoundError(f"No such file or folder: {arg}")
+    if loose:
+        sessions.append((loose[0].parent.name, loose))
+    if not sessions:
+        raise FileNotFoundError(f"No {ACCEL_PATTERN} files found in {', '.join(paths)}")
+    return sessions
+
+
+def _session_stats(args: argparse.Namespace, session_dir: Path):
+    # channel_stats for a session, cached in --stats-cache when given (never in the session folder)
+    from channel_stats import session_cache_path, session_stats
+    cache = session_cache_path(args.stats_cache, session_dir) if args.stats_cache else None
+    return session_stats(session_dir, cache)[0]
+
+
+def _profiler(args: argparse.Namespace, name: str, session: Optional[str] = None):
+    if not args.profile:
+        return nullcontext()
+    from stage_profile import RunProfile
+    return RunProfile(name, args.profile, trace_memory=args.profile_memory,
+                      meta={"session": session, "argv": sys.argv[1:]})
+
+
+# ---- accel -------------------------------------------------------------------
+
+def accel_fft(args: argparse.Namespace) -> int:
+    from accelerometer.accel_fft import run_fft_overlay
+
+    for name, files in _sessions(args.paths):
+        print(f"=== {name}: {len(files)} files ===")
+        with _profiler(args, "fft_overlay", name):
+            figs = run_fft_overlay(
+                files,
+                method=args.method,
+                nperseg_seconds=args.nperseg_seconds,
+                noverlap_ratio=args.noverlap_ratio,
+                max_f_hz=args.max_f_hz,
+                out_dir=Path(args.out_dir) / name,
+                log_x=not args.linear_x,
+                log_y=args.log_y,
+                plot=not args.no_plots,
+                window=args.window,
+                detrend=args.detrend,
+                scaling=args.scaling,
+                alpha=args.alpha,
+                lw=args.lw,
+                precision=args.precision,
+                qc=not args.no_qc,
+            )
+        if figs:
+            import matplotlib.pyplot as plt
+            for fig in figs.values():
+                plt.close(fig)
+        print(f"  Saved outputs to: {(Path(args.out_dir) / name).resolve()}")
+    return 0
+
+
+def accel_integrate(args: argparse.Namespace) -> int:
+    from accelerometer.accel_integration import integrate_session, integration_summary, plot_integration
+    from accelerometer.accel_io import QCOptions, read_many_csvs
+
+    out_root = Path(args.out_dir)
+    for name, files in _sessions(args.paths):
+        files = files[:args.max_files] if args.max_files else files
+        print(f"=== {name}: {len(files)} files ===")
+        out_dir = out_root / name
+        out_dir.mkdir(parents=True, exist_ok=True)
+        baselines = None
+        if args.session_baseline:
+            baselines = _session_stats(args, files[0].parent).medians()
+        with _profiler(args, "integrate", name):
+            df = read_many_csvs(file_paths=files, precision=args.precision, qc=None if args.no_qc else QCOptions())
+            result = integrate_session(df, args.axes, baselines=baselines, precision=args.precision)
+            summary = integration_summary(result)
+            summary.to_csv(out_dir / f"{name}_integration.csv", index=False)
+            if not args.no_plots:
+                import matplotlib.pyplot as plt
+                for axis in summary["axis"]:
+                    p = result[f"{axis}_p"].to_numpy() if args.displacement else None
+                    fig = plot_integration(result["t"].to_numpy(), result[f"{axis}_a"].to_numpy(), axis,
+                                           result[f"{axis}_v"].to_numpy(), p)
+                    fig.savefig(out_dir / f"{name}_{axis}_integration.png", dpi=150)
+                    plt.close(fig)
+        print(summary.to_string(index=False))
+    return 0
+
+
+def accel_stats(args: argparse.Namespace) -> int:
+    from channel_stats import merge_all
+
+    sets = []
+    for name, files in _sessions(args.paths):
+        stats = _session_stats(args, files[0].parent)
+        sets.append(stats)
+        print(f"=== {name}: {len(files)} files ===")
+        print(stats.table().to_string(float_format="{:.6g}".format))
+    if args.total and len(sets) > 1:
+        print("=== all sessions ===")
+        print(merge_all(sets).table().to_string(float_format="{:.6g}".format))
+    return 0
+
+
+def accel_catalog(args: argparse.Namespace) -> int:
+    from accelerometer.accel_io import catalog_sessions
+
+    df = catalog_sessions(args.root, args.glob)
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f"Wrote {len(df)} files to {args.output}")
+    else:
+        print(df.to_string(index=False))
+    return 0
+
+
+def accel_qc(args: argparse.Namespace) -> int:
+    from accelerometer.accel_io import QCOptions, check_session, qc_bad_spans, qc_summary
+
+    opts = QCOptions(minute_s=args.minute_s)
+    for name, files in _sessions(args.paths):
+        tables = check_session(files[0].parent, opts, save=args.save)
+        summary = qc_summary(tables)
+        print(f"=== {name}: {len(tables)} files, {int(summary['bad_minutes'].sum())} flagged minutes ===")
+        print(summary.to_string(index=False))
+        if args.spans:
+            for file_name, table in tables.items():
+                for start, end in qc_bad_spans(table):
+                    print(f"  {file_name}: {start:.1f} - {end:.1f} s")
+    return 0
+
+
+def _band(text: str):
+    # NAME:LO_HZ:HI_HZ:G_RMS[:WINDOW_S]
+    from accelerometer.accel_events import BandTrigger
+    name, *numbers = text.split(":")
+    if len(numbers) not in (3, 4):
+        raise argparse.ArgumentTypeError(f"expected NAME:LO_HZ:HI_HZ:G_RMS[:WINDOW_S], got {text}")
+    return BandTrigger(name, *map(float, numbers))
+
+
+def accel_events(args: argparse.Namespace) -> int:
+    import pandas as pd
+    from accelerometer.accel_events import EVENT_INDEX_FILENAME, EventOptions, scan_sessions
+
+    sessions = _sessions(args.paths)
+    opts = EventOptions(
+        threshold_g=args.threshold,
+        smoothing_factor=args.smoothing,
+        remove_offset=not args.keep_offset,
+        merge_gap_s=args.merge_gap,
+        pad_s=args.pad,
+        bands=tuple(args.band),
+    )
+    frames = []
+    for name, files in sessions:
+        if args.session_baseline:
+            opts.baselines = _session_stats(args, files[0].parent).medians()
+        with _profiler(args, "events", name):
+            events = scan_sessions(files, opts)
+        print(f"=== {name}: {len(files)} files, {len(events)} events ===")
+        if len(events):
+            print(events.groupby("trigger").agg(events=("row", "size"), longest_s=("duration_s", "max"),
+                                                largest=("trigger_peak", "max")).to_string())
+            frames.append(events)
+    output = Path(args.output) if args.output else sessions[0][1][0].parent.parent / EVENT_INDEX_FILENAME
+    index = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    index.to_csv(output, index=False)
+    print(f"Wrote {len(index)} events to {output}")
+    return 0
+
+
+# ---- frames / framerate ------------------------------------------------------
+
+def frames_fit(args: argparse.Namespace) -> int:
+    from dot_fit import FitOptions
+    from dot_store import STORE_FILENAME, FitStore, process_new_frames, watch
+
+    opts = FitOptions(
+        roi_half_width=args.roi_half_width,
+        prefilter=args.prefilter,
+        background_frames=args.background_frames,
+        dark_path=args.dark,
+    )
+    store_path = args.store or Path(args.folder) / STORE_FILENAME
+    if args.watch:
+        watch(args.folder, store_path, opts, args.glob, args.poll_seconds, args.plot, parallel=args.parallel)
+        return 0
+    with _profiler(args, "frames_fit", Path(args.folder).name):
+        n = process_new_frames(args.folder, FitStore(store_path), opts, args.glob, args.batch_size, args.parallel)
+    print(f"Fit {n} new frames into {store_path}")
+    if args.plot:
+        import matplotlib.pyplot as plt
+        from dot_store import plot_drift
+        plt.close(plot_drift(FitStore(store_path).load(), args.plot))
+    return 0
+
+
+def framerate_audit(args: argparse.Namespace) -> int:
+    from framerate import audit_archive, write_audit_csv
+
+    results = audit_archive(args.root, cache_path=args.cache or None, max_workers=args.workers)
+    write_audit_csv(results, args.output)
+    print(f"Audited {len(results)} folders under {args.root}, wrote {args.output}")
+    return 0
+
+
+def serve(args: argparse.Namespace) -> int:
+    from data_service import make_server
+
+    server = make_server(args.root, args.host, args.port, args.workers, args.queue, args.stats_cache)
+    host, port = server.server_address[:2]
+    print(f"Serving {Path(args.root).resolve()} on http://{host}:{port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+# ---- temps -------------------------------------------------------------------
+
+def _temps(module: str):
+    def run(args: argparse.Namespace, extra: List[str]) -> int:
+        _use_dirs("temperature")
+        __import__(module).main(extra)
+        return 0
+    return run
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ogre_cli.py", description="OGRE lab analysis commands")
+    groups = parser.add_subparsers(dest="group", metavar="{accel,frames,framerate,serve,temps}")
+
+    accel = groups.add_parser("accel", help="accelerometer sessions").add_subparsers(dest="command")
+
+    p = accel.add_parser("fft", help="overlaid per-file spectra of each session (PNGs + PSD CSVs)")
+    p.add_argument("paths", nargs="+", help="session folder(s), a folder of Session* folders, or CSV files")
+    p.add_argument("--out-dir", default="fft_output", help="one subfolder per session goes here")
+    p.add_argument("--method", default="welch", choices=["welch", "rfft"])
+    p.add_argument("--nperseg-seconds", type=float, default=60.0, help="Welch segment length [s]")
+    p.add_argument("--noverlap-ratio", type=float, default=0.5)
+    p.add_argument("--window", default="hann")
+    p.add_argument("--detrend", default="constant")
+    p.add_argument("--scaling", default="density", choices=["density", "spectrum"])
+    p.add_argument("--max-f-hz", type=float, default=None)
+    p.add_argument("--linear-x", action="store_true", help="linear frequency axis (default log)")
+    p.add_argument("--log-y", action="store_true")
+    p.add_argument("--alpha", type=float, default=0.7)
+    p.add_argument("--lw", type=float, default=1.2)
+    p.add_argument("--no-plots", action="store_true", help="only write the PSD CSVs (matplotlib is never imported)")
+    p.add_argument("--precision", default="float64", choices=["float64", "float32"],
+                   help="float32: half the memory, PSD error bounds in accel_fft.py")
+    p.add_argument("--no-qc", action="store_true", help="keep minutes flagged by the data-quality pass in the spectra")
+    p.add_argument("--profile", metavar="DIR", help="write per-stage timings here")
+    p.add_argument("--profile-memory", action="store_true",
+                   help="also trace per-stage peak memory (slows the run; timings are not comparable)")
+    p.set_defaults(func=accel_fft)
+
+    p = accel.add_parser("integrate", help="velocity/displacement of each axis of each session")
+    p.add_argument("paths", nargs="+", help="session folder(s), a folder of Session* folders, or CSV files")
+    p.add_argument("--out-dir", default="integration_output")
+    p.add_argument("--axes", nargs="+", default=["Mirror_X_g", "Mirror_Y_g", "Mirror_Z_g", "Desk_Y_g"])
+    p.add_argument("--max-files", type=int, default=None, help="only the first N files of each session")
+    p.add_argument("--displacement", action="store_true", help="also plot displacement")
+    p.add_argument("--session-baseline", action="store_true",
+                   help="remove each axis' median over the whole session instead of the loaded files'")
+    p.add_argument("--stats-cache", metavar="DIR", help="keep per-file channel stats here for reuse")
+    p.add_argument("--precision", default="float64", choices=["float64", "float32"],
+                   help="float32: half the memory (integration still accumulates in float64)")
+    p.add_argument("--no-qc", action="store_true", help="integrate through minutes flagged by the data-quality pass")
+    p.add_argument("--no-plots", action="store_true")
+    p.add_argument("--profile", metavar="DIR", help="write per-stage timings here")
+    p.add_argument("--profile-memory", action="store_true",
+                   help="also trace per-stage peak memory (slows the run; timings are not comparable)")
+    p.set_defaults(func=accel_integrate)
+
+    p = accel.add_parser("stats", help="per-channel count/mean/std/quantiles of each session")
+    p.add_argument("paths", nargs="+", help="session folder(s) or a folder of Session* folders")
+    p.add_argument("--total", action="store_true", help="also the merged stats of all the sessions given")
+    p.add_argument("--stats-cache", metavar="DIR", help="keep per-file channel stats here for reuse")
+    p.set_defaults(func=accel_stats)
+
+    p = accel.add_parser("catalog", help="list every session file with its time span and sample rate")
+    p.add_argument("root", help="session folder or archive root")
+    p.add_argument("--glob", default=ACCEL_PATTERN)
+    p.add_argument("-o", "--output", help="CSV to write (default: print)")
+    p.set_defaults(func=accel_catalog)
+
+    p = accel.add_parser("qc", help="flag clipped, flat, NaN, offset-step and jittery minutes (saved per session)")
+    p.add_argument("paths", nargs="+", help="session folder(s) or a folder of Session* folders")
+    p.add_argument("--minute-s", type=float, default=60.0, help="length of the flagged spans [s]")
+    p.add_argument("--spans", action="store_true", help="also list the flagged spans of each file")
+    p.add_argument("--save", action="store_true", help="store the flags in each session's accel_qc.json for reuse")
+    p.set_defaults(func=accel_qc)
+
+    p = accel.add_parser("events", help="find vibration events (accel_event.m threshold, band triggers) -> event index")
+    p.add_argument("paths", nargs="+", help="session folder(s), a folder of Session* folders, or CSV files")
+    p.add_argument("-o", "--output", help="index CSV (default accel_events.csv next to the session folders)")
+    p.add_argument("--threshold", type=float, default=0.05, help="|smoothed a| that starts an event [g]")
+    p.add_argument("--smoothing", type=float, default=0.0, help="exponential smoothing factor as in accel_event.m")
+    p.add_argument("--merge-gap", type=float, default=1.0, help="runs closer than this are one event [s]")
+    p.add_argument("--pad", type=float, default=1.0, help="raw data kept around each event [s]")
+    p.add_argument("--band", type=_band, action="append", default=[], metavar="NAME:LO:HI:G_RMS[:WINDOW_S]",
+                   help="also trigger on the rms of a band (repeatable)")
+    p.add_argument("--keep-offset", action="store_true", help="threshold the raw values like the DAQ did")
+    p.add_argument("--session-baseline", action="store_true",
+                   help="remove the whole-session medians instead of each file's")
+    p.add_argument("--stats-cache", metavar="DIR", help="keep per-file channel stats here for reuse")
+    p.add_argument("--profile", metavar="DIR", help="write per-stage timings here")
+    p.add_argument("--profile-memory", action="store_true",
+                   help="also trace per-stage peak memory (slows the run; timings are not comparable)")
+    p.set_defaults(func=accel_events)
+
+    frames = groups.add_parser("frames", help="camera frames").add_subparsers(dest="command")
+    p = frames.add_parser("fit", help="fit the dot in every new frame of a capture folder (resumable)")
+    p.add_argument("folder")
+    p.add_argument("--store", help="results CSV (default <folder>/dot_fits.csv)")
+    p.add_argument("--glob", default="*.bmp")
+    p.add_argument("--roi-half-width", type=int, default=None)
+    p.add_argument("--prefilter", action="store_true")
+    p.add_argument("--background-frames", type=int, default=0)
+    p.add_argument("--dark", help="master dark (.npy) or dark frame")
+    p.add_argument("--parallel", action="store_true", help="use a process pool")
+    p.add_argument("--batch-size", type=int, default=500)
+    p.add_argument("--plot", help="also write the drift plot here")
+    p.add_argument("--watch", action="store_true", help="keep fitting new frames until Ctrl+C")
+    p.add_argument("--poll-seconds", type=float, default=60.0)
+    p.add_argument("--profile", metavar="DIR", help="write per-stage timings here")
+    p.add_argument("--profile-memory", action="store_true",
+                   help="also trace per-stage peak memory (slows the run; timings are not comparable)")
+    p.set_defaults(func=frames_fit)
+
+    framerate = groups.add_parser("framerate", help="capture frame rates").add_subparsers(dest="command")
+    p = framerate.add_parser("audit", help="audit every capture folder under a root")
+    p.add_argument("root", nargs="?", default="Z:/Reverse Telescope Test")
+    p.add_argument("--cache", default="framerate_cache.json", help='per-folder cache ("" for none)')
+    p.add_argument("--workers", type=int, default=16)
+    p.add_argument("-o", "--output", default="framerate.csv")
+    p.set_defaults(func=framerate_audit)
+
+    p = groups.add_parser("serve", help="serve results from the data root over HTTP (run on the data machine)")
+    p.add_argument("root", help="data root (accelerometer sessions and capture folders under it)")
+    p.add_argument("--host", default="127.0.0.1", help="0.0.0.0 to accept other machines")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--workers", type=int, default=4, help="requests computed at once")
+    p.add_argument("--queue", type=int, default=16, help="requests waiting before answering 503")
+    p.add_argument("--stats-cache", metavar="DIR", help="keep per-file channel stats here (never under the root)")
+    p.set_defaults(func=serve)
+
+    temps = groups.add_parser("temps", help="temperature logs").add_subparsers(dest="command")
+    for name, module, text in [
+        ("split", "log_splitter", "split a log by time or run manifest"),
+        ("query", "log_query", "rows between two times"),
+        ("summary", "log_summary", "daily/hourly summary"),
+    ]:
+        # Arguments (including -h) go to the module's own parser
+        p = temps.add_parser(name, help=f"{text} (see {module}.py -h)", add_help=False)
+        p.set_defaults(func=_temps(module), passthrough=True)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if getattr(args, "func", None) is None:
+        parser.print_help() if args.group is None else parser.parse_args([args.group, "-h"])
+        return 1
+    os.environ.setdefault("MPLBACKEND", "Agg")  # never needs a display
+    if getattr(args, "passthrough", False):
+        return args.func(args, extra)
+    if extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from accelerometer.accel_io import estimate_sample_rate_hz, iter_csv_chunks
+
+try:
+    from scipy import signal as _scipy_signal  # type: ignore
+    _HAVE_SCIPY = True
+except Exception:
+    _HAVE_SCIPY = False
+
+# Lines up the dot frames with the accelerometer and temperature logs. Every source is reduced to a sorted int64
+# (nanosecond) time index, and each frame gets a window [t_start, t_end): its exposure or the interval up to the next
+# frame. The 10 kHz accelerometer data is streamed a chunk at a time and summed into the frame windows with
+# searchsorted + cumulative sums, so a session never has to be loaded (or merged) in one piece.
+
+ACCEL_AXES = ["Mirror_X_g", "Mirror_Y_g", "Mirror_Z_g", "Desk_Y_g"]
+TEMPERATURE_COLUMNS = [
+    "SHT_Temperature_C",
+    "MCP_Temperature_C",
+    "HDC_Temperature_C",
+    "SHT_Relative_Humidity",
+    "HDC_Relative_Humidity",
+]
+
+_GAP_RESET_S = 1.0  # restart the band-pass filters across gaps longer than this (file boundaries, event-mode data)
+
+
+def frame_windows(
+    timestamps: pd.Series | Sequence,
+    exposure_s: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-frame time windows as int64 nanoseconds. With exposure_s, each window is [t, t + exposure); otherwise it runs
+    to the next frame's timestamp (the last frame reuses the previous interval). Frames sharing a filename second
+    (max-framerate runs) are spread evenly across that second.
+    """
+    t = pd.to_datetime(pd.Series(timestamps)).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    if t.size == 0:
+        return t, t
+    if np.any(np.diff(t) < 0):
+        raise ValueError("Frame timestamps must be sorted")
+
+    # Filenames only carry whole seconds: place the n frames stamped with the same second at k/n of that second
+    _, first, counts = np.unique(t, return_index=True, return_counts=True)
+    rank = np.arange(t.size) - np.repeat(first, counts)
+    t = t + (rank * 1_000_000_000) // np.repeat(counts, counts)
+
+    if exposure_s is not None:
+        return t, t + int(round(exposure_s * 1e9))
+    end = np.empty_like(t)
+    end[:-1] = t[1:]
+    end[-1] = t[-1] + (t[-1] - t[-2] if t.size > 1 else 1_000_000_000)
+    return t, end
+
+
+class _WindowAccumulator:
+    """
+    Running count / sum / sum of squares / min / max per (frame, channel), filled chunk by chunk.
+    """
+
+    def __init__(self, n_frames: int, n_channels: int):
+        self.count = np.zeros(n_frames, dtype=np.int64)
+        self.sum = np.zeros((n_frames, n_channels))
+        self.sumsq = np.zeros((n_frames, n_channels))
+        self.min = np.full((n_frames, n_channels), np.inf)
+        self.max = np.full((n_frames, n_channels), -np.inf)
+
+    def add(self, t: np.ndarray, x: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> None:
+        # Frames overlapping this chunk, and the sample range each of them covers
+        lo = np.searchsorted(ends, t[0], side="right")
+        hi = np.searchsorted(starts, t[-1], side="right")
+        if hi <= lo:
+            return
+        s = np.searchsorted(t, starts[lo:hi], side="left")
+        e = np.searchsorted(t, ends[lo:hi], side="left")
+        n = e - s
+        keep = n > 0
+        if not np.any(keep):
+            return
+        frames = np.arange(lo, hi)[keep]
+        s, e, n = s[keep], e[keep], n[keep]
+
+        csum = np.vstack([np.zeros((1, x.shape[1])), np.cumsum(x, axis=0)])
+        csq = np.vstack([np.zeros((1, x.shape[1])), np.cumsum(x * x, axis=0)])
+        self.count[frames] += n
+        self.sum[frames] += csum[e] - csum[s]
+        self.sumsq[frames] += csq[e] - csq[s]
+        if np.any(s[1:] < e[:-1]):
+            # Overlapping windows (exposure_s longer than the frame interval): reduceat cannot step back, so reduce
+            # each window on its own
+            lo_x = np.stack([x[a:b].min(axis=0) for a, b in zip(s, e)])
+            hi_x = np.stack([x[a:b].max(axis=0) for a, b in zip(s, e)])
+        else:
+            # Per-window extremes with one reduceat over [s0, e0, s1, e1, ...]; the odd (between-window) rows are dropped
+            idx = np.empty(2 * len(s), dtype=np.int64)
+            idx[0::2] = s
+            idx[1::2] = e
+            if idx[-1] == len(x):
+                idx = idx[:-1]
+            lo_x = np.minimum.reduceat(x, idx, axis=0)[0::2]
+            hi_x = np.maximum.reduceat(x, idx, axis=0)[0::2]
+        self.min[frames] = np.minimum(self.min[frames], lo_x)
+        self.max[frames] = np.maximum(self.max[frames], hi_x)
+
+    def mean(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sum / self.count[:, None]
+
+    def rms(self) -> np.ndarray:
+        # RMS about the window mean (the DC offset of the accelerometers is not vibration)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            m = self.mean()
+            return np.sqrt(np.maximum(self.sumsq / self.count[:, None] - m * m, 0.0))
+
+    def mean_square(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sumsq / self.count[:, None]
+
+
+def accel_window_stats(
+    accel_files: Iterable[Path | str],
+    starts: np.ndarray,
+    ends: np.ndarray,
+    axes: Sequence[str] = ACCEL_AXES,
+    bands_hz: Sequence[Tuple[float, float]] = (),
+    chunksize: int = 200_000,
+) -> pd.DataFrame:
+    """
+    Accelerometer aggregates over each [start, end) window (int64 ns, sorted by start): sample count, RMS about the
+    window mean and peak deviation from it per axis, and for every (f_lo, f_hi) in bands_hz the band power
+    (mean square of the band-passed signal, g^2) per axis. Files are streamed in time order a chunk at a time.
+    """
+    axes = list(axes)
+    acc = _WindowAccumulator(len(starts), len(axes))
+    band_accs = [_WindowAccumulator(len(starts), len(axes)) for _ in bands_hz]
+    if bands_hz and not _HAVE_SCIPY:
+        raise RuntimeError("SciPy not available for band power")
+
+    sos_list: List[np.ndarray] = []
+    zi_list: List[Optional[np.ndarray]] = []
+    fs: Optional[float] = None
+    last_t: Optional[int] = None
+
+    # AccelData_<date>_<time>_File<n> names sort in time order, so chunks arrive in time order
+    files = sorted(Path(p) for p in accel_files)
+    for path in files:
+        for df in iter_csv_chunks(path, chunksize=chunksize):
+            t = df["AbsoluteTime"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+            if t.size == 0:
+                continue
+            if np.any(np.diff(t) < 0):
+                order = np.argsort(t, kind="stable")
+                t, df = t[order], df.iloc[order]
+            x = df[axes].to_numpy(dtype=np.float64)
+            acc.add(t, x, starts, ends)
+
+            if bands_hz:
+                if fs is None:
+                    fs = estimate_sample_rate_hz(df["t_rel_s"])
+                    sos_list = [
+                        _scipy_signal.butter(4, [lo, min(hi, 0.49 * fs)], btype="bandpass", fs=fs, output="sos")
+                        for lo, hi in bands_hz
+                    ]
+                    zi_list = [None] * len(bands_hz)
+                if last_t is not None and (t[0] - last_t) > _GAP_RESET_S * 1e9:
+                    zi_list = [None] * len(bands_hz)
+                for k, sos in enumerate(sos_list):
+                    if zi_list[k] is None:
+                        zi_list[k] = np.repeat(_scipy_signal.sosfilt_zi(sos)[:, :, None], x.shape[1], axis=2) * x[0]
+                    y, zi_list[k] = _scipy_signal.sosfilt(sos, x, axis=0, zi=zi_list[k])
+                    band_accs[k].add(t, y, starts, ends)
+            last_t = int(t[-1])
+
+    out: Dict[str, np.ndarray] = {"accel_n": acc.count}
+    rms = acc.rms()
+    mean = acc.mean()
+    peak = np.maximum(acc.max - mean, mean - acc.min)
+    for j, axis in enumerate(axes):
+        out[f"rms_{axis}"] = rms[:, j]
+        out[f"peak_{axis}"] = np.where(acc.count > 0, peak[:, j], np.nan)
+    for (lo, hi), bacc in zip(bands_hz, band_accs):
+        power = bacc.mean_square()
+        for j, axis in enumerate(axes):
+            out[f"band_{lo:g}-{hi:g}Hz_{axis}"] = power[:, j]
+    return pd.DataFrame(out)
+
+
+def read_temperature_logs(
+    log_paths: Iterable[Path | str],
+    t_lo: int,
+    t_hi: int,
+    columns: Sequence[str] = TEMPERATURE_COLUMNS,
+    chunksize: int = 500_000,
+) -> pd.DataFrame:
+    """
+    Rows of the temperature logs with t_lo <= time <= t_hi (int64 ns), streamed in chunks, as a "t_ns" column plus
+    whichever of `columns` the logs have, sorted by time. Empty if no row is in range.
+    """
+    parts = []
+    for path in log_paths:
+        with pd.read_csv(path, chunksize=chunksize) as reader:
+            for chunk in reader:
+                chunk.columns = ["Timestamp", *chunk.columns[1:]]
+                # ISO8601: the logger writes fractional seconds when it logs faster than once a second
+                stamps = pd.to_datetime(chunk["Timestamp"], errors="coerce", format="ISO8601")
+                t = stamps.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+                keep = (t >= t_lo) & (t <= t_hi)
+                if np.any(keep):
+                    cols = [c for c in columns if c in chunk.columns]
+                    part = chunk.loc[keep, cols].astype(np.float64)
+                    part.insert(0, "t_ns", t[keep])
+                    parts.append(part)
+    if not parts:
+        return pd.DataFrame(columns=["t_ns"])
+    return pd.concat(parts, ignore_index=True).sort_values("t_ns", kind="stable", ignore_index=True)
+
+
+def interpolate_temperature(
+    log_paths: Iterable[Path | str],
+    times_ns: np.ndarray,
+    columns: Sequence[str] = TEMPERATURE_COLUMNS,
+    max_gap_s: float = 60.0,
+    chunksize: int = 500_000,
+) -> pd.DataFrame:
+    """
+    Temperature/humidity linearly interpolated at `times_ns`. The logs are streamed and only rows within max_gap_s of
+    the requested span are kept; times further than max_gap_s from any log row come back NaN.
+    """
+    if len(times_ns) == 0:
+        return pd.DataFrame({c: np.empty(0) for c in columns})
+    pad = int(max_gap_s * 1e9)
+    t_lo, t_hi = int(np.min(times_ns)) - pad, int(np.max(times_ns)) + pad
+
+    log = read_temperature_logs(log_paths, t_lo, t_hi, columns, chunksize)
+    if not len(log):
+        return pd.DataFrame({c: np.full(len(times_ns), np.nan) for c in columns})
+    t_log = log["t_ns"].to_numpy()
+
+    # Distance to the nearest log row, to blank out interpolation across logger downtime
+    j = np.searchsorted(t_log, times_ns)
+    prev = t_log[np.clip(j - 1, 0, len(t_log) - 1)]
+    nxt = t_log[np.clip(j, 0, len(t_log) - 1)]
+    too_far = np.minimum(np.abs(times_ns - prev), np.abs(nxt - times_ns)) > pad
+
+    out = {}
+    for c in columns:
+        if c not in log.columns:
+            out[c] = np.full(len(times_ns), np.nan)
+            continue
+        v = log[c].to_numpy()
+        ok = np.isfinite(v)
+        vals = np.interp(times_ns, t_log[ok], v[ok], left=np.nan, right=np.nan) if ok.any() else np.nan
+        out[c] = np.where(too_far, np.nan, vals)
+    return pd.DataFrame(out)
+
+
+def align_frames(
+    frames: pd.DataFrame,
+    accel_files: Iterable[Path | str] = (),
+    temperature_logs: Iterable[Path | str] = (),
+    exposure_s: Optional[float] = None,
+    bands_hz: Sequence[Tuple[float, float]] = (),
+) -> pd.DataFrame:
+    """
+    Join per-frame dot results with the environment. `frames` needs a "timestamp" column (e.g. FitStore.load());
+    frames without one are dropped. Adds t_start/t_end, the accelerometer window aggregates and the temperature and
+    humidity interpolated at the middle of each frame window.
+    """
+    df = frames[frames["timestamp"].notna()].sort_values("timestamp", kind="stable").reset_index(drop=True)
+    starts, ends = frame_windows(df["timestamp"], exposure_s)
+    df["t_start"] = pd.to_datetime(starts)
+    df["t_end"] = pd.to_datetime(ends)
+
+    accel_files = list(accel_files)
+    if accel_files:
+        df = pd.concat([df, accel_window_stats(accel_files, starts, ends, bands_hz=bands_hz)], axis=1)
+
+    temperature_logs = list(temperature_logs)
+    if temperature_logs:
+        mid = starts + (ends - starts) // 2
+        df = pd.concat([df, interpolate_temperature(temperature_logs, mid)], axis=1)
+    return df
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+try:
+    import resource  # not on Windows
+    _HAVE_RESOURCE = True
+except Exception:
+    _HAVE_RESOURCE = False
+
+# Opt-in timing of the stages of the analysis pipelines (CSV parsing, timestamp conversion, Welch, plotting, PNG
+# saving, frame reading and fitting). The pipeline functions wrap their stages in `with stage(...)` (or @staged for a
+# whole function), which does nothing unless a RunProfile is active:
+#
+#     with RunProfile("fft_overlay", out_dir="profiles", meta={"session": session_dir.name}):
+#         run_fft_overlay(files, out_dir=out_dir)
+#
+# Each stage records calls, wall time, rows/frames processed and throughput, and the run is written to
+# <out_dir>/<name>_<start time>.json. Stages with the same name (one per file, per batch of frames) are summed. Stages
+# can nest, so a parent's time includes its children's. The process's peak RSS is recorded for the whole run where
+# the OS reports it. Per-stage peak memory needs RunProfile(trace_memory=True), which runs tracemalloc: it sees NumPy
+# arrays and Python objects but not pandas' C parser buffers, and it slows Python-heavy stages (CSV parsing,
+# timestamp conversion) far more than NumPy-heavy ones (2-3x on a CSV read), so timings of a memory-traced run are
+# not comparable with untraced ones, nor with each other across stages. Take memory in a separate run.
+# Compare runs with:  python stage_profile.py old.json new.json
+
+_RUNS: List["RunProfile"] = []
+
+
+@dataclass
+class StageStats:
+    name: str
+    unit: str = "rows"
+    calls: int = 0
+    wall_s: float = 0.0
+    count: int = 0           # rows / frames / figures / files processed
+    peak_mb: float = 0.0     # highest traced memory while the stage ran
+
+    def as_record(self) -> dict:
+        record = asdict(self)
+        record["throughput_per_s"] = self.count / self.wall_s if self.wall_s > 0 and self.count else None
+        return record
+
+
+class StageTimer:
+    """
+    What `with stage(...) as st` gives; set st.count when the number processed is only known at the end.
+    """
+
+    def __init__(self, count: Optional[int] = None):
+        self.count = count
+
+
+class RunProfile:
+    """
+    Collects the stages run inside it and, with out_dir, writes them as JSON on exit (path in .path).
+    trace_memory adds per-stage peak memory at the cost of distorted timings (see the header comment).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        out_dir: Optional[Path | str] = None,
+        trace_memory: bool = False,
+        meta: Optional[dict] = None,
+    ):
+        self.name = name
+        self.out_dir = Path(out_dir) if out_dir is not None else None
+        self.trace_memory = trace_memory
+        self.meta = dict(meta or {})
+        self.stages: Dict[str, StageStats] = {}
+        self.path: Optional[Path] = None
+        self._open: List[StageStats] = []  # stages currently running, innermost last
+        self._own_tracing = False
+
+    def __enter__(self) -> "RunProfile":
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracing = True
+        self.started = datetime.now()
+        self._t0 = time.perf_counter()
+        _RUNS.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.wall_s = time.perf_counter() - self._t0
+        _RUNS.remove(self)
+        if self._own_tracing:
+            tracemalloc.stop()
+        if self.out_dir is not None:
+            self.save()
+
+    def _peak(self) -> float:
+        # Traced peak since the last reset, handed to every open stage, then reset for the next measurement
+        if not tracemalloc.is_tracing():
+            return 0.0
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        for st in self._open:
+            st.peak_mb = max(st.peak_mb, peak)
+        tracemalloc.reset_peak()
+        return peak
+
+    def record(self) -> dict:
+        rss_peak_mb = None
+        if _HAVE_RESOURCE:
+            # ru_maxrss is KiB on Linux, bytes on macOS
+            scale = 2**20 if sys.platform == "darwin" else 2**10
+            rss_peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+        return {
+            "name": self.name,
+            "started": self.started.isoformat(timespec="seconds"),
+            "wall_s": getattr(self, "wall_s", time.perf_counter() - self._t0),
+            "host": platform.node(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "argv": sys.argv,
+            "memory_traced": self.trace_memory,
+            "rss_peak_mb": rss_peak_mb,
+            "meta": self.meta,
+            "stages": [st.as_record() for st in self.stages.values()],
+        }
+
+    def save(self) -> Path:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{self.name}_{self.started:%Y%m%d_%H%M%S}"
+        path = self.out_dir / f"{stem}.json"
+        n = 1
+        while path.exists():
+            path = self.out_dir / f"{stem}-{n}.json"
+            n += 1
+        with open(path, "w") as f:
+            json.dump(self.record(), f, indent=2, default=str)
+        self.path = path
+        return path
+
+
+@contextmanager
+def stage(name: str, count: Optional[int] = None, unit: str = "rows") -> Iterator[StageTimer]:
+    """
+    Time the block as stage `name` of the innermost active RunProfile; a no-op when none is active.
+    """
+    timer = StageTimer(count)
+    if not _RUNS:
+        yield timer
+        return
+    run = _RUNS[-1]
+    st = run.stages.get(name)
+    if st is None:
+        st = run.stages[name] = StageStats(name, unit)
+    run._peak()  # close the measurement of the stages around this one
+    run._open.append(st)
+    t0 = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        st.wall_s += time.perf_counter() - t0
+        st.calls += 1
+        st.count += int(timer.count or 0)
+        run._peak()
+        run._open.remove(st)
+
+
+def staged(name: str, unit: str = "rows", count: Optional[Callable[[Any], int]] = None):
+    """
+    Decorator form of stage() for a whole function; count(result) gives the number processed.
+    """
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name, unit=unit) as st:
+                result = func(*args, **kwargs)
+                if count is not None:
+                    st.count = count(result)
+            return result
+        return wrapper
+    return decorate
+
+
+def load_run(path: Path | str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_runs(paths: Sequence[Path | str], metric: str = "wall_s") -> pd.DataFrame:
+    """
+    One row per stage, one column per run with `metric` (wall_s, throughput_per_s, peak_mb, count or calls), plus the
+    ratio of the last run to the first.
+    """
+    runs = [load_run(p) for p in paths]
+    labels = [f"{r['name']} {r['started']}" for r in runs]
+    if len(set(labels)) < len(labels):
+        labels = [str(p) for p in paths]
+    table: Dict[str, Dict[str, float]] = {}
+    for label, run in zip(labels, runs):
+        if metric == "wall_s":
+            table.setdefault("(total)", {})[label] = run["wall_s"]
+        for st in run["stages"]:
+            table.setdefault(st["name"], {})[label] = st.get(metric)
+    df = pd.DataFrame.from_dict(table, orient="index", columns=labels).astype(float)
+    if len(labels) > 1:
+        df["last/first"] = df[labels[-1]] / df[labels[0]]
+    df.index.name = "stage"
+    return df
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare the stage timings of profiled runs")
+    parser.add_argument("runs", nargs="+", help="run JSON files, oldest first")
+    parser.add_argument("--metric", default="wall_s", choices=["wall_s", "throughput_per_s", "peak_mb", "count", "calls"])
+    args = parser.parse_args(argv)
+    with pd.option_context("display.max_columns", None, "display.width", 200, "display.float_format", "{:.4g}".format):
+        print(compare_runs(args.runs, args.metric))
+
+
+if __name__ == "__main__":
+    main()
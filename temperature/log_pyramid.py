@@ -0,0 +1,232 @@
+"""
+Multi-resolution min/mean/max copies of a temperature log, for plotting long stretches quickly.
+
+temperature_analysis.py reads the whole per-second log and resamples it to 1-minute means every time it plots, and
+months of 1 Hz data from five channels keep getting slower. The pyramid keeps the log pre-aggregated at 1 min, 15 min
+and 1 h (min, mean, max and sample count of every channel per bin) as small CSVs in <log>.pyramid/. Each level is
+built from the one below it and only ever appended to. update() reads just the rows after the last complete bin,
+through the same sparse time index as log_query.py, and the logger calls it after every flush. plot_range() picks the
+coarsest level that still gives about one bin per pixel, so a month is ~3000 rows of the 15 min level instead of
+2.6 million raw rows.
+
+Run as a script:  python log_pyramid.py temperature_log2.csv [--start ...] [--end ...] [-o plot.png]
+"""
+import argparse
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from log_query import LogIndex, TimeLike
+from log_writer import LOG_HEADER
+
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt  # imported in plot_range only: the logger on the Pi never plots
+
+# (name, bin width in seconds), finest first; each level is aggregated from the previous one (the first from the log)
+LEVELS: List[Tuple[str, int]] = [("1min", 60), ("15min", 900), ("1h", 3600)]
+STATS = ["min", "mean", "max", "n"]
+
+
+def _last_line(path: Path) -> Optional[str]:
+    # Last complete line of a file, reading only its tail
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 4096))
+        lines = f.read().splitlines(keepends=True)
+    lines = [line for line in lines if line.endswith(b"\n")]
+    return lines[-1].decode().rstrip("\r\n") if lines else None
+
+
+class LogPyramid:
+    """
+    The aggregated levels of one log, in <log>.pyramid/<level>.csv (columns Timestamp = bin start, then
+    <channel>_min/_mean/_max/_n for every channel). Only complete bins are written.
+    """
+
+    def __init__(
+        self,
+        log_path: Union[str, Path],
+        channels: Sequence[str] = LOG_HEADER[1:],
+        levels: Sequence[Tuple[str, int]] = LEVELS,
+    ):
+        self.log_path = Path(log_path)
+        self.directory = self.log_path.with_name(self.log_path.name + ".pyramid")
+        self.channels = list(channels)
+        self.levels = list(levels)
+
+    def level_path(self, name: str) -> Path:
+        return self.directory / f"{name}.csv"
+
+    def _done_until(self, path: Path, width: int) -> Optional[pd.Timestamp]:
+        # End of the last bin written to a level
+        if not path.exists():
+            return None
+        last = _last_line(path)
+        if last is None or last.startswith(LOG_HEADER[0]):
+            return None
+        return pd.Timestamp(last.split(",", 1)[0]) + pd.Timedelta(seconds=width)
+
+    def _aggregate_raw(self, df: pd.DataFrame, width: int) -> Tuple[pd.DataFrame, Optional[pd.Timestamp]]:
+        t = df.iloc[:, 0]
+        grouped = df[self.channels].groupby(t.dt.floor(f"{width}s"))
+        out = pd.DataFrame(index=grouped.size().index)
+        for c in self.channels:
+            out[f"{c}_min"] = grouped[c].min()
+            out[f"{c}_mean"] = grouped[c].mean()
+            out[f"{c}_max"] = grouped[c].max()
+            out[f"{c}_n"] = grouped[c].count()
+        # A bin is complete once there is a row at or after its end
+        return out, t.max()
+
+    def _aggregate_level(self, df: pd.DataFrame, width: int, child_width: int) -> Tuple[pd.DataFrame, pd.Timestamp]:
+        t = df.iloc[:, 0]
+        key = t.dt.floor(f"{width}s")
+        out = pd.DataFrame(index=pd.Index(key.unique()))
+        for c in self.channels:
+            n = df[f"{c}_n"]
+            weighted = (df[f"{c}_mean"].fillna(0.0) * n).groupby(key).sum()
+            total = n.groupby(key).sum()
+            out[f"{c}_min"] = df[f"{c}_min"].groupby(key).min()
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[f"{c}_mean"] = weighted / total.where(total > 0)
+            out[f"{c}_max"] = df[f"{c}_max"].groupby(key).max()
+            out[f"{c}_n"] = total
+        return out, t.max() + pd.Timedelta(seconds=child_width)
+
+    def update(self) -> int:
+        """
+        Append every newly completed bin to every level. Returns the number of bins written.
+        """
+        if not self.log_path.exists():
+            return 0
+        self.directory.mkdir(exist_ok=True)
+        written = 0
+        source, child_width = self.log_path, None
+        for name, width in self.levels:
+            path = self.level_path(name)
+            done_until = self._done_until(path, width)
+            df = LogIndex(source).query(start=done_until) if source.exists() else pd.DataFrame()
+            if len(df):
+                if child_width is None:
+                    df[self.channels] = df[self.channels].apply(pd.to_numeric, errors="coerce")
+                    bins, source_end = self._aggregate_raw(df, width)
+                else:
+                    bins, source_end = self._aggregate_level(df, width, child_width)
+                bins = bins[bins.index + pd.Timedelta(seconds=width) <= source_end]
+                if len(bins):
+                    bins.index = bins.index.strftime("%Y-%m-%d %H:%M:%S")
+                    bins.index.name = LOG_HEADER[0]
+                    new_file = not path.exists()
+                    with open(path, "a", newline="") as f:
+                        bins.to_csv(f, header=new_file, float_format="%.4f")
+                    written += len(bins)
+            source, child_width = path, width
+        return written
+
+    def pick_level(self, start: TimeLike, end: TimeLike, width_px: int) -> Optional[str]:
+        """
+        Coarsest level whose bins are no wider than one pixel of a width_px plot of [start, end]; None for the raw log.
+        """
+        seconds_per_px = (pd.Timestamp(end) - pd.Timestamp(start)).total_seconds() / max(width_px, 1)
+        best = None
+        for name, width in self.levels:
+            if width <= seconds_per_px:
+                best = name
+        return best
+
+    def load_range(
+        self,
+        start: Optional[TimeLike] = None,
+        end: Optional[TimeLike] = None,
+        width_px: int = 1200,
+    ) -> Tuple[pd.DataFrame, str]:
+        """
+        Rows for [start, end] (defaults: the whole log) at the level pick_level chooses, as Timestamp plus
+        <channel>_min/_mean/_max columns (for the raw log min = mean = max). Returns (data, level name or "raw").
+        """
+        index = LogIndex(self.log_path)
+        if start is None:
+            start = index.times[0] if index.times else None
+        if end is None:
+            last = _last_line(self.log_path)
+            end = last.split(",", 1)[0] if last and not last.startswith(LOG_HEADER[0]) else None
+        if start is None or end is None:
+            return pd.DataFrame(columns=[LOG_HEADER[0]]), "raw"
+
+        level = self.pick_level(start, end, width_px)
+        if level is not None and self.level_path(level).exists():
+            return LogIndex(self.level_path(level)).query(start, end), level
+        df = index.query(start, end)
+        for c in self.channels:
+            df[f"{c}_min"] = df[f"{c}_mean"] = df[f"{c}_max"] = pd.to_numeric(df[c], errors="coerce")
+        return df, "raw"
+
+
+def plot_range(
+    log_path: Union[str, Path],
+    start: Optional[TimeLike] = None,
+    end: Optional[TimeLike] = None,
+    channels: Sequence[str] = ("SHT_Temperature_C", "MCP_Temperature_C", "HDC_Temperature_C"),
+    width_px: int = 1200,
+    fahrenheit: bool = False,
+    out_path: Optional[Union[str, Path]] = None,
+) -> "plt.Figure":
+    """
+    Mean of each channel with its min-max band, from the coarsest pyramid level that fits (brought up to date first).
+    Axis formatting follows temperature_analysis.py.
+    """
+    import matplotlib.dates as mdates
+    import matplotlib.pyplot as plt
+
+    pyramid = LogPyramid(log_path)
+    pyramid.update()
+    df, level = pyramid.load_range(start, end, width_px)
+
+    dpi = 100
+    fig, ax = plt.subplots(figsize=(width_px / dpi, 6), dpi=dpi)
+    t = df[LOG_HEADER[0]] if len(df) else []
+    for c in channels:
+        if len(df) == 0:
+            break
+        scale = (lambda v: v * 9 / 5 + 32) if fahrenheit and "Temperature" in c else (lambda v: v)
+        line, = ax.plot(t, scale(df[f"{c}_mean"]), linewidth=0.8, label=c)
+        if level != "raw":
+            ax.fill_between(t, scale(df[f"{c}_min"]), scale(df[f"{c}_max"]), color=line.get_color(), alpha=0.2,
+                            linewidth=0)
+
+    # Format x-axis
+    ax.xaxis.set_major_locator(mdates.DayLocator())        # Big ticks at midnight
+    ax.xaxis.set_minor_locator(mdates.HourLocator(byhour=[6, 12, 18]))  # Small ticks at 6-hour intervals
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    ax.grid(which='major', color='black', linewidth=1.2)   # Big grid lines
+    ax.grid(which='minor', color='gray', linestyle='--', linewidth=0.6)  # Small grid lines
+
+    ax.set_title(f"Temperature Over Time ({level})")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Temperature (°F)" if fahrenheit else "Temperature (°C)")
+    ax.legend(loc="best")
+    fig.tight_layout()
+    if out_path:
+        fig.savefig(out_path)
+    return fig
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Plot a temperature log from its min/mean/max pyramid")
+    parser.add_argument("log", help="log CSV")
+    parser.add_argument("--start", help="start time (default: start of the log)")
+    parser.add_argument("--end", help="end time (default: end of the log)")
+    parser.add_argument("--fahrenheit", action="store_true")
+    parser.add_argument("-o", "--output", default="temperature_overtime.png", help="PNG to write")
+    args = parser.parse_args(argv)
+    import matplotlib.pyplot as plt
+    plt.close(plot_range(args.log, args.start, args.end, fahrenheit=args.fahrenheit, out_path=args.output))
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
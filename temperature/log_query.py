@@ -0,0 +1,177 @@
+"""
+Time-range queries on the temperature logs (FR10).
+
+temperature_analysis.py and the splitter scripts pd.read_csv the whole log, parsing every timestamp, to look at any
+part of it. A log is append-only and in time order, so a sparse index of (timestamp, byte offset) pairs, one every
+INDEX_STEP_BYTES, is enough to find where any time range starts and ends with a binary search; only the bytes in
+between are read and parsed. The index lives next to the log as <log>.idx (lines of "offset,timestamp"), is itself
+append-only, and update() only looks at what was appended since its last entry, so the logger can keep it current
+after every flush.
+
+The log timestamps ("2025-11-24 17:06:45", optionally with fractional seconds) sort the same as text and as times,
+so the index and the search never parse a date.
+
+Run as a script:  python log_query.py temperature_log2.csv "2025-11-25 08:00:00" "2025-11-25 18:00:00" -o day.csv
+"""
+import argparse
+import io
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+
+INDEX_STEP_BYTES = 64 * 1024  # ~1500 rows of the current log between index entries
+INDEX_SUFFIX = ".idx"
+
+TimeLike = Union[str, datetime, pd.Timestamp]
+
+
+def _time_key(t: TimeLike) -> str:
+    # Text form of a query time that compares correctly against the log's timestamps
+    ts = pd.Timestamp(t)
+    return ts.strftime("%Y-%m-%d %H:%M:%S") + (f".{ts.microsecond:06d}" if ts.microsecond else "")
+
+
+class LogIndex:
+    """
+    Sparse timestamp -> byte offset index of one append-only CSV log, whose first column is the timestamp.
+    """
+
+    def __init__(self, log_path: Union[str, Path], step_bytes: int = INDEX_STEP_BYTES):
+        self.log_path = Path(log_path)
+        self.index_path = self.log_path.with_name(self.log_path.name + INDEX_SUFFIX)
+        self.step_bytes = step_bytes
+        self.times: List[str] = []
+        self.offsets: List[int] = []
+        self.header: List[str] = []
+        self.data_start = 0
+        if self.index_path.exists():
+            with open(self.index_path) as f:
+                for line in f:
+                    offset, stamp = line.rstrip("\n").split(",", 1)
+                    self.offsets.append(int(offset))
+                    self.times.append(stamp)
+        self.update()
+
+    def _valid(self, f) -> bool:
+        # The index still describes this file: its last entry points at a line starting with the recorded time.
+        # A rotated or rewritten log fails this and gets a fresh index.
+        if not self.offsets:
+            return True
+        f.seek(self.offsets[-1])
+        return f.readline().decode(errors="replace").startswith(self.times[-1] + ",")
+
+    def update(self) -> int:
+        """
+        Index whatever was appended to the log since the last entry. Returns the number of new entries.
+        """
+        if not self.log_path.exists():
+            return 0
+        new: List[Tuple[int, str]] = []
+        with open(self.log_path, "rb") as f:
+            header = f.readline()
+            self.header = header.decode().rstrip("\r\n").split(",")
+            self.data_start = len(header)
+            if not self._valid(f):
+                self.times, self.offsets = [], []
+                self.index_path.unlink(missing_ok=True)
+
+            target = self.offsets[-1] + self.step_bytes if self.offsets else self.data_start
+            while True:
+                if target > self.data_start:
+                    # Skip to the first line starting at or after target
+                    f.seek(target - 1)
+                    if not f.readline().endswith(b"\n"):
+                        break
+                else:
+                    f.seek(target)
+                start = f.tell()
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break  # end of file, or a row the logger has not finished writing
+                new.append((start, line.split(b",", 1)[0].decode()))
+                target = start + self.step_bytes
+
+        if new:
+            with open(self.index_path, "a") as out:
+                out.writelines(f"{offset},{stamp}\n" for offset, stamp in new)
+            self.offsets.extend(o for o, _ in new)
+            self.times.extend(s for _, s in new)
+        return len(new)
+
+    def byte_range(self, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None) -> Tuple[int, int]:
+        """
+        [lo, hi) byte range of the log that holds every row with start <= time <= end (plus up to one index step of
+        rows on either side). hi is -1 for "to the end of the file".
+        """
+        lo, hi = self.data_start, -1
+        if start is not None:
+            # Last entry strictly before start: rows equal to start may continue from before an entry
+            i = bisect_left(self.times, _time_key(start)) - 1
+            if i >= 0:
+                lo = self.offsets[i]
+        if end is not None:
+            j = bisect_right(self.times, _time_key(end))
+            if j < len(self.offsets):
+                hi = self.offsets[j]
+        return lo, hi
+
+    def query(self, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None) -> pd.DataFrame:
+        """
+        Rows with start <= Timestamp <= end (either bound may be None), with the timestamps parsed.
+        """
+        self.update()
+        lo, hi = self.byte_range(start, end)
+        with open(self.log_path, "rb") as f:
+            f.seek(lo)
+            data = f.read() if hi < 0 else f.read(max(0, hi - lo))
+        data = data[:data.rfind(b"\n") + 1]  # never a half-written last row
+        if not data:
+            df = pd.DataFrame(columns=self.header)
+        else:
+            df = pd.read_csv(io.BytesIO(data), header=None, names=self.header)
+        df[self.header[0]] = pd.to_datetime(df[self.header[0]], format="ISO8601")
+        t = df[self.header[0]]
+        keep = pd.Series(True, index=df.index)
+        if start is not None:
+            keep &= t >= pd.Timestamp(start)
+        if end is not None:
+            keep &= t <= pd.Timestamp(end)
+        return df[keep].reset_index(drop=True)
+
+
+def query_logs(
+    log_paths: Iterable[Union[str, Path]],
+    start: Optional[TimeLike] = None,
+    end: Optional[TimeLike] = None,
+) -> pd.DataFrame:
+    """
+    query() over several logs (e.g. a log and its rotated files), concatenated in time order.
+    """
+    parts = [LogIndex(p).query(start, end) for p in log_paths]
+    if not parts:
+        return pd.DataFrame()
+    df = pd.concat([p for p in parts if len(p)] or parts[:1], ignore_index=True)
+    return df.sort_values(df.columns[0], kind="stable", ignore_index=True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Rows of temperature logs between two times (inclusive)")
+    parser.add_argument("logs", nargs="+", help="log CSV files")
+    parser.add_argument("start", help='start time, e.g. "2025-11-25 08:00:00"')
+    parser.add_argument("end", help="end time")
+    parser.add_argument("-o", "--output", help="write the rows to this CSV instead of printing them")
+    args = parser.parse_args(argv)
+
+    df = query_logs(args.logs, args.start, args.end)
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f"Wrote {len(df)} rows to {args.output}")
+    else:
+        print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Split a temperature log into one file per run, in a single streaming pass.
+
+Replaces the copies of the same pandas splitter (jan_temp_splitter.py, thankgsiving_temp_splitter.py) that each had
+their file names and two split points edited in. Those loaded the whole log and went over it once per output file.
+Here each line is read once and written straight to its output, picked by binary search over the sorted boundaries,
+so any number of outputs costs the same and the log can be bigger than memory. The input's header is replaced by
+COMMON_HEADER, as the scripts did, so logs written with older column names come out consistent.
+
+Either give split points (N points -> N + 1 files, like the scripts: before the first point, between points, after
+the last), or a run manifest: a CSV with columns name,start,end, where each run gets data_<name>.csv with the rows
+from start to end inclusive and rows outside every run are dropped.
+
+    python log_splitter.py temperature_log_thanksgiving.csv --split "2025-12-01 15:00:00" --split "2025-12-05 00:00:00" \
+        -o data_thanksgiving.csv -o data_snowday.csv -o data_lowhumidity.csv
+    python log_splitter.py temperature_log_mid_jan.csv --manifest runs.csv --out-dir split
+"""
+import argparse
+import csv
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from log_query import TimeLike, _time_key
+from log_writer import LOG_HEADER
+
+COMMON_HEADER = ",".join(LOG_HEADER)
+
+_END_OF_SECOND = "\x7f"  # sorts after any fractional-second suffix, so an inclusive end covers its whole second
+
+
+def read_manifest(path: Union[str, Path]) -> List[Tuple[str, str, str]]:
+    """
+    Runs (name, start, end) from a CSV manifest with name,start,end columns.
+    """
+    with open(path, newline="") as f:
+        return [(row["name"].strip(), row["start"].strip(), row["end"].strip()) for row in csv.DictReader(f)]
+
+
+def _manifest_segments(runs: Sequence[Tuple[str, TimeLike, TimeLike]]) -> Tuple[List[str], List[Optional[int]]]:
+    # Boundaries and the output of each segment between them (None: between runs, dropped)
+    order = sorted(range(len(runs)), key=lambda k: _time_key(runs[k][1]))
+    edges: List[str] = []
+    targets: List[Optional[int]] = [None]
+    for k in order:
+        name, start, end = runs[k]
+        lo, hi = _time_key(start), _time_key(end) + _END_OF_SECOND
+        if hi <= lo:
+            raise ValueError(f"Run {name} ends before it starts")
+        if edges and lo < edges[-1]:
+            raise ValueError(f"Run {name} overlaps the run before it")
+        if edges and lo == edges[-1]:
+            edges.pop()
+            targets.pop()
+        edges += [lo, hi]
+        targets += [k, None]
+    return edges, targets
+
+
+def split_log(
+    input_csv: Union[str, Path],
+    outputs: Sequence[Union[str, Path]],
+    split_points: Sequence[TimeLike] = (),
+    runs: Optional[Sequence[Tuple[str, TimeLike, TimeLike]]] = None,
+    header: str = COMMON_HEADER,
+) -> Dict[str, int]:
+    """
+    Stream input_csv into `outputs`. With split_points (N of them, in any order) there must be N + 1 outputs; with
+    runs [(name, start, end), ...] one output per run, in the same order. Returns {output: rows written}.
+    """
+    if runs is not None:
+        edges, targets = _manifest_segments(runs)
+        n_out = len(runs)
+    else:
+        edges = sorted(_time_key(t) for t in split_points)
+        if len(set(edges)) != len(edges):
+            raise ValueError("Split points must be distinct")
+        targets = list(range(len(edges) + 1))
+        n_out = len(edges) + 1
+    if len(outputs) != n_out:
+        raise ValueError(f"Need {n_out} output files, got {len(outputs)}")
+
+    n_columns = header.count(",") + 1
+    counts = [0] * n_out
+    files = []
+    try:
+        for path in outputs:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            f = open(path, "wb", buffering=1 << 20)
+            f.write(header.encode() + b"\n")
+            files.append(f)
+
+        with open(input_csv, "rb") as src:
+            first = src.readline()
+            if first.count(b",") + 1 != n_columns:
+                raise ValueError(f"{input_csv} has {first.count(b',') + 1} columns, the header has {n_columns}")
+            for line in src:
+                if not line.strip():
+                    continue
+                stamp = line[:line.find(b",")].decode()
+                k = targets[bisect_right(edges, stamp)]
+                if k is None:
+                    continue
+                files[k].write(line if line.endswith(b"\n") else line + b"\n")
+                counts[k] += 1
+    finally:
+        for f in files:
+            f.close()
+    return {str(p): n for p, n in zip(outputs, counts)}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Split a temperature log by time, in one pass")
+    parser.add_argument("input", help="log CSV")
+    parser.add_argument("--split", action="append", default=[], help="split time (repeat for more split points)")
+    parser.add_argument("-o", "--output", action="append", default=[], help="output CSV (one more than --split)")
+    parser.add_argument("--manifest", help="CSV of runs with name,start,end columns, instead of --split")
+    parser.add_argument("--out-dir", default=".", help="where manifest outputs (data_<name>.csv) go")
+    args = parser.parse_args(argv)
+
+    if args.manifest:
+        runs = read_manifest(args.manifest)
+        outputs = [Path(args.out_dir) / f"data_{name}.csv" for name, _, _ in runs]
+        written = split_log(args.input, outputs, runs=runs)
+    else:
+        written = split_log(args.input, args.output, split_points=args.split)
+    for path, n in written.items():
+        print(f"Wrote {n} rows to {path}")
+
+
+if __name__ == "__main__":
+    main()
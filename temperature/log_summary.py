@@ -0,0 +1,198 @@
+"""
+Hourly and daily temperature/humidity summaries (FR8) kept up to date by the logger.
+
+temperature_analysis.py gets averages by reading and resampling the whole CSV. Instead, the logger keeps running
+per-hour aggregates (count, sum, sum of squares, min and max of every channel) in a small side file,
+<log>.summary.json, and adds each batch of rows to it when the batch is flushed. Daily values are combined from the
+hours of the day. A summary then costs the same however long the log is. If the side file is lost or out of date,
+rebuild() recomputes it from the raw log(s) in one streamed pass.
+
+Run as a script:  python log_summary.py temperature_log2.csv [--hourly] [--rebuild]
+"""
+import argparse
+import json
+import math
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from log_query import LogIndex
+from log_writer import LOG_HEADER
+
+SUMMARY_SUFFIX = ".summary.json"
+STATS = ["count", "sum", "sumsq", "min", "max"]
+
+
+class LogAggregates:
+    """
+    Per-hour count / sum / sum of squares / min / max for each channel of a log, keyed by "YYYY-MM-DD HH".
+    NaN readings (a sensor that failed that sample) are left out of that channel's statistics.
+    """
+
+    def __init__(self, log_path: Union[str, Path], channels: Sequence[str] = LOG_HEADER[1:]):
+        self.log_path = Path(log_path)
+        self.path = self.log_path.with_name(self.log_path.name + SUMMARY_SUFFIX)
+        self.channels = list(channels)
+        self.hours: Dict[str, np.ndarray] = {}  # hour -> (len(STATS), n_channels)
+        self.last_timestamp = ""  # newest row included, as written in the log
+
+    @classmethod
+    def load(cls, log_path: Union[str, Path]) -> "LogAggregates":
+        """
+        The saved aggregates of a log, or empty ones if there is no side file yet.
+        """
+        agg = cls(log_path)
+        if agg.path.exists():
+            with open(agg.path) as f:
+                saved = json.load(f)
+            agg.channels = saved["channels"]
+            agg.last_timestamp = saved["last_timestamp"]
+            agg.hours = {hour: np.array(v, dtype=np.float64) for hour, v in saved["hours"].items()}
+        return agg
+
+    def save(self) -> None:
+        # Written to a temporary file first so a crash mid-save never leaves a truncated side file
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({
+                "channels": self.channels,
+                "last_timestamp": self.last_timestamp,
+                "hours": {hour: v.tolist() for hour, v in sorted(self.hours.items())},
+            }, f)
+        os.replace(tmp, self.path)
+
+    def _empty(self) -> np.ndarray:
+        v = np.zeros((len(STATS), len(self.channels)))
+        v[3], v[4] = np.inf, -np.inf
+        return v
+
+    def add_frame(self, stamps: pd.Series, values: np.ndarray) -> None:
+        """
+        Add rows given as timestamp strings (as in the log) and an (n_rows, n_channels) array of readings.
+        """
+        if len(stamps) == 0:
+            return
+        stamps = stamps.astype(str)
+        hours = stamps.str.slice(0, 13).to_numpy()
+        ok = np.isfinite(values)
+        x = np.where(ok, values, 0.0)
+        for hour in np.unique(hours):
+            sel = hours == hour
+            v = self.hours.get(hour)
+            if v is None:
+                v = self.hours[hour] = self._empty()
+            xs, oks = x[sel], ok[sel]
+            v[0] += oks.sum(axis=0)
+            v[1] += xs.sum(axis=0)
+            v[2] += (xs * xs).sum(axis=0)
+            v[3] = np.minimum(v[3], np.where(oks, values[sel], np.inf).min(axis=0))
+            v[4] = np.maximum(v[4], np.where(oks, values[sel], -np.inf).max(axis=0))
+        self.last_timestamp = max(self.last_timestamp, stamps.max())
+
+    def add_rows(self, rows: List[Sequence]) -> None:
+        """
+        Add rows as the logger writes them ([timestamp, *values]) and save; use as a BufferedCSVWriter on_flush callback.
+        """
+        if not rows:
+            return
+        stamps = pd.Series([str(r[0]) for r in rows])
+        values = np.array([r[1:] for r in rows], dtype=np.float64)
+        self.add_frame(stamps, values)
+        self.save()
+
+    def catch_up(self) -> int:
+        """
+        Add rows of the log newer than last_timestamp (e.g. flushed just before a crash, before the aggregates were
+        saved). Uses the log's time index, so only the new end of the log is read. Returns the number of rows added.
+        """
+        if not self.log_path.exists():
+            return 0
+        new = LogIndex(self.log_path).query(start=self.last_timestamp or None)
+        if self.last_timestamp:
+            new = new[new.iloc[:, 0] > pd.Timestamp(self.last_timestamp)]
+        if len(new):
+            stamps = new.iloc[:, 0].dt.strftime("%Y-%m-%d %H:%M:%S.%f").str.rstrip("0").str.rstrip(".")
+            self.add_frame(stamps, new[self.channels].to_numpy(dtype=np.float64))
+            self.save()
+        return len(new)
+
+    def summary(self, period: str = "day") -> pd.DataFrame:
+        """
+        Mean, min, max and standard deviation of every channel per "day" or "hour", one row per period.
+        """
+        if period not in ("day", "hour"):
+            raise ValueError(f"Unknown period {period!r}")
+        width = 10 if period == "day" else 13
+        merged: Dict[str, np.ndarray] = {}
+        for hour, v in self.hours.items():
+            key = hour[:width]
+            m = merged.get(key)
+            if m is None:
+                merged[key] = v.copy()
+            else:
+                m[:3] += v[:3]
+                m[3] = np.minimum(m[3], v[3])
+                m[4] = np.maximum(m[4], v[4])
+
+        rows = {}
+        for key in sorted(merged):
+            count, total, sumsq, lo, hi = merged[key]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = total / count
+                std = np.sqrt(np.maximum(sumsq / count - mean * mean, 0.0))
+            row = {"count": int(count.max())}
+            for j, c in enumerate(self.channels):
+                ok = count[j] > 0
+                row[f"{c}_mean"] = mean[j] if ok else math.nan
+                row[f"{c}_min"] = lo[j] if ok else math.nan
+                row[f"{c}_max"] = hi[j] if ok else math.nan
+                row[f"{c}_std"] = std[j] if ok else math.nan
+            rows[key] = row
+        df = pd.DataFrame.from_dict(rows, orient="index")
+        df.index = pd.to_datetime(df.index, format="%Y-%m-%d" if period == "day" else "%Y-%m-%d %H")
+        df.index.name = period
+        return df
+
+
+def rebuild(
+    log_path: Union[str, Path],
+    extra_logs: Iterable[Union[str, Path]] = (),
+    chunksize: int = 200_000,
+) -> LogAggregates:
+    """
+    Recompute the aggregates of log_path from the raw log, plus any extra_logs (e.g. its rotated files), streaming
+    each in chunks, and save them.
+    """
+    agg = LogAggregates(log_path)
+    for path in [*extra_logs, log_path]:
+        with pd.read_csv(path, chunksize=chunksize, dtype=str) as reader:
+            for chunk in reader:
+                chunk.columns = [LOG_HEADER[0], *chunk.columns[1:]]
+                values = chunk.reindex(columns=agg.channels).apply(pd.to_numeric, errors="coerce")
+                agg.add_frame(chunk[LOG_HEADER[0]], values.to_numpy(dtype=np.float64))
+    agg.save()
+    return agg
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Daily (or hourly) temperature and humidity summary of a log")
+    parser.add_argument("log", help="log CSV (its .summary.json is used when present)")
+    parser.add_argument("--hourly", action="store_true", help="one row per hour instead of per day")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the summary from the raw log first")
+    parser.add_argument("--rotated", nargs="*", default=[], help="rotated files of the log, for --rebuild")
+    args = parser.parse_args(argv)
+
+    if args.rebuild or not Path(args.log + SUMMARY_SUFFIX).exists():
+        agg = rebuild(args.log, args.rotated)
+    else:
+        agg = LogAggregates.load(args.log)
+        agg.catch_up()
+    with pd.option_context("display.max_columns", None, "display.width", 200, "display.precision", 2):
+        print(agg.summary("hour" if args.hourly else "day"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Buffered CSV writer for the temperature logger.
+
+temperature_logger2.py used to open, append to and close the log on every tick, which on the Pi's SD card costs a
+directory lookup, a metadata update and a block rewrite per row, and keeps the loop from logging faster than about
+once a second. This keeps the file open, collects rows in memory and writes them out together every FLUSH interval,
+followed by an fsync, so a crash or power cut loses at most that interval (FR3: no more than 1 minute of data).
+The file can be rotated by size or age; rotated files keep their rows and header and get the rotation time in their
+name, while the logger keeps writing to the same LOG_FILE.
+"""
+import csv
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+# Columns of temperature_logger2.py's log
+LOG_HEADER = ["Timestamp", "SHT_Temperature_C", "MCP_Temperature_C", "HDC_Temperature_C",
+              "SHT_Relative_Humidity", "HDC_Relative_Humidity"]
+
+
+def _truncate_partial_line(path: Path) -> None:
+    # Drop a row left half-written by a crash, so the next write starts on a clean line
+    with open(path, mode="rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Only the tail needs reading: a row is far shorter than 4 kB
+        start = max(0, size - 4096)
+        f.seek(start)
+        tail = f.read()
+        f.truncate(start + tail.rfind(b"\n") + 1)
+
+
+class BufferedCSVWriter:
+    """
+    Append-only CSV log with an in-memory row buffer.
+    Rows are written and fsync'd every flush_interval_s seconds (or once max_buffer_rows are waiting), on close(), and
+    when used as a context manager, on exit. With rotate_bytes / rotate_interval_s set, the file is renamed to
+    <stem>_<YYYYmmdd-HHMMSS><suffix> once it grows past that size or age, and a new file with the header is started.
+    Each on_flush callback is called with the rows just written, once they are on disk (e.g. to update an index).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        header: Sequence[str] = LOG_HEADER,
+        flush_interval_s: float = 30.0,
+        max_buffer_rows: int = 10_000,
+        rotate_bytes: Optional[int] = None,
+        rotate_interval_s: Optional[float] = None,
+        on_flush: Sequence[Callable[[List[Sequence]], None]] = (),
+    ):
+        self.path = Path(path)
+        self.header = list(header)
+        self.flush_interval_s = flush_interval_s
+        self.max_buffer_rows = max_buffer_rows
+        self.rotate_bytes = rotate_bytes
+        self.rotate_interval_s = rotate_interval_s
+        self.on_flush = list(on_flush)
+        self._buffer: List[Sequence] = []
+        self._file = None
+        self._writer = None
+        self._opened_at = 0.0
+        self._rows_in_file = 0
+        self._last_flush = time.monotonic()
+        self._open()
+
+    def _open(self) -> None:
+        new_file = not self.path.exists() or self.path.stat().st_size == 0
+        if not new_file:
+            _truncate_partial_line(self.path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, mode="a", newline="")
+        self._writer = csv.writer(self._file)
+        self._opened_at = time.time()
+        self._rows_in_file = 0 if new_file else 1
+        if new_file:
+            self._writer.writerow(self.header)
+            self._sync()
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def write(self, row: Sequence) -> None:
+        """
+        Queue one row; flushes when the flush interval has passed or the buffer is full.
+        """
+        self._buffer.append(row)
+        if (len(self._buffer) >= self.max_buffer_rows
+                or time.monotonic() - self._last_flush >= self.flush_interval_s):
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write every buffered row and fsync, then rotate the file if it is due.
+        """
+        if self._buffer:
+            self._writer.writerows(self._buffer)
+            self._sync()
+            self._rows_in_file += len(self._buffer)
+            rows, self._buffer = self._buffer, []
+            for callback in self.on_flush:
+                callback(rows)
+        self._last_flush = time.monotonic()
+        self._maybe_rotate()
+
+    def _maybe_rotate(self) -> None:
+        if not self._rows_in_file:
+            return  # never rotate out a file that only holds the header
+        too_big = self.rotate_bytes is not None and self._file.tell() >= self.rotate_bytes
+        too_old = self.rotate_interval_s is not None and time.time() - self._opened_at >= self.rotate_interval_s
+        if too_big or too_old:
+            self.rotate()
+
+    def rotate(self) -> Path:
+        """
+        Close the current file, rename it with the current time and start a new one. Returns the rotated file's path.
+        """
+        self._file.close()
+        stamp = f"{self.path.stem}_{datetime.now():%Y%m%d-%H%M%S}"
+        rotated = self.path.with_name(stamp + self.path.suffix)
+        n = 1
+        while rotated.exists():  # never overwrite an earlier rotation from the same second
+            rotated = self.path.with_name(f"{stamp}-{n}{self.path.suffix}")
+            n += 1
+        os.replace(self.path, rotated)
+        self._open()
+        return rotated
+
+    def close(self) -> None:
+        """
+        Flush whatever is buffered and close the file.
+        """
+        if self._file is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "BufferedCSVWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
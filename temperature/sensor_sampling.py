@@ -0,0 +1,216 @@
+"""
+Concurrent sampling of the temperature/humidity sensors.
+
+temperature_logger2.py read the sensors one after another, and each round(sht.temperature) / sht.relative_humidity
+pair was two separate measurements (the SHT45 high-precision mode waits ~8 ms per measurement). Here every enabled
+sensor is read at the same time on a thread pool, with one combined .measurements read per sensor where the driver
+has it. The conversion waits of the different sensors overlap, since the drivers only hold the I2C bus for the
+transfers themselves. Each read is retried up to 3 times on an I2C error (FR1) and must finish within a timeout.
+A sensor that fails or times out gives NaN for that sample instead of stalling the loop. Errors are kept per sample,
+and Sample.changes holds only the ones worth printing: a sensor starting to fail, failing differently, or recovering.
+
+SimulatedSensor stands in for the hardware (like DisabledSensor, but with realistic readings) so the logger can be
+run and tested away from the Pi.
+"""
+import math
+import random
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# (sensor name, 0 = temperature / 1 = humidity) for each value column of log_writer.LOG_HEADER
+LOG_CHANNELS = [("sht", 0), ("mcp", 0), ("hdc", 0), ("sht", 1), ("hdc", 1)]
+
+READ_RETRIES = 3
+READ_TIMEOUT_SECONDS = 0.08  # leaves room to log within the 100 ms read-and-log NFR of FR2
+STILL_RUNNING = "previous read still running"  # a timed-out read that has not returned yet
+
+
+class SimulatedSensor:
+    """
+    Fake sensor with lab-like readings: room temperature cycling with the HVAC, a slow random walk, measurement noise
+    and the sensor's resolution. Humidity moves opposite to temperature. Set has_humidity=False for a
+    temperature-only part (MCP9808); failure_rate makes reads raise OSError like a flaky I2C bus.
+    """
+
+    def __init__(
+        self,
+        temperature_c: float = 21.5,
+        humidity: float = 27.0,
+        has_humidity: bool = True,
+        resolution_c: float = 0.01,
+        noise_c: float = 0.02,
+        hvac_amplitude_c: float = 0.4,
+        hvac_period_s: float = 1200.0,
+        read_time_s: float = 0.009,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.base_temperature = temperature_c
+        self.base_humidity = humidity
+        self.has_humidity = has_humidity
+        self.resolution = resolution_c
+        self.noise = noise_c
+        self.hvac_amplitude = hvac_amplitude_c
+        self.hvac_period = hvac_period_s
+        self.read_time = read_time_s
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._walk = 0.0
+        self._phase = self._rng.uniform(0, 2 * math.pi)
+
+    def _read(self) -> Tuple[float, float]:
+        time.sleep(self.read_time)
+        if self._rng.random() < self.failure_rate:
+            raise OSError(121, "Remote I/O error")  # what a NACK on the bus looks like from Blinka
+        self._walk += self._rng.gauss(0, 0.002)
+        swing = math.sin(2 * math.pi * time.time() / self.hvac_period + self._phase)
+        t = self.base_temperature + self.hvac_amplitude * swing + self._walk + self._rng.gauss(0, self.noise)
+        rh = self.base_humidity - 1.5 * self.hvac_amplitude * swing + self._rng.gauss(0, 0.05)
+        return round(t / self.resolution) * self.resolution, rh
+
+    @property
+    def temperature(self) -> float:
+        return self._read()[0]
+
+    @property
+    def relative_humidity(self) -> float:
+        if not self.has_humidity:
+            raise AttributeError("Sensor has no humidity channel")
+        return self._read()[1]
+
+    @property
+    def measurements(self) -> Tuple[float, float]:
+        if not self.has_humidity:
+            raise AttributeError("Sensor has no humidity channel")
+        return self._read()
+
+
+def simulated_sensors(seed: Optional[int] = None) -> Dict[str, SimulatedSensor]:
+    """
+    SHT45 / MCP9808 / HDC3022 stand-ins, offset from each other about as much as the real ones in temperature_log2.csv.
+    """
+    return {
+        "sht": SimulatedSensor(22.1, 25.0, seed=seed),
+        "mcp": SimulatedSensor(21.4, has_humidity=False, resolution_c=0.0625, read_time_s=0.001,
+                               seed=None if seed is None else seed + 1),
+        "hdc": SimulatedSensor(23.2, 30.2, read_time_s=0.012, seed=None if seed is None else seed + 2),
+    }
+
+
+@dataclass
+class Sample:
+    timestamp: datetime  # taken once, when the reads start
+    values: Dict[str, Tuple[float, float]]  # sensor name -> (temperature C, relative humidity %), NaN if unavailable
+    errors: Dict[str, str] = field(default_factory=dict)  # sensor name -> why it has no value this time
+    changes: Dict[str, str] = field(default_factory=dict)  # sensor name -> its new state, only when that changed
+
+    def log_row(self, timestamp_format: str = "%Y-%m-%d %H:%M:%S") -> List:
+        """
+        Row in log_writer.LOG_HEADER order, values rounded to 0.01 as the logger always did.
+        """
+        nan = (math.nan, math.nan)
+        return [self.timestamp.strftime(timestamp_format),
+                *(round(self.values.get(name, nan)[k], 2) for name, k in LOG_CHANNELS)]
+
+
+def read_sensor(sensor, retries: int = READ_RETRIES) -> Tuple[float, float]:
+    """
+    (temperature, humidity) in one combined read where the sensor has .measurements, temperature only (humidity NaN)
+    otherwise. I2C errors (OSError/RuntimeError) are retried up to `retries` times in total.
+    """
+    for attempt in range(retries):
+        try:
+            if hasattr(type(sensor), "measurements"):
+                try:
+                    t, rh = sensor.measurements
+                    return float(t), float(rh)
+                except AttributeError:
+                    pass  # a temperature-only sensor
+            return float(sensor.temperature), math.nan
+        except (OSError, RuntimeError):
+            if attempt == retries - 1:
+                raise
+    raise ValueError("retries must be at least 1")
+
+
+class SensorSampler:
+    """
+    Reads a set of sensors ({name: sensor}) concurrently, one thread per sensor.
+    A sensor whose previous read is still hanging is not read again until that read returns, so a stuck device
+    never piles up threads; its value is NaN in the meantime.
+    """
+
+    def __init__(
+        self,
+        sensors: Dict[str, object],
+        timeout_s: float = READ_TIMEOUT_SECONDS,
+        retries: int = READ_RETRIES,
+    ):
+        self.sensors = dict(sensors)
+        self.timeout_s = timeout_s
+        self.retries = retries
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self.sensors)), thread_name_prefix="sensor")
+        self._pending: Dict[str, Future] = {}
+        self._failing: Dict[str, Tuple[str, int]] = {}  # sensor name -> (error it started failing with, samples missed)
+
+    def sample(self) -> Sample:
+        """
+        Read every sensor once. Returns after all reads finished or after timeout_s, whichever comes first.
+        A sensor that keeps failing the same way (a hung read is one failure until it returns) is in `changes` once,
+        when it starts, and again when it recovers.
+        """
+        timestamp = datetime.now()
+        start = time.monotonic()
+        errors: Dict[str, str] = {}
+        futures: Dict[str, Future] = {}
+        for name, sensor in self.sensors.items():
+            previous = self._pending.get(name)
+            if previous is not None and not previous.done():
+                errors[name] = STILL_RUNNING
+                continue
+            futures[name] = self._pool.submit(read_sensor, sensor, self.retries)
+
+        values: Dict[str, Tuple[float, float]] = {}
+        for name, future in futures.items():
+            try:
+                values[name] = future.result(timeout=max(0.0, self.timeout_s - (time.monotonic() - start)))
+                self._pending.pop(name, None)
+            except FutureTimeout:
+                self._pending[name] = future
+                errors[name] = f"timed out after {self.timeout_s:g} s"
+            except Exception as e:
+                self._pending.pop(name, None)
+                errors[name] = f"{type(e).__name__}: {e}"
+        nan = (math.nan, math.nan)
+        return Sample(timestamp, {name: values.get(name, nan) for name in self.sensors}, errors, self._changes(errors))
+
+    def _changes(self, errors: Dict[str, str]) -> Dict[str, str]:
+        changes: Dict[str, str] = {}
+        for name in self.sensors:
+            error = errors.get(name)
+            if name in self._failing:
+                first, missed = self._failing[name]
+                if error is None:
+                    del self._failing[name]
+                    changes[name] = f"recovered after {missed} missed samples"
+                elif error == first or error == STILL_RUNNING:
+                    self._failing[name] = (first, missed + 1)
+                else:
+                    self._failing[name] = (error, missed + 1)
+                    changes[name] = error
+            elif error is not None:
+                self._failing[name] = (error, 1)
+                changes[name] = error
+        return changes
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+
+    def __enter__(self) -> "SensorSampler":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
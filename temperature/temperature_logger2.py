@@ -28,20 +28,32 @@ sudo apt-get install i2c-tools
 i2cdetect -y 1
 """
 import time
-import csv
-import os
-from datetime import datetime
+import signal
 from typing import Tuple
-import adafruit_bmp3xx
-import board
-import busio
-import digitalio
-import adafruit_sht4x
-import adafruit_mcp9808
-import adafruit_hdc302x
+
+from log_pyramid import LogPyramid
+from log_query import LogIndex
+from log_summary import LogAggregates
+from log_writer import LOG_HEADER, BufferedCSVWriter
+from sensor_sampling import SensorSampler, simulated_sensors
+
+try:
+    import adafruit_bmp3xx
+    import board
+    import busio
+    import digitalio
+    import adafruit_sht4x
+    import adafruit_mcp9808
+    import adafruit_hdc302x
+    _HAVE_HARDWARE = True
+except Exception:  # not on the Pi; only SIMULATE_SENSORS works
+    _HAVE_HARDWARE = False
 
 # Configuration
-LOG_INTERVAL_SECONDS = 1  # Change to 1 for per-second logging
+LOG_INTERVAL_SECONDS = 1  # Change to 1 for per-second logging; fractions of a second work too (e.g. 0.2)
+FLUSH_INTERVAL_SECONDS = 30  # rows are written to disk (and fsync'd) this often; at most this much is lost in a crash
+ROTATE_BYTES = None  # e.g. 100_000_000 to start a new log file every ~100 MB
+ROTATE_INTERVAL_SECONDS = None  # e.g. 7 * 24 * 3600 to start a new log file every week
 HOURLY_STATUS_INTERVAL = 3600  # Seconds in an hour
 TEMP_THRESHOLD = 50.0  # Optional alert threshold (disabled by default)
 ENABLE_ALERTS = False
@@ -49,6 +61,7 @@ ENABLE_AUTOSTART = False # Not yet implemented
 SHT45_ENABLED = True
 MCP9808_ENABLED = True
 HDC3022_ENABLED = True
+SIMULATE_SENSORS = False  # True to log made-up readings from sensor_sampling.SimulatedSensor (testing without a Pi)
 LOG_FILE = "temperature_log_early_feb.csv"
 
 class DisabledSensor:
@@ -63,8 +76,15 @@ class DisabledSensor:
         return (self.temperature, self.relative_humidity)
 
 
-def initializeSensors(sht45=True, mcp9808=True, hdc3022=True):
+def initializeSensors(sht45=True, mcp9808=True, hdc3022=True, simulate=False):
     # Initialize sensors
+    if simulate:
+        sim = simulated_sensors()
+        return [sim["sht"] if sht45 else DisabledSensor(),
+                sim["mcp"] if mcp9808 else DisabledSensor(),
+                sim["hdc"] if hdc3022 else DisabledSensor()]
+    if not _HAVE_HARDWARE:
+        raise RuntimeError("Sensor libraries not available (not on the Pi?); set SIMULATE_SENSORS = True to test")
     port = 1
     sht_address = 0x44 # SHT45 I2C address is 0x44 and cannot be changed (a manufacturer limitation)
     mcp_address = 0x18 # Default address printed on circuit card. Can be changed to with soldered jumpers.
@@ -93,36 +113,59 @@ def initializeSensors(sht45=True, mcp9808=True, hdc3022=True):
     return [sht, mcp, hdc]
 
 
-def create_log_file(sht45=True, mcp9808=True, hdc3022=True):
-    # Create log file with header if it doesn't exist
-    if not os.path.exists(LOG_FILE):
-        with open(LOG_FILE, mode='w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(["Timestamp", "SHT_Temperature_C",  "MCP_Temperature_C", "HDC_Temperature_C", "SHT_Relative_Humidity", "HDC_Relative_Humidity"])
+def create_log_writer():
+    # The log file gets its header when it is new; an existing one is appended to.
+    # The time-range index (log_query.py), the hourly/daily aggregates (log_summary.py) and the plotting pyramid
+    # (log_pyramid.py) next to it are brought up to date after every flush; the aggregates first pick up anything
+    # logged since they were last saved.
+    writer = BufferedCSVWriter(LOG_FILE, LOG_HEADER, flush_interval_s=FLUSH_INTERVAL_SECONDS,
+                               rotate_bytes=ROTATE_BYTES, rotate_interval_s=ROTATE_INTERVAL_SECONDS)
+    index = LogIndex(LOG_FILE)
+    aggregates = LogAggregates.load(LOG_FILE)
+    aggregates.catch_up()
+    writer.on_flush.append(lambda rows: index.update())
+    writer.on_flush.append(aggregates.add_rows)
+    pyramid = LogPyramid(LOG_FILE)
+    writer.on_flush.append(lambda rows: pyramid.update())
+    return writer
+
 
+def _stop(signum, frame):
+    # systemd and kill send SIGTERM: stop the loop the same way Ctrl+C does, so the buffer is flushed
+    raise KeyboardInterrupt
 
 
 if __name__ == "__main__":
     # Main loop
-    sht, mcp, hdc = initializeSensors()
-    create_log_file()
+    sht, mcp, hdc = initializeSensors(SHT45_ENABLED, MCP9808_ENABLED, HDC3022_ENABLED, simulate=SIMULATE_SENSORS)
+    # All sensors are read at once, each with one combined temperature+humidity read, timeouts and retries
+    sampler = SensorSampler({"sht": sht, "mcp": mcp, "hdc": hdc})
+    log = create_log_writer()
+    signal.signal(signal.SIGTERM, _stop)
+    # Sub-second intervals need sub-second timestamps to keep rows apart
+    timestamp_format = "%Y-%m-%d %H:%M:%S" if LOG_INTERVAL_SECONDS >= 1 else "%Y-%m-%d %H:%M:%S.%f"
     last_status_time = time.time()
-    start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    start_temperatures = [round(sht.temperature, 2), round(mcp.temperature, 2), round(hdc.temperature, 2)]
-    start_humidities = [round(sht.relative_humidity,2), round(hdc.relative_humidity,2)]
+    start_sample = sampler.sample()
+    start_row = start_sample.log_row()
+    start_time = start_row[0]
+    start_temperatures, start_humidities = start_row[1:4], start_row[4:]
     print(f"Temperature logging started @ {start_time}: Current Temperatures = {start_temperatures}°C. Current Humidities = {start_humidities}")
+    for name, change in start_sample.changes.items():
+        print(f"Sensor {name} at {start_time}: {change}")
 
+    next_tick = time.monotonic()
     try:
         while True:
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            # data = bme280.sample(bus, address, calibration_params)
-            temperatures = [round(sht.temperature, 2), round(mcp.temperature, 2), round(hdc.temperature, 2)]
-            humidities = [round(sht.relative_humidity, 2), round(hdc.relative_humidity, 2)]
+            sample = sampler.sample()
+            row = sample.log_row(timestamp_format)
+            current_time = row[0]
+            temperatures, humidities = row[1:4], row[4:]
+            # Only a sensor starting to fail or recovering is reported, not every sample it misses
+            for name, change in sample.changes.items():
+                print(f"Sensor {name} at {current_time}: {change}")
 
-            # Log to CSV
-            with open(LOG_FILE, mode='a', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow([current_time, *temperatures, *humidities])
+            # Log to CSV (buffered; written out every FLUSH_INTERVAL_SECONDS)
+            log.write(row)
 
             # Optional alert
             if ENABLE_ALERTS and temperatures[0] > TEMP_THRESHOLD:
@@ -133,7 +176,12 @@ if __name__ == "__main__":
                 print(f"Status Update @ {current_time}: Current Temperature = {temperatures}°C. Current Humidities = {humidities}")
                 last_status_time = time.time()
 
-            time.sleep(LOG_INTERVAL_SECONDS)
+            # Sleep to the next tick rather than a fixed interval, so the time spent reading does not add up
+            next_tick += LOG_INTERVAL_SECONDS
+            time.sleep(max(0.0, next_tick - time.monotonic()))
 
     except KeyboardInterrupt:
         print("Temperature logging stopped by user.")
+    finally:
+        log.close()
+        sampler.close()
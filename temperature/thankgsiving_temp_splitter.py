@@ -5,50 +5,30 @@
 # snowday2449 25-12-03 09-20-22.bmp	        2025-12-03 09:20:22
 # lowhumidity0001 25-12-05 10-32-56.bmp     2025-12-05 10:32:56
 # lowhumidity7156 25-12-10 09-52-01.bmp     2025-12-10 09:52:01
-import pandas as pd
+# Now a thin wrapper around log_splitter.py, which streams the log once instead of loading it into pandas.
+# The same split can be done from the command line:
+#   python log_splitter.py temperature_log_thanksgiving.csv --split "2025-12-01 15:00:00" --split "2025-12-05 00:00:00" -o data_thanksgiving.csv -o data_snowday.csv -o data_lowhumidity.csv
+from log_splitter import split_log
 
 # --- inputs ---
 input_csv = "temperature_log_thanksgiving.csv"
 output_csv_thanksgiving = "data_thanksgiving.csv"
 output_csv_snowday = "data_snowday.csv"
 output_csv_lowhumidity = "data_lowhumidity.csv"
-common_header = "Timestamp,SHT_Temperature_C,MCP_Temperature_C,HDC_Temperature_C,SHT_Relative_Humidity,HDC_Relative_Humidity"
-columns = common_header.split(',')
 # sample line: 2025-11-25 11:20:52,21.57,21.31,23.0,26.35,31.87
 
 split_time_str1 = "2025-12-01 15:00:00"  # your split point
 split_time_str2 = "2025-12-05 00:00:00"  # your split point
 
-# Read CSV and parse the first column as datetime
-# Adjust 'parse_dates=[0]' if the datetime column isn't the first, e.g., use ['timestamp'] for a named column.
-df = pd.read_csv(
-    input_csv,
-    parse_dates=[0],            # first column is datetime
-    infer_datetime_format=True  # speeds up parsing for common formats
-)
-df.columns=columns
-
-
-# Create the split timestamp (timezone-aware to match df if you localized above)
-split_time1 = pd.Timestamp(split_time_str1)
-split_time2 = pd.Timestamp(split_time_str2)
-
 # Sanity: enforce chronological order if needed
-if split_time2 <= split_time1:
+if split_time_str2 <= split_time_str1:
     raise ValueError("split_time_str2 must be later than split_time_str1")
 
-
-
-# Split into three DataFrames
-thanksgiving_df = df[df.iloc[:, 0] < split_time1]
-snowday_df      = df[(df.iloc[:, 0] >= split_time1) & (df.iloc[:, 0] < split_time2)]
-lowhumidity_df  = df[df.iloc[:, 0] >= split_time2]
-
-# Write out to CSV with the common header and no index
-thanksgiving_df.to_csv(output_csv_thanksgiving, index=False, header=True)
-snowday_df.to_csv(output_csv_snowday, index=False, header=True)
-lowhumidity_df.to_csv(output_csv_lowhumidity, index=False, header=True)
-
-print(f"Wrote {len(thanksgiving_df)} rows to {output_csv_thanksgiving}")
-print(f"Wrote {len(snowday_df)} rows to {output_csv_snowday}")
-print(f"Wrote {len(lowhumidity_df)} rows to {output_csv_lowhumidity}")
+# Rows before split 1, between the two, and after split 2; every output gets the common header
+written = split_log(
+    input_csv,
+    [output_csv_thanksgiving, output_csv_snowday, output_csv_lowhumidity],
+    split_points=[split_time_str1, split_time_str2],
+)
+for path, n in written.items():
+    print(f"Wrote {n} rows to {path}")
@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+# The root modules are imported by plain name, and temperature/ is a flat folder of scripts like on the Pi
+for _path in (REPO_DIR, REPO_DIR / "temperature"):
+    if str(_path) not in sys.path:
+        sys.path.insert(0, str(_path))
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def dot_image(rng, mu=(80.0, 60.0), sigma=3.0, amp=150.0, shape=(120, 160), noise=4.0, offset=20.0):
+    """Synthetic camera frame: a round Gaussian dot at mu = (x, y) on a flat, noisy background."""
+    y, x = np.mgrid[:shape[0], :shape[1]]
+    img = offset + amp * np.exp(-((x - mu[0]) ** 2 + (y - mu[1]) ** 2) / (2 * sigma ** 2))
+    return img + rng.normal(0.0, noise, shape)
+
+
+@pytest.fixture
+def write_frames():
+    """Save images as 8-bit BMPs named like the camera's (minutely0001 25-09-22 09-39-50.bmp), one second apart."""
+    from PIL import Image
+
+    def write(folder, images):
+        folder.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for i, img in enumerate(images):
+            m, s = divmod(i, 60)
+            path = folder / f"minutely{i + 1:04d} 25-09-22 09-{m:02d}-{s:02d}.bmp"
+            Image.fromarray(np.clip(np.rint(img), 0, 255).astype(np.uint8), mode="L").save(path)
+            paths.append(path)
+        return paths
+
+    return write
+
+
+@pytest.fixture
+def accel_session(tmp_path, rng):
+    """A session folder with two 20 s AccelData CSVs at 1 kHz: a 7 Hz tone on Mirror_X plus noise."""
+    session = tmp_path / "Session_2025-10-14_160804"
+    session.mkdir()
+    fs, n = 1000.0, 20_000
+    start = np.datetime64("2025-10-14T16:08:04.000")
+    for k in range(2):
+        t = (k * n + np.arange(n)) / fs
+        stamps = (start + (t * 1e6).astype("timedelta64[us]")).astype(str)
+        cols = {
+            "AbsoluteTime": [s.replace("T", " ") for s in stamps],
+            "RelativeTime_s": t,
+            "Mirror_Y_g": 0.01 + 1e-3 * rng.normal(size=n),
+            "Mirror_X_g": -0.02 + 0.01 * np.sin(2 * np.pi * 7.0 * t) + 1e-3 * rng.normal(size=n),
+            "Mirror_Z_g": 1e-3 * rng.normal(size=n),
+            "Desk_Y_g": 0.005 + 1e-3 * rng.normal(size=n),
+        }
+        pd.DataFrame(cols).to_csv(session / f"AccelData_2025-10-14_160804_File{k + 1:04d}.csv", index=False,
+                                  float_format="%.6f")
+    return session
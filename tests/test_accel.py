@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import signal
+
+from accelerometer.accel_events import BandTrigger, EventOptions, load_event, scan_file
+from accelerometer.accel_fft import WELCH_BATCH_SEGMENTS, FFTOptions, _welch_psd
+from accelerometer.accel_io import (
+    QC_FILENAME,
+    SATURATION_G,
+    QCOptions,
+    check_session,
+    load_session_qc,
+    qc_bad_minutes,
+    qc_frame,
+    read_many_csvs,
+)
+
+
+def test_batched_welch_matches_one_scipy_call(rng):
+    fs = 1000.0
+    x = 0.01 * np.sin(2 * np.pi * 7.0 * np.arange(200_000) / fs) + rng.normal(0.0, 1e-3, 200_000)
+    opts = FFTOptions(nperseg_seconds=2.0)
+    f, P, _ = _welch_psd(x, fs, opts)
+    assert (len(x) - 2000) // 1000 + 1 > 3 * WELCH_BATCH_SEGMENTS  # several batches, the last one partial
+    f_ref, P_ref = signal.welch(x, fs=fs, window="hann", nperseg=2000, noverlap=1000, detrend="constant")
+    np.testing.assert_array_equal(f, f_ref)
+    np.testing.assert_allclose(P, P_ref, rtol=1e-10, atol=0)
+
+
+def test_welch_leaves_out_segments_touching_bad_samples(rng):
+    fs = 100.0
+    x = rng.normal(size=10_000)
+    good = np.ones(x.size, dtype=bool)
+    good[4_321] = False  # touches segments 42 and 43 (nperseg 200, step 100)
+    f, P, _ = _welch_psd(x, fs, FFTOptions(nperseg_seconds=2.0), good)
+    starts = [s for s in range(0, x.size - 199, 100) if not s <= 4_321 < s + 200]
+    per_segment = [signal.welch(x[s:s + 200], fs=fs, nperseg=200)[1] for s in starts]
+    np.testing.assert_allclose(P, np.mean(per_segment, axis=0), rtol=1e-10)
+    assert np.isnan(_welch_psd(x, fs, FFTOptions(nperseg_seconds=2.0), np.zeros(x.size, dtype=bool))[1]).all()
+
+
+def test_float32_welch_within_documented_bound(accel_session):
+    files = sorted(accel_session.glob("AccelData_*.csv"))
+    spectra = {}
+    for precision in ("float64", "float32"):
+        df = read_many_csvs(files, precision=precision)
+        assert df["Mirror_X_g"].dtype == precision
+        spectra[precision] = _welch_psd(df["Mirror_X_g"].to_numpy(), 1000.0, FFTOptions(nperseg_seconds=4.0))[1]
+    ref = spectra["float64"]
+    assert np.max(np.abs(spectra["float32"] - ref)) <= 1e-7 * ref.max()
+
+
+def test_reading_with_qc_leaves_the_session_folder_alone(accel_session):
+    before = sorted(p.name for p in accel_session.iterdir())
+    df = read_many_csvs(directory=accel_session, qc=QCOptions(minute_s=5.0))
+    assert {f"{c}_ok" for c in ["Mirror_X_g", "Desk_Y_g"]} <= set(df.columns)
+    assert df["Mirror_X_g_ok"].all()
+    assert sorted(p.name for p in accel_session.iterdir()) == before
+
+
+def test_check_session_saves_only_when_asked(accel_session):
+    opts = QCOptions(minute_s=5.0)
+    tables = check_session(accel_session, opts)
+    assert not (accel_session / QC_FILENAME).exists()
+    check_session(accel_session, opts, save=True)
+    saved = load_session_qc(accel_session, opts)
+    assert saved.keys() == tables.keys()
+    for name, table in tables.items():
+        pd.testing.assert_frame_equal(saved[name], table, check_dtype=False)
+
+
+def test_qc_flags_clipped_flat_and_missing_minutes(rng):
+    t = np.arange(0, 240, 0.01)
+    df = pd.DataFrame({"t_rel_s": t, **{c: 1e-3 * rng.normal(size=t.size)
+                                        for c in ["Mirror_Y_g", "Mirror_X_g", "Mirror_Z_g", "Desk_Y_g"]}})
+    df.loc[(t >= 65) & (t < 65.5), "Mirror_X_g"] = SATURATION_G  # minute 1 clipped
+    df.loc[t >= 180, "Mirror_Z_g"] = 0.0                         # minute 3 flat
+    df.loc[(t >= 130) & (t < 131), "Desk_Y_g"] = np.nan          # minute 2 missing samples
+    table = qc_frame(df)
+    assert list(table["Mirror_X_g_saturated"] > 0) == [False, True, False, False]
+    assert list(table["Mirror_Z_g_flat"]) == [False, False, False, True]
+    assert list(table["Desk_Y_g_nan"]) == [0, 0, 100, 0]
+    assert list(qc_bad_minutes(table, "Mirror_Y_g")) == [False] * 4
+    assert list(qc_bad_minutes(table)) == [False, True, True, True]
+
+
+def _event_file(folder, rng, fs=1000.0, n=6000):
+    # a 0.2 g knock on Mirror_Z at 2 s and a 0.03 g 30 Hz hum on Mirror_Y from 4 to 4.5 s, on top of noise
+    session = folder / "Session_2025-10-14_160804"
+    session.mkdir()
+    t = np.arange(n) / fs
+    stamps = (np.datetime64("2025-10-14T16:08:04.000") + (t * 1e6).astype("timedelta64[us]")).astype(str)
+    z = 1e-3 * rng.normal(size=n)
+    z[2000:2060] += 0.2 * np.hanning(60)
+    y = 0.01 + 1e-3 * rng.normal(size=n)
+    y[4000:4500] += 0.03 * np.sin(2 * np.pi * 30.0 * t[4000:4500])
+    df = pd.DataFrame({
+        "AbsoluteTime": [s.replace("T", " ") for s in stamps],
+        "RelativeTime_s": t,
+        "Mirror_Y_g": y,
+        "Mirror_X_g": -0.02 + 1e-3 * rng.normal(size=n),
+        "Mirror_Z_g": z,
+        "Desk_Y_g": 0.005 + 1e-3 * rng.normal(size=n),
+    })
+    path = session / "AccelData_2025-10-14_160804_File0001.csv"
+    df.to_csv(path, index=False, float_format="%.6f")
+    return path, pd.read_csv(path)
+
+
+@pytest.mark.parametrize("smoothing_factor", [0.0, 0.9])
+def test_events_do_not_depend_on_block_size(tmp_path, rng, smoothing_factor):
+    path, raw = _event_file(tmp_path, rng)
+    opts = EventOptions(smoothing_factor=smoothing_factor, pad_s=0.5,
+                        bands=(BandTrigger("hum", 25.0, 35.0, 0.01, window_s=0.1),))
+    # ~60 rows per block at 4 kB, so the 500-row padding reaches back over several blocks
+    scans = [scan_file(path, EventOptions(**{**opts.__dict__, "block_bytes": b})) for b in (4096, 50_000, 32 << 20)]
+    assert sorted(scans[0]["trigger"]) == ["hum", "threshold"]
+    for scan in scans[1:]:
+        pd.testing.assert_frame_equal(scan, scans[0], check_exact=False, rtol=1e-12)
+
+    for _, ev in scans[0].iterrows():
+        window = load_event(ev, tmp_path)
+        expected = raw["RelativeTime_s"].iloc[ev["window_row"]:ev["window_row"] + ev["window_rows"]]
+        assert len(window) == ev["window_rows"]
+        np.testing.assert_array_equal(window["t_rel_s"].to_numpy(), expected.to_numpy())
+        assert raw["RelativeTime_s"].iloc[ev["row"]] == ev["t_rel_s"]
+    knock = scans[0].set_index("trigger").loc["threshold"]
+    assert 2.0 <= knock["t_rel_s"] <= 2.06 and knock["peak_Mirror_Z_g"] == pytest.approx(0.2, abs=0.02)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from channel_stats import (
+    ACCEL_CHANNELS,
+    RELATIVE_ACCURACY,
+    ChannelStats,
+    QuantileSketch,
+    cached_file_stats,
+    accel_file_stats,
+    session_cache_path,
+    session_stats,
+)
+
+QS = [0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0]
+
+
+def test_sketch_quantiles_within_relative_accuracy(rng):
+    x = np.concatenate([rng.lognormal(0.0, 3.0, 20_000), -rng.lognormal(-2.0, 1.0, 5_000), np.zeros(10)])
+    sketch = QuantileSketch()
+    sketch.add(x)
+    want = np.quantile(x, QS, method="lower")
+    got = sketch.quantile(QS)
+    assert np.all(np.abs(got - want) <= RELATIVE_ACCURACY * np.abs(want) + 1e-12)
+
+
+def test_merged_stats_equal_stats_of_everything(rng):
+    parts = [rng.normal(loc, 1.0, n) for loc, n in [(0.0, 1000), (5.0, 3000), (-2.0, 10)]]
+    parts[1][::7] = np.nan
+    merged = ChannelStats()
+    for x in parts:
+        st = ChannelStats()
+        st.add(x)
+        merged.merge(ChannelStats.from_dict(st.to_dict()))
+    whole = ChannelStats()
+    whole.add(np.concatenate(parts))
+    allx = np.concatenate(parts)
+    finite = allx[np.isfinite(allx)]
+    assert merged.count == whole.count == finite.size
+    assert merged.nan == np.isnan(allx).sum()
+    assert merged.mean == pytest.approx(finite.mean(), rel=1e-12)
+    assert merged.std == pytest.approx(finite.std(ddof=1), rel=1e-12)
+    assert (merged.min, merged.max) == (finite.min(), finite.max())
+    np.testing.assert_array_equal(merged.quantile(QS), whole.quantile(QS))
+
+
+def test_session_stats_write_only_to_the_given_cache(accel_session, tmp_path):
+    before = sorted(p.name for p in accel_session.iterdir())
+    stats, per_file = session_stats(accel_session)
+    assert sorted(p.name for p in accel_session.iterdir()) == before
+    assert len(per_file) == 2
+
+    full = pd.concat(pd.read_csv(p) for p in sorted(accel_session.glob("*.csv")))
+    for c in ACCEL_CHANNELS:
+        assert stats[c].count == len(full)
+        assert stats[c].mean == pytest.approx(full[c].mean(), rel=1e-9)
+        assert abs(stats.medians()[c] - full[c].median()) <= 2 * RELATIVE_ACCURACY * abs(full[c].median()) + 1e-9
+
+    cache = session_cache_path(tmp_path / "cache", accel_session)
+    cached, _ = session_stats(accel_session, cache)
+    assert cache.exists() and sorted(p.name for p in accel_session.iterdir()) == before
+
+    def fail(path):
+        raise AssertionError(f"{path} should have come from the cache")
+    again = cached_file_stats(sorted(accel_session.glob("*.csv")), fail, cache)
+    assert again.keys() == per_file.keys()
+    assert cached.table().equals(stats.table())
+
+
+def test_uncached_stats_compute_every_time(accel_session):
+    paths = sorted(accel_session.glob("*.csv"))
+    calls = []
+
+    def compute(path):
+        calls.append(path.name)
+        return accel_file_stats(path)
+    cached_file_stats(paths, compute)
+    cached_file_stats(paths, compute)
+    assert len(calls) == 4
@@ -0,0 +1,56 @@
+import subprocess
+import sys
+
+import pytest
+
+from conftest import REPO_DIR, dot_image
+
+# Each case runs the command in a fresh interpreter and fails if anything under matplotlib got imported
+_RUN = """
+import sys
+import ogre_cli
+code = ogre_cli.main(sys.argv[1:])
+loaded = sorted(m for m in sys.modules if m == "matplotlib" or m.startswith("matplotlib."))
+assert code == 0, code
+assert not loaded, loaded[:5]
+"""
+
+
+def _run_cli(*argv):
+    proc = subprocess.run([sys.executable, "-c", _RUN, *map(str, argv)], cwd=REPO_DIR, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+
+
+def test_accel_fft_no_plots_never_imports_matplotlib(accel_session, tmp_path):
+    out = tmp_path / "fft"
+    _run_cli("accel", "fft", accel_session, "--no-plots", "--nperseg-seconds", "2", "--out-dir", out)
+    assert list((out / accel_session.name).glob("*.csv"))
+    assert sorted(p.name for p in accel_session.iterdir()) == sorted(p.name for p in accel_session.glob("*.csv"))
+
+
+def test_accel_integrate_no_plots_never_imports_matplotlib(accel_session, tmp_path):
+    out = tmp_path / "integration"
+    _run_cli("accel", "integrate", accel_session, "--no-plots", "--out-dir", out)
+    assert (out / accel_session.name / f"{accel_session.name}_integration.csv").exists()
+
+
+def test_frames_fit_without_plot_never_imports_matplotlib(tmp_path, rng, write_frames):
+    folder = tmp_path / "run1"
+    write_frames(folder, [dot_image(rng) for _ in range(4)])
+    _run_cli("frames", "fit", folder)
+    assert (folder / "dot_fits.csv").exists()
+
+
+def test_accel_stats_caches_outside_the_session(accel_session, tmp_path):
+    before = sorted(p.name for p in accel_session.iterdir())
+    _run_cli("accel", "stats", accel_session, "--stats-cache", tmp_path / "cache")
+    assert sorted(p.name for p in accel_session.iterdir()) == before
+    assert list((tmp_path / "cache").glob("*_accel_stats.json"))
+
+
+@pytest.mark.parametrize("module", ["dot_spectrum", "dot_env_corr", "dot_fit", "dot_store", "log_pyramid"])
+def test_headless_modules_never_import_matplotlib(module):
+    code = (f"import sys; sys.path.insert(0, 'temperature'); import {module}; "
+            "assert not [m for m in sys.modules if m.startswith('matplotlib')]")
+    proc = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
@@ -0,0 +1,38 @@
+import json
+import subprocess
+import sys
+
+
+from conftest import REPO_DIR
+from data_service import DataService
+
+
+def test_importing_the_service_leaves_sys_path_alone():
+    code = "import sys; before = list(sys.path); import data_service; assert sys.path == before"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+
+
+def test_stats_and_spectrum_write_nothing_under_the_root(accel_session):
+    root = accel_session.parent
+    before = sorted(p.relative_to(root) for p in root.rglob("*"))
+    service = DataService(root, max_workers=1)
+    try:
+        body, _ = service.handle("/accel/stats", {"session": accel_session.name})
+        table = json.loads(body)
+        assert table["Mirror_X_g"]["count"] == 40_000
+        service.handle("/accel/spectrum", {"session": accel_session.name, "nperseg_seconds": "4"})
+        assert sorted(p.relative_to(root) for p in root.rglob("*")) == before
+    finally:
+        service.pool.shutdown()
+
+
+def test_stats_cache_goes_to_the_configured_folder(accel_session, tmp_path_factory):
+    cache_dir = tmp_path_factory.mktemp("stats_cache")
+    service = DataService(accel_session.parent, max_workers=1, stats_cache_dir=cache_dir)
+    try:
+        service.handle("/accel/stats", {"session": accel_session.name})
+    finally:
+        service.pool.shutdown()
+    assert [p.name for p in cache_dir.iterdir()] == [f"{accel_session.name}_accel_stats.json"]
+    assert not list(accel_session.glob("*.json"))
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dot_env_corr import fit_thermal_lag, lagged_xcorr
+
+
+def _direct_r(x, y, lag):
+    # Pearson r of x[t] with y[t + lag] over the pairs where both are finite
+    if lag >= 0:
+        a, b = x[:len(x) - lag], y[lag:]
+    else:
+        a, b = x[-lag:], y[:len(y) + lag]
+    ok = np.isfinite(a) & np.isfinite(b)
+    return np.corrcoef(a[ok], b[ok])[0, 1], int(ok.sum())
+
+
+def test_lagged_xcorr_matches_corrcoef_per_lag(rng):
+    n = 600
+    x = 21.0 + np.cumsum(rng.normal(0.0, 0.05, n))
+    y = np.full(n, np.nan)
+    y[17:] = 800.0 + 3.0 * x[:-17]
+    y += rng.normal(0.0, 0.05, n)
+    x[rng.integers(0, n, 60)] = np.nan   # logger gaps
+    y[200:260] = np.nan                  # frames dropped by the fit
+    lags, r, pairs = lagged_xcorr(x, y, max_lag=40)
+    for lag in range(-40, 41, 3):
+        want_r, want_pairs = _direct_r(x, y, lag)
+        i = lag + 40
+        assert pairs[i] == want_pairs
+        assert r[i] == pytest.approx(want_r, abs=1e-9)
+    assert lags[np.nanargmax(r)] == 17
+
+
+def test_lagged_xcorr_needs_min_overlap():
+    x = np.arange(50.0)
+    y = np.where(np.arange(50) < 10, x, np.nan)
+    _, r, pairs = lagged_xcorr(x, y, max_lag=5, min_overlap=30)
+    assert pairs.max() == 10 and np.isnan(r).all()
+
+
+def _lowpass(x, step_s, tau_s):
+    out = np.empty_like(x)
+    a = np.exp(-step_s / tau_s)
+    out[0] = x[0]
+    for i in range(1, len(x)):
+        out[i] = a * out[i - 1] + (1 - a) * x[i]
+    return out
+
+
+def test_fit_thermal_lag_recovers_time_constant(rng):
+    # three days at 1 min: HVAC cycling plus a daily swing, seen by the centroid through a 3 h thermal lag
+    t = np.arange(3 * 1440) * 60.0
+    temp = 21.0 + 0.4 * np.sin(2 * np.pi * t / 1200) + 1.0 * np.sin(2 * np.pi * t / 86400)
+    mu = 512.0 - 2.5 * _lowpass(temp, 60.0, 3 * 3600.0) + rng.normal(0.0, 0.01, t.size)
+    mu[1000:1300] = np.nan
+    temp[rng.integers(0, t.size, 100)] = np.nan
+    index = pd.to_datetime("2025-09-19") + pd.to_timedelta(t, unit="s")
+    grid = pd.DataFrame({"mu_x": mu, "SHT45_Temp": temp}, index=index)
+    fit = fit_thermal_lag(grid, "SHT45_Temp", "mu_x", taus_s=np.geomspace(600.0, 86400.0, 200))
+    assert fit["tau_s"] == pytest.approx(3 * 3600.0, rel=0.05)
+    assert fit["gain"] == pytest.approx(-2.5, rel=0.02)
+    assert fit["r2"] > 0.99
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from conftest import dot_image
+from dot_background import RollingBackground
+from dot_fit import (
+    QUALITY_COLUMNS,
+    QUALITY_NO_DOT,
+    QUALITY_OVEREXPOSED,
+    FitOptions,
+    fit_frame,
+    fit_frames,
+    fit_frames_parallel,
+    frame_quality,
+)
+
+FLAGS = QUALITY_COLUMNS.index("quality")
+
+
+def _blank(rng, noise, shape=(480, 640)):
+    return np.clip(np.rint(20.0 + rng.normal(0.0, noise, shape)), 0, 255)
+
+
+@pytest.mark.parametrize("noise", [0.5, 1.0, 2.0, 4.0, 8.0])
+def test_prefilter_flags_blank_frames(rng, noise):
+    # 8-bit noise at these levels used to pass as a dot on most frames (MAD rounded down to one count)
+    for shape in [(120, 160), (480, 640), (1080, 1440)]:
+        for _ in range(10):
+            assert int(frame_quality(_blank(rng, noise, shape))[FLAGS]) & QUALITY_NO_DOT
+
+
+def test_prefilter_finds_the_dot(rng):
+    for mu in [(300.0, 200.0), (40.0, 400.0), (600.0, 30.0)]:
+        img = np.clip(np.rint(dot_image(rng, mu=mu, amp=60.0, shape=(480, 640))), 0, 255)
+        q = frame_quality(img)
+        assert not int(q[FLAGS]) & QUALITY_NO_DOT
+        assert abs(q[QUALITY_COLUMNS.index("rough_x")] - mu[0]) <= 4
+        assert abs(q[QUALITY_COLUMNS.index("rough_y")] - mu[1]) <= 4
+
+
+def test_fit_recovers_centroid_and_width(rng):
+    params = fit_frame(dot_image(rng, mu=(81.3, 57.6), sigma=3.5))
+    amp_x, mu_x, sigma_x, _, amp_y, mu_y, sigma_y, _ = params
+    assert mu_x == pytest.approx(81.3, abs=0.2) and mu_y == pytest.approx(57.6, abs=0.2)
+    assert abs(sigma_x) == pytest.approx(3.5, rel=0.05) and abs(sigma_y) == pytest.approx(3.5, rel=0.05)
+
+
+def test_prefiltered_fit_skips_blank_frames(tmp_path, rng, write_frames):
+    images = [dot_image(rng) if i % 3 else 20.0 + rng.normal(0.0, 2.0, (120, 160)) for i in range(12)]
+    write_frames(tmp_path, images)
+    result = fit_frames(tmp_path, FitOptions(prefilter=True))
+    blank = np.arange(12) % 3 == 0
+    assert np.all((result["quality"][blank].astype(int) & QUALITY_NO_DOT) != 0)
+    assert np.isnan(result["mu_x"][blank]).all()
+    # frames are read rotated by 180 degrees (like dot_movie's openfits), so the dot at x=80 is at 159 - 80
+    np.testing.assert_allclose(result["mu_x"][~blank], 79.0, atol=0.25)
+    np.testing.assert_allclose(result["mu_y"][~blank], 59.0, atol=0.25)
+
+
+def _drifting_run(folder, rng, write_frames, n=24):
+    # the dot drifts 0.37 px per frame in x and wanders in y, with a blank frame (dot gone) in the middle
+    images = []
+    for i in range(n):
+        mu = (60.0 + 0.37 * i, 50.0 + 3.0 * np.sin(i / 4))
+        images.append(dot_image(rng, mu=mu) if i != 13 else 20.0 + rng.normal(0.0, 4.0, (120, 160)))
+    return write_frames(folder, images)
+
+
+@pytest.mark.parametrize("opts", [
+    FitOptions(roi_half_width=20),
+    FitOptions(roi_half_width=20, prefilter=True),
+    FitOptions(roi_half_width=20, background_frames=4, background_batch=3, background_block=8),
+], ids=["roi", "roi+prefilter", "roi+background"])
+def test_parallel_matches_serial_with_roi_tracking(tmp_path, rng, write_frames, opts):
+    paths = _drifting_run(tmp_path, rng, write_frames)
+    serial = fit_frames(paths, opts)
+    parallel = fit_frames_parallel(paths, opts, max_workers=2, chunk_size=5)
+    assert serial.keys() == parallel.keys()
+    for name in serial:
+        np.testing.assert_allclose(parallel[name], serial[name], rtol=0, atol=1e-6, equal_nan=True, err_msg=name)
+    assert np.isfinite(serial["mu_x"]).sum() >= 22
+
+
+def test_flagged_frames_stay_out_of_the_background(rng):
+    frames = [20.0 + rng.normal(0.0, 2.0, (64, 64)).astype(np.float32) for _ in range(4)]
+    bg = RollingBackground(n_frames=4, block=8)
+    bg.correct(frames)
+    flash = np.full((64, 64), 255.0, dtype=np.float32)
+    corrected = bg.correct([flash, frames[0]], push=[False, True])
+    assert np.mean(corrected[0]) == pytest.approx(235.0, abs=1.0)
+    assert abs(np.mean(bg.correct([frames[1]])[0])) < 1.0
+
+
+def test_overexposed_burst_does_not_spoil_the_background(tmp_path, rng, write_frames):
+    # the room lights come on for four frames; the frames after them must fit as well as the ones before
+    mus = [(60.0 + 2.0 * i, 50.0 + 1.5 * i) for i in range(16)]
+    images = [dot_image(rng, mu=mu) for mu in mus]
+    for i in range(6, 10):
+        images[i] = np.clip(images[i] + 240.0, 0, 255)
+    write_frames(tmp_path, images)
+    opts = FitOptions(prefilter=True, background_frames=4, background_batch=2, background_block=8)
+    result = fit_frames(tmp_path, opts)
+    burst = np.zeros(16, dtype=bool)
+    burst[6:10] = True
+    assert np.all(result["quality"][burst].astype(int) & QUALITY_OVEREXPOSED)
+    assert np.isnan(result["mu_x"][burst]).all()
+    after = np.arange(16) >= 10
+    np.testing.assert_allclose(result["mu_x"][after], [159.0 - m[0] for m in mus[10:]], atol=0.25)
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from conftest import dot_image
+from dot_fit import QUALITY_COLUMNS, QUALITY_NO_DOT, FitOptions
+from dot_fit2d import fit_frames_2d, fit_gauss2d_batch
+
+
+def _ellipse(rng, mu, major, minor, theta, amp=120.0, bg=15.0, shape=(64, 64), noise=1.0):
+    y, x = np.mgrid[:shape[0], :shape[1]]
+    dx, dy = x - mu[0], y - mu[1]
+    u = dx * np.cos(theta) + dy * np.sin(theta)
+    v = -dx * np.sin(theta) + dy * np.cos(theta)
+    return bg + amp * np.exp(-0.5 * ((u / major) ** 2 + (v / minor) ** 2)) + rng.normal(0.0, noise, shape)
+
+
+def test_lm_recovers_elliptical_gaussian(rng):
+    truth = [((31.2, 29.7), 6.0, 3.0, 0.5), ((25.4, 36.1), 4.0, 2.5, -0.9), ((33.0, 30.0), 5.0, 2.0, 1.2)]
+    res = fit_gauss2d_batch(np.stack([_ellipse(rng, *t) for t in truth]))
+    for i, (mu, major, minor, theta) in enumerate(truth):
+        assert res["mu_x"][i] == pytest.approx(mu[0], abs=0.05)
+        assert res["mu_y"][i] == pytest.approx(mu[1], abs=0.05)
+        assert res["sigma_major"][i] == pytest.approx(major, rel=0.02)
+        assert res["sigma_minor"][i] == pytest.approx(minor, rel=0.02)
+        assert res["theta"][i] == pytest.approx(theta, abs=0.02)
+        assert res["amp"][i] == pytest.approx(120.0, rel=0.02)
+        assert res["background"][i] == pytest.approx(15.0, abs=0.2)
+        # the reported uncertainty of the centroid is about right for unit noise
+        assert 0.002 < np.sqrt(res["cov"][i, 1, 1]) < 0.05
+
+
+def test_prefilter_skips_blank_frames(tmp_path, rng, write_frames):
+    images = [dot_image(rng) if i % 3 else 20.0 + rng.normal(0.0, 2.0, (120, 160)) for i in range(9)]
+    write_frames(tmp_path, images)
+    result = fit_frames_2d(tmp_path, FitOptions(prefilter=True, roi_half_width=20), batch_size=4)
+    blank = np.arange(9) % 3 == 0
+    assert set(QUALITY_COLUMNS) <= set(result)
+    assert np.all((result["quality"][blank].astype(int) & QUALITY_NO_DOT) != 0)
+    assert np.isnan(result["mu_x"][blank]).all() and (result["n_iter"][blank] == 0).all()
+    np.testing.assert_allclose(result["mu_x"][~blank], 79.0, atol=0.2)
+    np.testing.assert_allclose(result["mu_y"][~blank], 59.0, atol=0.2)
+
+
+def test_dark_is_subtracted(tmp_path, rng, write_frames):
+    # a hot patch on the sensor that is in the dark frame as well as in every image
+    y, x = np.mgrid[:120, :160]
+    hot = 10.0 + 80.0 * np.exp(-((x - 30) ** 2 + (y - 25) ** 2) / (2 * 4.0 ** 2))
+    dark = write_frames(tmp_path / "dark", [hot])[0]
+    paths = write_frames(tmp_path / "run", [dot_image(rng) + hot for _ in range(4)])
+
+    plain = fit_frames_2d(paths)
+    corrected = fit_frames_2d(paths, FitOptions(dark_path=str(dark)))
+    assert np.all(np.abs(plain["mu_x"] - 79.0) > 1.0) or np.isnan(plain["mu_x"]).all()
+    np.testing.assert_allclose(corrected["mu_x"], 79.0, atol=0.2)
+    np.testing.assert_allclose(corrected["background"], 20.0, atol=1.5)
+
+
+def test_rolling_background_is_subtracted(tmp_path, rng, write_frames):
+    # a stray-light ramp across the frame under a dot that moves, so it never becomes part of the background
+    y, x = np.mgrid[:120, :160]
+    ramp = 0.5 * x
+    mus = [(60.0 + 5.0 * i, 40.0 + 3.0 * i) for i in range(12)]
+    paths = write_frames(tmp_path, [dot_image(rng, mu=mu) + ramp for mu in mus])
+    opts = FitOptions(background_frames=8, background_batch=4, background_block=8)
+    result = fit_frames_2d(paths, opts, batch_size=5)
+    plain = fit_frames_2d(paths, batch_size=5)
+    # the first batch is corrected with a model of its own frames, dots included, so only later ones are exact
+    expected_x = 159.0 - np.array([m[0] for m in mus])[4:]
+    expected_y = 119.0 - np.array([m[1] for m in mus])[4:]
+    np.testing.assert_allclose(result["mu_x"][4:], expected_x, atol=0.2)
+    np.testing.assert_allclose(result["mu_y"][4:], expected_y, atol=0.2)
+    # uncorrected, the ramp either drags the centroid or drowns the dot (the fit is rejected as faint)
+    off = np.abs(plain["mu_x"][4:] - expected_x)
+    assert np.all(np.isnan(off) | (off > 0.5))
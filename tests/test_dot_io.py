@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from dot_io import list_frames, parse_frame_timestamp, read_bmp, read_bmp_layout
+
+
+def _pil_reference(path):
+    # dot_movie.ipynb: PIL grayscale, then openfits' 180 degree flip of the converted FITS
+    return np.flip(np.asarray(Image.open(path).convert("L")), axis=(0, 1))
+
+
+@pytest.mark.parametrize("mode", ["L", "RGB", "RGBA", "P"])
+@pytest.mark.parametrize("width", [160, 157])  # 157: rows padded to 4 bytes
+def test_bmp_reader_matches_pil(tmp_path, rng, mode, width):
+    pixels = rng.integers(0, 256, (37, width, 4), dtype=np.uint8)
+    if mode == "L":
+        img = Image.fromarray(pixels[..., 0], mode="L")
+    elif mode == "P":
+        img = Image.fromarray(pixels[..., :3], mode="RGB").quantize(colors=200)
+    else:
+        img = Image.fromarray(pixels[..., :len(mode)], mode=mode)
+    path = tmp_path / f"frame_{mode}.bmp"
+    img.save(path)
+    np.testing.assert_array_equal(read_bmp(path), _pil_reference(path))
+    assert read_bmp_layout(path).width == width
+
+
+def test_frames_listed_in_name_order_with_timestamps(tmp_path, write_frames):
+    written = write_frames(tmp_path, [np.zeros((8, 8))] * 3)
+    paths, layout = list_frames(tmp_path)
+    assert paths == written and layout.bits_per_pixel == 8
+    assert [parse_frame_timestamp(p).second for p in paths] == [0, 1, 2]
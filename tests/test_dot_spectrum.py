@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dot_spectrum import frame_times_s, lomb_scargle
+
+
+def _direct_lomb_scargle(t, y, freqs):
+    # the textbook O(N F) normalised periodogram, to check the extirpolated sums against
+    y = y - y.mean()
+    power = np.empty(len(freqs))
+    for i, f in enumerate(freqs):
+        w = 2 * np.pi * f
+        tau = np.arctan2(np.sum(np.sin(2 * w * t)), np.sum(np.cos(2 * w * t))) / (2 * w)
+        c, s = np.cos(w * (t - tau)), np.sin(w * (t - tau))
+        power[i] = (np.dot(y, c) ** 2 / np.dot(c, c) + np.dot(y, s) ** 2 / np.dot(s, s)) / np.dot(y, y)
+    return power
+
+
+def test_matches_direct_sum_on_uneven_times(rng):
+    t = np.sort(rng.uniform(0.0, 100.0, 400))
+    y = np.sin(2 * np.pi * 0.73 * t) + rng.normal(0.0, 1.0, t.size)
+    freqs, power = lomb_scargle(t, y, scaling="standard")
+    np.testing.assert_allclose(power, _direct_lomb_scargle(t, y, freqs), rtol=0, atol=1e-3)
+    assert freqs[np.argmax(power)] == pytest.approx(0.73, abs=freqs[1] - freqs[0])
+
+
+def test_density_matches_white_noise_level(rng):
+    # one-sided PSD of white noise with variance s^2 is 2 s^2 / fs, with fs the mean rate once frames are dropped
+    fs, sigma = 50.0, 0.3
+    t = np.arange(20_000) / fs
+    y = rng.normal(0.0, sigma, t.size)
+    keep = rng.random(t.size) > 0.2
+    for tt, yy in [(t, y), (t[keep], y[keep])]:
+        _, power = lomb_scargle(tt, yy, df=0.05, f_max=20.0)
+        assert np.mean(power) == pytest.approx(2 * sigma ** 2 / fs * (len(t) / len(tt)), rel=0.05)
+
+
+def test_frame_times_spread_shared_seconds_and_keep_gaps():
+    # three frames stamped 09:00:00, one at :01, then nothing until :05 (frames dropped by the camera or filter_fits)
+    stamps = pd.to_datetime(["2025-09-22 09:00:00"] * 3 + ["2025-09-22 09:00:01", "2025-09-22 09:00:05"])
+    frames = pd.DataFrame({"timestamp": stamps}, index=[0, 1, 2, 3, 9])
+    np.testing.assert_allclose(frame_times_s(frames), [0.0, 1 / 3, 2 / 3, 1.0, 5.0])
+
+
+def test_frame_times_from_fps_keep_dropped_frames():
+    frames = pd.DataFrame({"timestamp": pd.NaT, "mu_x": 0.0}, index=[0, 1, 2, 5, 6])
+    np.testing.assert_allclose(frame_times_s(frames, fps=10.0), [0.0, 0.1, 0.2, 0.5, 0.6])
+    with pytest.raises(ValueError):
+        frame_times_s(frames)
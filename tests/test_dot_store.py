@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from conftest import dot_image
+from dot_fit import FIT_COLUMNS, FitOptions, FitState, fit_frames
+from dot_store import FitStore, process_new_frames
+
+OPTS = [
+    FitOptions(roi_half_width=20),
+    FitOptions(roi_half_width=20, background_frames=4, background_batch=3, background_block=8),
+]
+
+
+def _run(rng, n=30):
+    # drifting dot with a blank frame, so the tracker has to follow and re-acquire it
+    images = []
+    for i in range(n):
+        mu = (60.0 + 0.37 * i, 50.0 + 3.0 * np.sin(i / 4))
+        images.append(dot_image(rng, mu=mu) if i != 13 else 20.0 + rng.normal(0.0, 4.0, (120, 160)))
+    return images
+
+
+def _assert_store_matches(store, expected):
+    df = store.load()
+    for name in FIT_COLUMNS:
+        np.testing.assert_allclose(df[name].to_numpy(float), expected[name], rtol=0, atol=1e-6, equal_nan=True,
+                                   err_msg=name)
+
+
+@pytest.mark.parametrize("opts", OPTS, ids=["roi", "roi+background"])
+def test_batches_and_passes_match_one_fit(tmp_path, rng, write_frames, opts):
+    images = _run(rng)
+    paths = write_frames(tmp_path, images)
+    expected = fit_frames(paths, opts)
+    for p in paths[18:]:
+        p.rename(tmp_path.parent / p.name)  # not captured yet
+
+    store, state = FitStore(tmp_path / "fits.csv"), FitState(opts)
+    assert process_new_frames(tmp_path, store, opts, batch_size=5, state=state) == 18
+    for p in paths[18:]:
+        (tmp_path.parent / p.name).rename(p)
+    assert process_new_frames(tmp_path, store, opts, batch_size=5, state=state) == 12
+    _assert_store_matches(store, expected)
+
+
+@pytest.mark.parametrize("opts", OPTS, ids=["roi", "roi+background"])
+def test_restart_warms_up_from_earlier_frames(tmp_path, rng, write_frames, opts):
+    paths = write_frames(tmp_path, _run(rng))
+    expected = fit_frames(paths, opts)
+    store = FitStore(tmp_path / "fits.csv")
+    first = {c: v[:18] for c, v in expected.items()}
+    store.append(paths[:18], first, opts)
+
+    assert process_new_frames(tmp_path, store, opts) == 12
+    _assert_store_matches(store, expected)
@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import framerate
+from framerate import OVERWRITES_UNKNOWN, audit_archive, audit_files, write_audit_csv
+
+
+def _stamp_names(seconds, prefix="minutely"):
+    return [f"{prefix}{i + 1:04d} 25-09-22 09-{s // 60:02d}-{s % 60:02d}.bmp" for i, s in enumerate(seconds)]
+
+
+def test_intervals_and_dropped_frames():
+    # 50 fps with one gap of four intervals (three frames dropped); names carry only frame numbers
+    mtimes = 1000.0 + 0.02 * np.r_[np.arange(10), np.arange(13, 20)]
+    names = [f"frame{i:05d}.bmp" for i in range(len(mtimes))]
+    audit = audit_files("run", names, mtimes)
+    assert audit["num_files"] == 17
+    assert audit["median_interval_s"] == pytest.approx(0.02)
+    assert audit["max_gap_s"] == pytest.approx(0.08)
+    assert audit["dropped_frames"] == 3
+    assert audit["dt_0.015-0.025s"] == 15 and audit["dt_0.05-0.1s"] == 1
+    assert audit["framerate"] == pytest.approx(16 / (0.02 * 19))
+    assert audit["stamped_files"] == 0 and not audit["second_keyed"]
+    assert audit["overwritten_files"] == OVERWRITES_UNKNOWN
+
+
+def test_shared_seconds_and_second_keyed_folders():
+    # three frames per filename second
+    seconds = [0, 0, 0, 1, 1, 1, 2]
+    audit = audit_files("run", _stamp_names(seconds), 1000.0 + np.arange(7) / 3)
+    assert audit["stamped_files"] == 7 and audit["shared_second_frames"] == 6
+    assert audit["stamp_framerate"] == pytest.approx(3.0) and not audit["second_keyed"]
+
+    # names that differ only by their timestamp: one file per second, two of them rewritten long after creation
+    names = [f"minutely 25-09-22 09-00-{s:02d}.bmp" for s in range(5)]
+    mtimes = 1000.0 + np.arange(5.0)
+    births = mtimes - np.array([0.0, 0.01, 0.6, 0.0, 0.9])
+    audit = audit_files("run", names, mtimes, births)
+    assert audit["second_keyed"] and audit["shared_second_frames"] == 0
+    assert audit["overwritten_files"] == 2
+
+
+def test_overwritten_files_column_has_one_type(tmp_path):
+    names = [f"minutely 25-09-22 09-00-{s:02d}.bmp" for s in range(3)]
+    mtimes = 1000.0 + np.arange(3.0)
+    audits = [audit_files("a", names, mtimes, mtimes - 0.5), audit_files("b", names, mtimes)]
+    write_audit_csv(audits, tmp_path / "framerate.csv")
+    column = pd.read_csv(tmp_path / "framerate.csv")["overwritten_files"]
+    assert column.dtype == np.int64 and column.tolist() == [3, OVERWRITES_UNKNOWN]
+
+
+def _make_run(folder, n, t0, dt):
+    folder.mkdir(parents=True)
+    for i in range(n):
+        path = folder / f"frame{i:04d}.bmp"
+        path.write_bytes(b"BM")
+        os.utime(path, (t0 + i * dt, t0 + i * dt))
+
+
+def test_audit_archive_reuses_the_cache(tmp_path, monkeypatch):
+    root = tmp_path / "archive"
+    _make_run(root / "20250922" / "run1", 5, 1.7e9, 1.0)
+    _make_run(root / "20250922" / "run2", 8, 1.7e9, 0.5)
+    cache = tmp_path / "cache.json"
+    first = audit_archive(root, cache_path=cache, max_workers=2)
+    assert [a["subfolder"] for a in first] == ["run1", "run2"]
+    assert [a["framerate"] for a in first] == pytest.approx([1.0, 2.0])
+
+    scanned = []
+    scan_folder = framerate.scan_folder
+
+    def counting_scan(path, *args, **kwargs):
+        scanned.append(os.path.basename(path))
+        return scan_folder(path, *args, **kwargs)
+
+    monkeypatch.setattr(framerate, "scan_folder", counting_scan)
+    pd.testing.assert_frame_equal(pd.DataFrame(audit_archive(root, cache_path=cache, max_workers=2)),
+                                  pd.DataFrame(first))
+    assert scanned == []
+
+    _make_run(root / "20250923" / "run3", 4, 1.7e9, 60.0)
+    again = audit_archive(root, cache_path=cache, max_workers=2)
+    assert [a["subfolder"] for a in again] == ["run1", "run2", "run3"]
+    assert sorted(scanned) == ["20250923", "archive", "run3"]
+    pd.testing.assert_frame_equal(pd.DataFrame(again[:2]), pd.DataFrame(first))
@@ -0,0 +1,36 @@
+import numpy as np
+
+from sensor_align import _WindowAccumulator
+
+
+def _direct(x, starts, ends):
+    lo = np.stack([x[s:e].min(axis=0) for s, e in zip(starts, ends)])
+    hi = np.stack([x[s:e].max(axis=0) for s, e in zip(starts, ends)])
+    return lo, hi
+
+
+def test_window_extremes_without_overlap(rng):
+    t = np.arange(1000, dtype=np.int64)
+    x = rng.normal(size=(1000, 2))
+    starts = np.arange(0, 1000, 100, dtype=np.int64)
+    acc = _WindowAccumulator(len(starts), 2)
+    acc.add(t, x, starts, starts + 100)
+    lo, hi = _direct(x, starts, starts + 100)
+    np.testing.assert_array_equal(acc.min, lo)
+    np.testing.assert_array_equal(acc.max, hi)
+    np.testing.assert_array_equal(acc.count, 100)
+
+
+def test_window_extremes_with_overlap(rng):
+    # exposure longer than the frame interval: each window reaches into the next two
+    t = np.arange(1000, dtype=np.int64)
+    x = rng.normal(size=(1000, 3))
+    starts = np.arange(0, 900, 50, dtype=np.int64)
+    ends = starts + 120
+    acc = _WindowAccumulator(len(starts), 3)
+    acc.add(t[:400], x[:400], starts, ends)  # two chunks, windows spanning the boundary
+    acc.add(t[400:], x[400:], starts, ends)
+    lo, hi = _direct(x, starts, ends)
+    np.testing.assert_array_equal(acc.min, lo)
+    np.testing.assert_array_equal(acc.max, hi)
+    np.testing.assert_allclose(acc.sum, np.stack([x[s:e].sum(axis=0) for s, e in zip(starts, ends)]))
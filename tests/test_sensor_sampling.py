@@ -0,0 +1,36 @@
+import math
+import time
+
+from sensor_sampling import STILL_RUNNING, SensorSampler, SimulatedSensor, simulated_sensors
+
+
+def test_samples_every_sensor():
+    with SensorSampler(simulated_sensors(seed=1), timeout_s=0.5) as sampler:
+        sample = sampler.sample()
+    assert not sample.errors and not sample.changes
+    row = sample.log_row()
+    assert all(math.isfinite(v) for v in row[1:])
+
+
+def test_hung_sensor_is_reported_once_and_when_it_recovers():
+    slow = SimulatedSensor(read_time_s=0.3, seed=0)
+    with SensorSampler({"sht": slow, "mcp": SimulatedSensor(read_time_s=0.0, seed=1)}, timeout_s=0.05) as sampler:
+        samples = [sampler.sample() for _ in range(4)]
+        assert [s.errors.get("sht", "")[:9] for s in samples] == ["timed out"] + [STILL_RUNNING[:9]] * 3
+        assert "sht" in samples[0].changes and all("sht" not in s.changes for s in samples[1:])
+        assert all("mcp" not in s.changes for s in samples)
+
+        slow.read_time = 0.0
+        time.sleep(0.35)  # the hung read returns
+        recovered = sampler.sample()
+        assert "sht" not in recovered.errors and math.isfinite(recovered.values["sht"][0])
+        assert recovered.changes == {"sht": "recovered after 4 missed samples"}
+        assert not sampler.sample().changes
+
+
+def test_failing_sensor_is_reported_once():
+    flaky = SimulatedSensor(read_time_s=0.0, failure_rate=1.0, seed=0)
+    with SensorSampler({"hdc": flaky}, timeout_s=0.5) as sampler:
+        samples = [sampler.sample() for _ in range(5)]
+    assert all(s.errors["hdc"].startswith("OSError") for s in samples)
+    assert [len(s.changes) for s in samples] == [1, 0, 0, 0, 0]
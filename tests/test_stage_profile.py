@@ -0,0 +1,39 @@
+import json
+
+import stage_profile
+from stage_profile import RunProfile, stage
+
+
+def test_one_module_object_records_stages_from_both_pipelines(tmp_path):
+    import dot_fit
+    from accelerometer import accel_io
+
+    # the dot code and the accelerometer code time their stages through the same module
+    assert dot_fit.stage is stage_profile.stage
+    assert accel_io.stage is stage_profile.stage
+
+    with RunProfile("test", out_dir=tmp_path) as run:
+        with stage("outer", count=10):
+            with stage("inner", count=5):
+                pass
+    names = {s["name"] for s in json.loads(run.path.read_text())["stages"]}
+    assert {"outer", "inner"} <= names
+
+
+def test_memory_is_only_traced_when_asked(tmp_path):
+    import tracemalloc
+
+    import numpy as np
+
+    with RunProfile("plain", out_dir=tmp_path) as run:
+        assert not tracemalloc.is_tracing()
+        with stage("alloc"):
+            np.ones(1 << 20)
+    record = json.loads(run.path.read_text())
+    assert not record["memory_traced"] and record["stages"][0]["peak_mb"] == 0
+
+    with RunProfile("traced", out_dir=tmp_path, trace_memory=True) as run:
+        with stage("alloc"):
+            np.ones(1 << 20)
+    assert not tracemalloc.is_tracing()
+    assert json.loads(run.path.read_text())["stages"][0]["peak_mb"] >= 8
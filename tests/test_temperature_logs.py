@@ -0,0 +1,98 @@
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import REPO_DIR
+from log_pyramid import LogPyramid
+from log_query import LogIndex
+from log_splitter import split_log
+from log_summary import LogAggregates, rebuild
+from log_writer import LOG_HEADER
+
+CHANNELS = LOG_HEADER[1:]
+
+
+def _write_log(path, stamps, values):
+    df = pd.DataFrame(values, columns=CHANNELS)
+    df.insert(0, LOG_HEADER[0], pd.DatetimeIndex(stamps).strftime("%Y-%m-%d %H:%M:%S"))
+    df.to_csv(path, index=False, float_format="%.4f", mode="a", header=not path.exists())
+
+
+@pytest.fixture
+def log(tmp_path, rng):
+    # 26 hours at 1 Hz across midnight, slowly drifting, with a few failed readings
+    stamps = pd.date_range("2025-11-24 22:00:00", periods=26 * 3600, freq="1s")
+    values = 21.0 + np.cumsum(rng.normal(0.0, 0.01, (len(stamps), len(CHANNELS))), axis=0)
+    values[rng.integers(0, len(stamps), 50), 2] = np.nan
+    path = tmp_path / "temperature_log.csv"
+    _write_log(path, stamps, values)
+    return path
+
+
+def _read(path):
+    df = pd.read_csv(path)
+    df[LOG_HEADER[0]] = pd.to_datetime(df[LOG_HEADER[0]])
+    return df
+
+
+def test_query_reads_only_the_range(log):
+    full = _read(log)
+    index = LogIndex(log, step_bytes=4096)
+    start, end = "2025-11-25 03:15:07", "2025-11-25 04:00:00"
+    got = index.query(start, end)
+    want = full[(full[LOG_HEADER[0]] >= start) & (full[LOG_HEADER[0]] <= end)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, want)
+    lo, hi = index.byte_range(start, end)
+    assert hi - lo < log.stat().st_size / 10
+
+
+def test_split_writes_every_row_once(log, tmp_path):
+    outputs = [tmp_path / f"part{i}.csv" for i in range(3)]
+    counts = split_log(log, outputs, split_points=["2025-11-25 12:00:00", "2025-11-25 00:00:00"])
+    parts = [_read(p) for p in outputs]
+    assert sum(counts.values()) == sum(len(p) for p in parts) == len(_read(log))
+    assert parts[0][LOG_HEADER[0]].max() < pd.Timestamp("2025-11-25 00:00:00") <= parts[1][LOG_HEADER[0]].min()
+    assert parts[1][LOG_HEADER[0]].max() < pd.Timestamp("2025-11-25 12:00:00") <= parts[2][LOG_HEADER[0]].min()
+
+
+def test_summary_matches_pandas(log):
+    full = _read(log)
+    want = full.groupby(full[LOG_HEADER[0]].dt.floor("D"))[CHANNELS].agg(["mean", "min", "max", "std"])
+    for agg in (rebuild(log, chunksize=10_000), LogAggregates.load(log)):
+        got = agg.summary("day")
+        for c in CHANNELS:
+            np.testing.assert_allclose(got[f"{c}_mean"], want[(c, "mean")], rtol=1e-9)
+            np.testing.assert_allclose(got[f"{c}_min"], want[(c, "min")])
+            np.testing.assert_allclose(got[f"{c}_max"], want[(c, "max")])
+            np.testing.assert_allclose(got[f"{c}_std"], want[(c, "std")], rtol=1e-3)
+
+
+def test_pyramid_levels_match_resample_and_grow_incrementally(tmp_path, rng):
+    stamps = pd.date_range("2025-11-24 00:00:00", periods=4 * 3600, freq="1s")
+    values = 20.0 + rng.normal(0.0, 0.2, (len(stamps), len(CHANNELS)))
+    path = tmp_path / "temperature_log.csv"
+    half = len(stamps) // 2 + 37  # not on a bin edge
+    _write_log(path, stamps[:half], values[:half])
+    pyramid = LogPyramid(path)
+    pyramid.update()
+    _write_log(path, stamps[half:], values[half:])
+    pyramid.update()
+
+    full = pd.DataFrame(values, index=stamps, columns=CHANNELS).round(4)
+    for name, width in pyramid.levels:
+        level = pd.read_csv(pyramid.level_path(name), index_col=0, parse_dates=True)
+        want = full.resample(f"{width}s").mean()
+        want = want[want.index + pd.Timedelta(seconds=width) <= stamps[-1]]  # only complete bins are written
+        assert list(level.index) == list(want.index)
+        for c in CHANNELS:
+            np.testing.assert_allclose(level[f"{c}_mean"], want[c], atol=1e-4)
+
+
+def test_logger_starts_without_matplotlib():
+    code = ("import sys, temperature_logger2; "
+            "loaded = [m for m in sys.modules if m.startswith('matplotlib')]; assert not loaded, loaded[:5]")
+    proc = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR / "temperature", capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr